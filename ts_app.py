@@ -1,11 +1,29 @@
 # App to play twilight struggle
 import random
 import math
+import hashlib
+import time
+from operator import attrgetter
+
+# Small integer IDs for sides and card piles. Cards are identified by their number and countries by their position in
+# the country list. The IDs are scaffolding for code working on arrays, such as the features, archives and beliefs.
+# The rules work on names: sides are the strings 'usa' and 'ussr', compared by value, and piles are named. Only
+# border_ids and the accessible countries index by ID in the rules.
+USA = 0
+USSR = 1
+side_names = ('usa', 'ussr')
+side_ids = {'usa': USA, 'ussr': USSR}
+
+pile_names = ('early war', 'mid war', 'late war', 'deck', 'discard', 'removed', 'USA hand', 'USSR hand', 'USA China',
+              'USSR China')
+pile_ids = {name: pile_id for pile_id, name in enumerate(pile_names)}
 
 
 class Card:
     """Base class for a generic card in a game"""
 
+    __slots__ = ('name',)
+
     def __init__(self, n):
         self.name = n
 
@@ -19,11 +37,24 @@ class Card:
 class CardGame:
     """Base class for a collection of Card Pile objects"""
 
-    def __init__(self, n, d):
+    def __init__(self, n, d, seed=None):
         self.name = n
         self.date = d
         self.piles = {}
 
+        # Random number generators for the game, the same seed plays out the same dice and draws. Dice and deals
+        # have streams of their own, so games with the same seed roll the same sequence of dice and shuffle with the
+        # same sequence of numbers, whatever the players choose.
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.dice_rng = random.Random(self.stream_seed('dice'))
+        self.deal_rng = random.Random(self.stream_seed('deal'))
+
+    def stream_seed(self, stream):
+        if self.seed is None:
+            return None
+        return "{s}:{r}".format(s=self.seed, r=stream)
+
     def add_pile(self, p):
         if isinstance(p, CardPile):
             self.piles.update({p.name: p})
@@ -41,7 +72,7 @@ class CardGame:
         return pile
 
     def die_roll(self):
-        return random.randint(1, 6)
+        return self.dice_rng.randint(1, 6)
 
     def __repr__(self):
         string = "<CardGame: %s on %s>" % (self.name, self.date)
@@ -74,9 +105,19 @@ class CardPile:
         except ValueError:
             raise ValueError("Could not remove card" + str(c) + " from card pile " + str(self) + ".")
 
-    def random_card(self):
+    def add_cards(self, card_list):
+        for c in card_list:
+            self.add_card(c)
+
+    def remove_all_cards(self):
+        """Empties the pile and returns the cards that were in it"""
+        card_list = list(self.cards.values())
+        self.cards = {}
+        return card_list
+
+    def random_card(self, rng=random):
         card_list = self.cards
-        card = random.choice(list(card_list.values()))
+        card = rng.choice(list(card_list.values()))
         return card
 
     def get_card(self, n):
@@ -100,9 +141,59 @@ class CardPile:
         return self.name
 
 
+class DrawPile(CardPile):
+    """Card pile kept in shuffled order, with a pointer to the next card to draw"""
+
+    def __init__(self, n, rng=random):
+        CardPile.__init__(self, n)
+        self.rng = rng
+        self.order = []
+        self.next_card = 0
+
+    def add_card(self, c):
+        CardPile.add_card(self, c)
+        # A single card is put in a random position among the cards not yet drawn
+        self.order.insert(self.rng.randint(self.next_card, len(self.order)), c)
+
+    def add_cards(self, card_list):
+        for c in card_list:
+            CardPile.add_card(self, c)
+        self.order = self.order[self.next_card:] + list(card_list)
+        self.next_card = 0
+        self.rng.shuffle(self.order)
+
+    def remove_card(self, c):
+        CardPile.remove_card(self, c)
+        del self.order[self.order.index(c, self.next_card)]
+
+    def remove_all_cards(self):
+        self.order = []
+        self.next_card = 0
+        return CardPile.remove_all_cards(self)
+
+    def shuffle(self):
+        self.order = self.order[self.next_card:]
+        self.next_card = 0
+        self.rng.shuffle(self.order)
+
+    def draw_card(self):
+        if self.next_card >= len(self.order):
+            raise ValueError("Could not draw a card from empty card pile " + str(self) + ".")
+        c = self.order[self.next_card]
+        self.next_card += 1
+        CardPile.remove_card(self, c)
+        return c
+
+    def top_cards(self, number_of_cards):
+        """Returns the next cards to be drawn without drawing them"""
+        return self.order[self.next_card:self.next_card + number_of_cards]
+
+
 class Country:
     """Base class for a country in a game"""
 
+    __slots__ = ('name',)
+
     def __init__(self, n):
         self.name = n
 
@@ -113,9 +204,15 @@ class Country:
         return self.name
 
 
+class TwilightStruggleGameOver(Exception):
+    """Raised to stop play as soon as a game has ended"""
+
+
 class Player:
     """Base class for a player in a game"""
 
+    __slots__ = ('name',)
+
     def __init__(self, n):
         self.name = n
 
@@ -126,51 +223,337 @@ class Player:
         return self.name
 
 
-class TwilightStruggleCard(Card):
-    """Class of cards specific to the game Twilight Struggle"""
+class ZobristKeys:
+    """Deterministic 64-bit keys for Zobrist hashing of a game state"""
+
+    cache = {}
+
+    @classmethod
+    def key(cls, *parts):
+        """Returns the key for a state feature, e.g. key('defcon', 4). Keys are identical across processes."""
+        try:
+            return cls.cache[parts]
+        except KeyError:
+            digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, 'little')
+            cls.cache[parts] = value
+            return value
+
+
+class TranspositionTable:
+    """Bounded table of search results keyed by Zobrist hash, can be shared between search bots"""
+
+    def __init__(self, size=2 ** 20):
+        if size < 1 or size & (size - 1):
+            raise ValueError("Error creating transposition table. Size must be a power of two.")
+        self.size = size
+        self.mask = size - 1
+        self.entries = [None] * size
+        self.generation = 0
+        self.stored = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_search(self):
+        """Ages the stored entries so they are replaced before entries from the current search"""
+        self.generation += 1
+
+    def store(self, key, depth, value, flag='exact', move=None):
+        """Stores a result unless the slot holds a deeper result from the current search"""
+        if flag not in ['exact', 'lower', 'upper']:
+            raise ValueError("Transposition table flag must be 'exact', 'lower', or 'upper'")
+
+        index = key & self.mask
+        entry = self.entries[index]
+        if entry is None:
+            self.stored += 1
+        elif entry[5] == self.generation and entry[1] > depth:
+            return False
+
+        self.entries[index] = (key, depth, value, flag, move, self.generation)
+        return True
+
+    def probe(self, key):
+        """Returns (key, depth, value, flag, move, generation) for the hash, or None"""
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.stored = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.stored
+
+    def __repr__(self):
+        return "<TranspositionTable: %s/%s entries>" % (self.stored, self.size)
+
+
+def shared_definition(registry, name):
+    """Returns the definition of the process with the name from a list of TwilightStruggleDefinitions, so pickled
+    definitions are read back as the shared objects"""
+    for definition in getattr(TwilightStruggleDefinitions.load(), registry):
+        if definition.name == name:
+            return definition
+    raise ValueError("Error loading definition. There is no definition named " + name + " in " + registry)
+
+
+class Definition:
+    """Base class for read-only definitions shared by every game in the process. Copies of a game share the
+    definitions instead of copying them."""
+
+    __slots__ = ()
+
+    # Name of the list of TwilightStruggleDefinitions holding the definitions of the class
+    registry = None
+
+    def _set(self, attribute, value):
+        object.__setattr__(self, attribute, value)
+
+    def __setattr__(self, attribute, value):
+        raise AttributeError("Cannot change " + attribute + " of " + str(self) + ". Definitions are read-only.")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return shared_definition, (self.registry, self.name)
+
+    def __str__(self):
+        return self.name
+
+
+class TwilightStruggleCardDefinition(Definition):
+    """Static attributes of a Twilight Struggle card, as read from the card list"""
+
+    __slots__ = ('name', 'number', 'period', 'event_type', 'ops', 'removed', 'optional', 'effect_turn',
+                 'effect_side')
+
+    registry = 'cards'
 
     def __init__(self, n, no, p, e, o, r, opt, e_turn, e_side):
-        Card.__init__(self, n)
+        self._set('name', n)
 
         if not no.isdigit():
             raise ValueError("Error creating Twilight Struggle Card. Number parameter must be a number")
-        self.number = int(no)
+        self._set('number', int(no))
 
         if p not in ['early war', 'mid war', 'late war']:
             raise ValueError("Error creating Twilight Struggle Card. Period parameter must be one of early war, mid war, or late war")
-        self.period = p
+        self._set('period', p)
 
         if e not in ['scoring', 'usa', 'ussr', 'neutral']:
             raise ValueError("Error creating Twilight Struggle Card. Event type must be scoring, usa, ussr, or neutral")
-        self.event_type = e
+        self._set('event_type', e)
 
         if not o.isdigit() and (int(o) > 4 or int(o) < 0):
             raise ValueError("Error creating Twilight Struggle Card. Ops must be a number between 0 and 4")
-        self.ops = int(o)
+        self._set('ops', int(o))
 
         if not r.isdigit() and int(r) != 1 and int(r) != 0:
             raise ValueError("Error creating Twilight Struggle Card. Removed parameter must be a 1 or a 0")
-        self.removed = True if int(r) == 1 else False
+        self._set('removed', True if int(r) == 1 else False)
 
         if not opt.isdigit() and int(opt) != 1 and int(opt) != 0:
             raise ValueError("Error creating Twilight Struggle Card. Optional parameter must be a 1 or 0")
-        self.optional = True if int(opt) == 1 else False
+        self._set('optional', True if int(opt) == 1 else False)
 
         if e_turn not in ['TRUE', '']:
             raise ValueError("Error creating Twilight Struggle country. Battleground must be True or False.")
-        self.effect_turn = True if e_turn == 'TRUE' else False
+        self._set('effect_turn', True if e_turn == 'TRUE' else False)
 
         if e_side not in ['usa', 'ussr', 'both', 'choose', '']:
             raise ValueError("Error creating Twilight Struggle Card. Event type must be scoring, usa, ussr, or neutral")
-        self.effect_side = e_side
+        self._set('effect_side', e_side)
+
+    def __repr__(self):
+        return "<TwilightStruggleCardDefinition: %s>" % self.name
+
+
+class TwilightStruggleCountryDefinition(Definition):
+    """Static attributes of a Twilight Struggle country, as read from the country and border lists"""
+
+    __slots__ = ('name', 'region', 'subregion', 'stability', 'battleground', 'usa_influence', 'ussr_influence',
+                 'controlled', 'borders', 'id', 'border_ids')
+
+    registry = 'countries'
+
+    def __init__(self, n, r, sr, st, bg, usa_i, ussr_i, c, borders=(), country_id=None):
+        self._set('name', n)
+        self._set('id', country_id)
+
+        if r not in ['Africa', 'Asia', 'Central America', 'Europe', 'Middle East', 'South America']:
+            raise ValueError("Error creating Twilight Struggle country. Region must be one of: Africa, Asia, Central America, Europe, Middle East, or South America")
+        self._set('region', r)
+
+        if sr not in ['Both Europe', 'Eastern Europe', 'Western Europe', 'Southeast Asia', '']:
+            raise ValueError("Error creating Twilight Struggle country. Subregion must be one of: 'Both Europe', 'Eastern Europe', 'Western Europe', or 'Southeast Asia'")
+        self._set('subregion', sr)
+
+        if not st.isdigit() and (int(st) > 4 or int(st) < 1):
+            raise ValueError("Error creating Twilight Struggle country. Stability must be a number between 1 and 4")
+        self._set('stability', int(st))
+
+        if bg not in ['TRUE', 'FALSE']:
+            raise ValueError("Error creating Twilight Struggle country. Battleground must be True or False.")
+        self._set('battleground', True if bg == 'TRUE' else False)
+
+        if not usa_i.isdigit():
+            raise ValueError("Error creating Twilight Struggle country. USA influence must be a number.")
+        self._set('usa_influence', int(usa_i))
+
+        if not ussr_i.isdigit():
+            raise ValueError("Error creating Twilight Struggle country. USSR influence must be a number.")
+        self._set('ussr_influence', int(ussr_i))
+
+        if c not in ['usa', 'ussr', '']:
+            raise ValueError("Error creating Twilight Struggle country. Controlled must be 'usa', 'ussr', or ''")
+        self._set('controlled', c)
+
+        self._set('borders', tuple(borders))
+
+        # IDs of the bordering countries, filled in once every country is loaded
+        self._set('border_ids', ())
+
+    def __repr__(self):
+        return "<TwilightStruggleCountryDefinition: %s>" % self.name
+
+
+class TwilightStruggleDefinitions:
+    """Card, country and initial influence definitions, loaded once and shared by every game in the process.
+
+    Loading the definitions before starting a pool of worker processes shares them between the workers."""
+
+    loaded = None
+
+    def __init__(self):
+        self.cards = []
+        self.countries = []
+        self.initial_influence = []
+
+        with open('cards/card_list.csv', 'r') as handle:
+            header = handle.readline()
+            lines = handle.read().splitlines()
 
-        self.played = False
-        self.effect_active = False
+        for line in lines:
+            self.cards.append(TwilightStruggleCardDefinition(*line.split(',')))
+
+        with open('countries/borders_list.csv', 'r') as b_handle:
+            b_header = b_handle.readline()
+            b_lines = b_handle.read().splitlines()
+
+        borders = {}
+        for b_line in b_lines:
+            borders_list = b_line.split(',')
+            borders_list[:] = [x for x in borders_list if x]
+            borders.update({borders_list[0]: borders_list[1:]})
+
+        with open('countries/country_list.csv', 'r') as c_handle:
+            country_header = c_handle.readline()
+            c_lines = c_handle.read().splitlines()
+
+        for c_line in c_lines:
+            country_list = c_line.split(',')
+            self.countries.append(TwilightStruggleCountryDefinition(*country_list,
+                                                                    borders=borders.get(country_list[0], ()),
+                                                                    country_id=len(self.countries)))
+
+        country_ids = {country.name: country.id for country in self.countries}
+        for country in self.countries:
+            country._set('border_ids', tuple(country_ids[border] for border in country.borders if border in country_ids))
+
+        with open('countries/initial_influence.csv', 'r') as i_handle:
+            i_header = i_handle.readline()
+            i_lines = i_handle.read().splitlines()
+
+        for i_line in i_lines:
+            initial_influence_list = i_line.split(',')
+            initial_influence_list[:] = [x for x in initial_influence_list if x]
+            if initial_influence_list[0] not in ['usa', 'ussr']:
+                raise ValueError("Error adding initial influence")
+            self.initial_influence.append((initial_influence_list[0],
+                                           initial_influence_list[1],
+                                           int(initial_influence_list[2])))
+
+    @classmethod
+    def load(cls):
+        if cls.loaded is None:
+            cls.loaded = cls()
+        return cls.loaded
+
+
+class TwilightStruggleCard(Card):
+    """Class of cards specific to the game Twilight Struggle. Holds the state of one card in one game."""
+
+    # Attributes that change during a game, everything else is read from the shared definition
+    state_slots = ('definition', 'effect_side', 'effect_player', 'game', '_played', '_effect_active')
+    __slots__ = state_slots
+
+    number = property(attrgetter('definition.number'))
+    period = property(attrgetter('definition.period'))
+    event_type = property(attrgetter('definition.event_type'))
+    ops = property(attrgetter('definition.ops'))
+    removed = property(attrgetter('definition.removed'))
+    optional = property(attrgetter('definition.optional'))
+    effect_turn = property(attrgetter('definition.effect_turn'))
+    id = property(attrgetter('definition.number'))
+
+    def __init__(self, definition):
+        Card.__init__(self, definition.name)
+        self.definition = definition
+
+        # Latin American Death Squads sets the side of its effect when it is played
+        self.effect_side = definition.effect_side
+        self.effect_player = ''
+
+        # Game that owns the card, updated with any change to the hashed flags
+        self.game = None
+        self._played = False
+        self._effect_active = False
+
+    @property
+    def played(self):
+        return self._played
+
+    @played.setter
+    def played(self, played):
+        if self.game is not None and played != self._played:
+            self.game.zobrist ^= ZobristKeys.key('played', self.name)
+            self.game.invalidate_eligibility('played')
+        self._played = played
+
+    @property
+    def effect_active(self):
+        return self._effect_active
+
+    @effect_active.setter
+    def effect_active(self, active):
+        changed = active != self._effect_active
+        self._effect_active = active
+        if self.game is not None and changed:
+            self.game.zobrist ^= ZobristKeys.key('effect', self.name)
+            self.game.register_effect(self)
 
 
 class TwilightStruggleChinaCard(Card):
     """Class for the china card"""
 
+    static_slots = ('number', 'ops', 'event_type', 'removed')
+    state_slots = ('owner', 'game', '_face_up')
+    __slots__ = static_slots + state_slots
+
+    id = property(attrgetter('number'))
+
     def __init__(self, n, no, o):
         Card.__init__(self, n)
 
@@ -182,26 +565,48 @@ class TwilightStruggleChinaCard(Card):
             raise ValueError("Error creating Twilight Struggle China Card. Ops must be a number between 0 and 4")
         self.ops = int(o)
 
-        self.face_up = True
+        self.game = None
+        self._face_up = True
         self.owner = ''
         self.event_type = 'neutral'
         self.removed = False
 
+    @property
+    def face_up(self):
+        return self._face_up
+
+    @face_up.setter
+    def face_up(self, face_up):
+        if self.game is not None and face_up != self._face_up:
+            self.game.zobrist ^= ZobristKeys.key('china face down')
+        self._face_up = face_up
+
     def flip_face_up(self):
         self.face_up = True
         log_string = "China card is face up and available to play."
-        print(log_string)
+        if self.game is not None:
+            self.game.log(log_string)
+        else:
+            print(log_string)
 
 
 class TwilightStrugglePlayer(Player):
     """Class of players specific to Twilight Struggle"""
 
-    def __init__(self, n, s, o):
+    static_slots = ('side', 'opponent', 'bot', 'side_id')
+    state_slots = ('phasing', 'space_level', 'military_ops', 'winner', 'space_attempts', 'ops_adjustment')
+    __slots__ = static_slots + state_slots
+
+    def __init__(self, n, s, o, bot=None):
         Player.__init__(self, n)
 
+        # Bot making the decisions for this player, None when the player is a person
+        self.bot = bot
+
         if s not in ['usa', 'ussr']:
             raise ValueError("Error creating Twilight Struggle country. Controlled must be 'usa' or 'ussr'")
         self.side = s
+        self.side_id = side_ids[s]
 
         if o not in ['usa', 'ussr']:
             raise ValueError("Error creating Twilight Struggle country. Controlled must be 'usa' or 'ussr'")
@@ -223,41 +628,45 @@ class TwilightStrugglePlayer(Player):
         self.ops_adjustment = 0
 
 
-class TwilightStruggleCountry(Country):
-    """Class of countries specific to Twilight Struggle"""
-
-    def __init__(self, n, r, sr, st, bg, usa_i, ussr_i, c):
-        Country.__init__(self, n)
+class RandomBot:
+    """Bot that makes every decision at random"""
 
-        if r not in ['Africa', 'Asia', 'Central America', 'Europe', 'Middle East', 'South America']:
-            raise ValueError("Error creating Twilight Struggle country. Region must be one of: Africa, Asia, Central America, Europe, Middle East, or South America")
-        self.region = r
+    name = 'random'
 
-        if sr not in ['Both Europe', 'Eastern Europe', 'Western Europe', 'Southeast Asia', '']:
-            raise ValueError("Error creating Twilight Struggle country. Subregion must be one of: 'Both Europe', 'Eastern Europe', 'Western Europe', or 'Southeast Asia'")
-        self.subregion = sr
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
 
-        if not st.isdigit() and (int(st) > 4 or int(st) < 1):
-            raise ValueError("Error creating Twilight Struggle country. Stability must be a number between 1 and 4")
-        self.stability = int(st)
+    def choose(self, game, side, decision, options):
+        """Returns one of the options. Decision is one of 'card', 'country', 'option', 'amount', 'confirm', or
+        'action'. None in the options cancels the decision, this bot only cancels when there is no other option."""
+        choices = [option for option in options if option is not None]
+        if len(choices) == 0:
+            return None
+        return self.rng.choice(choices)
 
-        if bg not in ['TRUE', 'FALSE']:
-            raise ValueError("Error creating Twilight Struggle country. Battleground must be True or False.")
-        self.battleground = True if bg == 'TRUE' else False
 
-        if not usa_i.isdigit():
-            raise ValueError("Error creating Twilight Struggle country. USA influence must be a number.")
-        self.usa_influence = int(usa_i)
-
-        if not ussr_i.isdigit():
-            raise ValueError("Error creating Twilight Struggle country. USSR influence must be a number.")
-        self.ussr_influence = int(ussr_i)
-
-        if c not in ['usa', 'ussr', '']:
-            raise ValueError("Error creating Twilight Struggle country. Controlled must be 'usa', 'ussr', or ''")
-        self.controlled = c
-
-        self.borders = []
+class TwilightStruggleCountry(Country):
+    """Class of countries specific to Twilight Struggle. Holds the state of one country in one game."""
+
+    # Attributes that change during a game, everything else is read from the shared definition
+    # Battleground can change during a game through Formosan Resolution
+    state_slots = ('definition', 'battleground', 'usa_influence', 'ussr_influence', 'controlled', 'nato')
+    __slots__ = state_slots
+
+    region = property(attrgetter('definition.region'))
+    subregion = property(attrgetter('definition.subregion'))
+    stability = property(attrgetter('definition.stability'))
+    borders = property(attrgetter('definition.borders'))
+    id = property(attrgetter('definition.id'))
+    border_ids = property(attrgetter('definition.border_ids'))
+
+    def __init__(self, definition):
+        Country.__init__(self, definition.name)
+        self.definition = definition
+        self.battleground = definition.battleground
+        self.usa_influence = definition.usa_influence
+        self.ussr_influence = definition.ussr_influence
+        self.controlled = definition.controlled
         self.nato = False
 
 
@@ -267,8 +676,33 @@ class TwilightStruggleGame(CardGame):
     turns = 10
     action_rounds = {1: 6, 2: 6, 3: 6, 4: 7, 5: 7, 6: 7, 7: 7, 8: 7, 9: 7, 10: 7}
 
-    def __init__(self, n, d, opt, extra):
-        CardGame.__init__(self, n, d)
+    # Points for presence, domination and control of each region, control of Europe wins the game
+    region_points = {'Asia':            (3, 7, 9),
+                     'Europe':          (3, 7, 100),
+                     'Middle East':     (3, 5, 7),
+                     'Africa':          (1, 4, 6),
+                     'Central America': (1, 3, 5),
+                     'South America':   (2, 5, 6)}
+
+    # Points in the rules where active effects are checked, and the cards whose effects apply there.
+    # Effects that last until the end of the turn are also registered under 'turn cleanup'.
+    effect_hooks = {'coup roll': ['Vietnam Revolts', 'Latin American Death Squads', 'SALT Negotiations'],
+                    'coup result': ['Nuclear Subs', 'Yuri and Samantha', 'Cuban Missile Crisis'],
+                    'coup restriction': ['US/Japan Mutual Defense Pact', 'The Reformer'],
+                    'realignment roll': ['Iran-Contra Scandal'],
+                    'realignment restriction': ['US/Japan Mutual Defense Pact'],
+                    'placement': ['Chernobyl', 'Vietnam Revolts'],
+                    'scoring': ['Shuttle Diplomacy', 'Formosan Resolution'],
+                    'action round': ['Quagmire', 'Bear Trap', '"We Will Bury You"', 'Cuban Missile Crisis',
+                                     'Missile Envy'],
+                    'event': ['Flower Power', 'U2 Incident'],
+                    'turn end': ['North Sea Oil']}
+
+    def __init__(self, n, d, opt, extra, seed=None, bots=None, log_sink=print):
+        CardGame.__init__(self, n, d, seed)
+
+        # Where the log of the game is written, None for a silent game. Reports for clients go to report_sink.
+        self.log_sink = log_sink
 
         if not opt.isdigit() and int(opt) != 1 and int(opt) != 0:
             raise ValueError("Error creating Twilight Struggle game. Optional cards parameter must be a 1 or a 0.")
@@ -294,6 +728,40 @@ class TwilightStruggleGame(CardGame):
         self.norad_check = False
         self.usa_handicap = 0
         self.ussr_handicap = 0
+        self.handicap_set = False
+        self.end_reason = ''
+        self.trajectory = []
+
+        # History for game records: headlines as [turn, side, card number] and the score change of each scoring
+        # card event as [turn, card number, change]
+        self.headlines = []
+        self.event_scores = []
+
+        # Number of cards each side has drawn in each turn, which is public
+        self.cards_drawn = {'usa': {}, 'ussr': {}}
+
+        # Scoring and die roll reports are only formatted when there is a sink to send them to. The structured
+        # results of the latest scoring, coup attempt and realignment roll are always kept.
+        self.report_sink = print
+        self.last_scoring = None
+        self.last_coup_attempt = None
+        self.last_realignment_roll = None
+        self.region_evaluation = None
+
+        # Bot decisions made so far, a game needing more than the maximum has stalled
+        self.decisions = 0
+        self.max_decisions = 50000
+
+        # Index of the option chosen in every bot decision, so the game can be replayed from its seed. A choice that
+        # is not one of the options cannot be logged, and the game can no longer be replayed.
+        self.decision_log = []
+        self.replayable = True
+
+        # Seconds a bot may take for each decision, None for no limit. Bots that search read the deadline of the
+        # current decision, decisions returned after it are counted.
+        self.decision_time = None
+        self.decision_deadline = None
+        self.late_decisions = 0
 
         self.cards = {}
         self.countries = {}
@@ -319,54 +787,65 @@ class TwilightStruggleGame(CardGame):
 
         self.line = '--------------------------------'
 
+        # Static card and country definitions shared by every game
+        self.definitions = TwilightStruggleDefinitions.load()
+
+        # Zobrist hash of the game state, updated incrementally with every change
+        self.zobrist = 0
+        self.hashed_influence = {}
+
+        # Countries each side can place influence in, by country ID, updated when influence comes or goes
+        self.access_counts = {'usa': {}, 'ussr': {}}
+        self.accessible_cache = {'usa': None, 'ussr': None}
+
+        # Active effects by hook point, so rules only check the effects that are in play
+        self.active_effects = {}
+
+        # Cached event eligibility, with versions of the state inputs it was computed from
+        self.eligibility_cache = {}
+        self.eligibility_versions = {'played': 0, 'control': 0, 'space': 0, 'defcon': 0}
+
         self.__create_piles()
         self.__create_cards()
         self.__create_countries()
         self.__create_players()
+        self.__index_by_id()
         self.__set_up_game()
+        self.reset_zobrist_hash()
+        self.reset_accessibility()
+        self.reset_active_effects()
 
-    def __create_cards(self):
-        with open('cards/card_list.csv', 'r') as handle:
-            header = handle.readline()
-            lines = handle.read().splitlines()
+        if bots is not None:
+            for side, bot in bots.items():
+                self.sides[side].bot = bot
 
-        for line in lines:
-            card = TwilightStruggleCard(*line.split(','))
-            if not self.optional_cards and card.optional:
+    def __create_cards(self):
+        for definition in self.definitions.cards:
+            if not self.optional_cards and definition.optional:
                 continue
+            card = TwilightStruggleCard(definition)
             start_pile = self.get_pile(card.period)
             if not start_pile:
                 raise ValueError("Error adding card " + str(card) + " to pile " + str(start_pile) + ".")
             start_pile.add_card(card)
+            card.game = self
             self.cards.update({card.name: card})
 
         china_card = TwilightStruggleChinaCard('China', '6', '4')
+        china_card.game = self
         self.cards.update({china_card.name: china_card})
 
     def __create_countries(self):
-        with open('countries/country_list.csv', 'r') as c_handle:
-            country_header = c_handle.readline()
-            c_lines = c_handle.read().splitlines()
-
-        for c_line in c_lines:
-            country = TwilightStruggleCountry(*c_line.split(','))
+        for definition in self.definitions.countries:
+            country = TwilightStruggleCountry(definition)
             self.countries.update({country.name: country})
 
-        with open('countries/borders_list.csv', 'r') as b_handle:
-            b_header = b_handle.readline()
-            b_lines = b_handle.read().splitlines()
-
-        for b_line in b_lines:
-            borders_list = b_line.split(',')
-            borders_list[:] = [x for x in borders_list if x]
-            self.countries[borders_list[0]].borders = borders_list[1:]
-
     def __create_piles(self):
-        pile_list = ['early war', 'mid war', 'late war', 'deck', 'discard', 'removed', 'USA hand', 'USSR hand',
-                     'USA China', 'USSR China']
-
-        for pile in pile_list:
-            self.add_pile(CardPile(pile))
+        for pile in pile_names:
+            if pile == 'deck':
+                self.add_pile(DrawPile(pile, self.deal_rng))
+            else:
+                self.add_pile(CardPile(pile))
 
     def __create_players(self):
         # TODO - Change the "create players" function to allow for user input
@@ -378,6 +857,19 @@ class TwilightStruggleGame(CardGame):
             self.players.update({player.name: player})
             self.sides.update({player.side: player})
 
+    def __index_by_id(self):
+        # Lists indexed by integer ID, unused card numbers (optional cards left out of the game) hold None
+        self.cards_by_id = [None] * (max(card.number for card in self.cards.values()) + 1)
+        for card in self.cards.values():
+            self.cards_by_id[card.id] = card
+        self.countries_by_id = sorted(self.countries.values(), key=attrgetter('id'))
+        self.piles_by_id = [self.piles[name] for name in pile_names]
+        self.sides_by_id = [self.sides[name] for name in side_names]
+
+        self.countries_by_region = {}
+        for country in self.countries.values():
+            self.countries_by_region.setdefault(country.region, []).append(country)
+
     def __set_up_game(self):
         # 3.1 Add the early war cards to the deck and deal out cards
         self.move_all_cards('deck', 'early war')
@@ -388,31 +880,104 @@ class TwilightStruggleGame(CardGame):
         self.cards['China'].flip_face_up()
 
         # 3.2 - 3.3 Add initial influence
-        with open('countries/initial_influence.csv', 'r') as i_handle:
-            i_header = i_handle.readline()
-            i_lines = i_handle.read().splitlines()
+        for side, country_name, influence in self.definitions.initial_influence:
+            if side == 'usa':
+                self.countries[country_name].usa_influence = influence
+            elif side == 'ussr':
+                self.countries[country_name].ussr_influence = influence
+            self.check_for_control(country_name)
 
-        for i_line in i_lines:
-            initial_influence_list = i_line.split(',')
-            initial_influence_list[:] = [x for x in initial_influence_list if x]
+        log_string = "Setup complete\n" + self.line
+        self.log(log_string)
+
+    # Functions for Zobrist hashing
+    def compute_zobrist_hash(self):
+        """Computes the Zobrist hash of the current game state from scratch"""
+        key = ZobristKeys.key
+        zobrist = 0
 
-            if initial_influence_list[0] == 'usa':
-                self.countries[initial_influence_list[1]].usa_influence = int(initial_influence_list[2])
-            elif initial_influence_list[0] == 'ussr':
-                self.countries[initial_influence_list[1]].ussr_influence = int(initial_influence_list[2])
+        for country in self.countries.values():
+            zobrist ^= key('influence', country.name, 'usa', country.usa_influence)
+            zobrist ^= key('influence', country.name, 'ussr', country.ussr_influence)
+
+        for pile_name, pile in self.piles.items():
+            for card_name in pile.cards:
+                zobrist ^= key('pile', card_name, pile_name)
+
+        for card in self.cards.values():
+            if card.name == 'China':
+                if not card.face_up:
+                    zobrist ^= key('china face down')
             else:
-                raise ValueError("Error adding initial influence")
-            self.check_for_control(initial_influence_list[1])
+                if card.played:
+                    zobrist ^= key('played', card.name)
+                if card.effect_active:
+                    zobrist ^= key('effect', card.name)
+
+        zobrist ^= key('defcon', self.defcon)
+        zobrist ^= key('score', self.score)
+        for side, player in self.sides.items():
+            zobrist ^= key('space', side, player.space_level)
+            zobrist ^= key('military ops', side, player.military_ops)
+
+        return zobrist
+
+    def reset_zobrist_hash(self):
+        self.zobrist = self.compute_zobrist_hash()
+        self.hashed_influence = {}
+        for country in self.countries.values():
+            self.hashed_influence[country.name] = (country.usa_influence, country.ussr_influence)
+
+    def rehash(self, old_feature, new_feature):
+        """Swaps one state feature for another in the Zobrist hash"""
+        if old_feature != new_feature:
+            self.zobrist ^= ZobristKeys.key(*old_feature) ^ ZobristKeys.key(*new_feature)
+
+    def rehash_influence(self, country):
+        hashed_usa, hashed_ussr = self.hashed_influence.get(country.name, (0, 0))
+        self.rehash(('influence', country.name, 'usa', hashed_usa),
+                    ('influence', country.name, 'usa', country.usa_influence))
+        self.rehash(('influence', country.name, 'ussr', hashed_ussr),
+                    ('influence', country.name, 'ussr', country.ussr_influence))
+        self.hashed_influence[country.name] = (country.usa_influence, country.ussr_influence)
+
+    # Functions for the active effect registry
+    def effect_hook_points(self, card):
+        hooks = [hook for hook, card_names in self.effect_hooks.items() if card.name in card_names]
+        if card.effect_turn:
+            hooks.append('turn cleanup')
+        return hooks
+
+    def register_effect(self, card):
+        """Adds a card to, or removes it from, the registry after its effect is turned on or off"""
+        for hook in self.effect_hook_points(card):
+            if card.effect_active:
+                self.active_effects[hook][card.name] = card
+            else:
+                self.active_effects[hook].pop(card.name, None)
 
-        log_string = "Setup complete\n" + self.line
-        print(log_string)
+    def reset_active_effects(self):
+        self.active_effects = {hook: {} for hook in self.effect_hooks}
+        self.active_effects['turn cleanup'] = {}
+        for card in self.cards.values():
+            if card.name != 'China' and card.effect_active:
+                self.register_effect(card)
+
+    # Functions to write the log and send reports
+    def log(self, log_string):
+        if self.log_sink is not None:
+            self.log_sink(log_string)
+
+    def report(self, format_report, *arguments):
+        if self.report_sink is not None:
+            self.report_sink(format_report(*arguments))
 
     # Function to adjust defcon
     def change_defcon(self, adjustment_value):
         initial_defcon = self.defcon
         self.defcon = self.defcon + adjustment_value
         log_string = "DEFCON changed by {a}".format(a=adjustment_value)
-        print(log_string)
+        self.log(log_string)
 
         # Adjust defcon to 5 if above 5
         if self.defcon > 5:
@@ -421,8 +986,11 @@ class TwilightStruggleGame(CardGame):
         if self.defcon < 2:
             self.defcon = 1
 
+        self.rehash(('defcon', initial_defcon), ('defcon', self.defcon))
+        self.invalidate_eligibility('defcon')
+
         log_string = "DEFCON is now {d}".format(d=self.defcon)
-        print(log_string)
+        self.log(log_string)
 
         self.check_defcon_game_end()
 
@@ -433,9 +1001,11 @@ class TwilightStruggleGame(CardGame):
     def change_defcon_to_value(self, value):
         initial_defcon = self.defcon
         self.defcon = value
+        self.rehash(('defcon', initial_defcon), ('defcon', self.defcon))
+        self.invalidate_eligibility('defcon')
         self.check_defcon_game_end()
         log_string = "DEFCON is now {d}".format(d=self.defcon)
-        print(log_string)
+        self.log(log_string)
 
         # Event 106 - NORAD
         if initial_defcon != 2 and self.defcon == 2:
@@ -444,32 +1014,47 @@ class TwilightStruggleGame(CardGame):
     def check_defcon_game_end(self):
         if self.defcon < 2:
             log_string = "Game over by DEFCON. Winner: {s}".format(s=self.opponent[self.phasing].upper())
-            print(log_string)
-            self.sides[self.opponent[self.phasing]].winner = True
-            self.game_active = False
-            self.action_round_complete = True
-            quit()
+            self.log(log_string)
+            self.end_game(self.opponent[self.phasing], 'defcon')
+
+    def end_game(self, winner, reason):
+        """Ends the game immediately. Winner is 'usa', 'ussr', or '' for no winner."""
+        if winner != '':
+            self.sides[winner].winner = True
+        self.game_active = False
+        self.action_round_complete = True
+        self.end_reason = reason
+        raise TwilightStruggleGameOver(reason)
+
+    def get_winner(self):
+        for side, player in self.sides.items():
+            if player.winner:
+                return side
+        return ''
 
     # Functions to modify influence
     def check_for_control(self, c):
+        previously_controlled = self.countries[c].controlled
         if (self.countries[c].usa_influence - self.countries[c].ussr_influence) >= self.countries[c].stability:
             self.countries[c].controlled = 'usa'
         elif (self.countries[c].ussr_influence - self.countries[c].usa_influence) >= self.countries[c].stability:
             self.countries[c].controlled = 'ussr'
         else:
             self.countries[c].controlled = ''
+        if self.countries[c].controlled != previously_controlled:
+            self.invalidate_eligibility('control')
+        self.update_accessibility(self.countries[c])
+        self.rehash_influence(self.countries[c])
         self.print_influence(c)
 
     def get_adjacent_controlled(self, country, side):
         """Gives list of countries that border the inputted country that are controlled by the inputted side"""
         adjacent_controlled = []
-        border_list = country.borders
+        countries_by_id = self.countries_by_id
 
-        for border in border_list:
-            if border == 'USA' or border == 'USSR':
-                pass
-            elif self.countries[border].controlled == side:
-                adjacent_controlled.append(self.countries[border])
+        for border_id in country.border_ids:
+            if countries_by_id[border_id].controlled == side:
+                adjacent_controlled.append(countries_by_id[border_id])
 
         return adjacent_controlled
 
@@ -546,40 +1131,35 @@ class TwilightStruggleGame(CardGame):
                                                                          usa_c=usa_controlled,
                                                                          ussr_i=ussr_inf,
                                                                          ussr_c=ussr_controlled)
-        print(log_string)
+        self.log(log_string)
         return log_string
 
     # Functions to modify the score
     def check_game_end(self):
         if self.score >= 20:
-            self.sides['usa'].winner = True
-            self.game_active = False
-            self.action_round_complete = True
             log_string = "Game over by score. Winner: USA"
-            print(log_string)
-            quit()
+            self.log(log_string)
+            self.end_game('usa', 'score')
         elif self.score <= -20:
-            self.sides['ussr'].winner = True
-            self.game_active = False
-            self.action_round_complete = True
             log_string = "Game over by score. Winner: USSR"
-            print(log_string)
-            quit()
+            self.log(log_string)
+            self.end_game('ussr', 'score')
 
     def change_score(self, points):
         # Event 50 - "We Will Bury You" > give USSR 3 points first
         if self.we_will_un_check and points > 0:
             ui_string = 'Event 50 - We Will Bury You: USA did not play UN Intervention.'
-            print(ui_string)
+            self.log(ui_string)
             self.change_score_by_side('ussr', 3)
             self.we_will_un_check = False
+        self.rehash(('score', self.score), ('score', self.score + points))
         self.score = self.score + points
         if points > 0:
             log_string = "USA scored {p} points. Score is now {score}.".format(p=points, score=self.score)
-            print(log_string)
+            self.log(log_string)
         elif points < 0:
             log_string = "USSR scored {p} points. Score is now {score}.".format(p=abs(points), score=self.score)
-            print(log_string)
+            self.log(log_string)
 
         self.check_game_end()
 
@@ -588,35 +1168,43 @@ class TwilightStruggleGame(CardGame):
             # Event 50 - "We Will Bury You" > give USSR 3 points first
             if self.we_will_un_check:
                 ui_string = 'Event 50 - We Will Bury You: USA did not play UN Intervention.'
-                print(ui_string)
+                self.log(ui_string)
                 self.change_score_by_side('ussr', 3)
                 self.we_will_un_check = False
+            self.rehash(('score', self.score), ('score', self.score + points))
             self.score = self.score + points
         elif side == 'ussr':
+            self.rehash(('score', self.score), ('score', self.score - points))
             self.score = self.score - points
         log_string = "{s} scored {p} points. Score is now {score}.".format(s=side.upper(), p=points, score=self.score)
-        print(log_string)
+        self.log(log_string)
         self.check_game_end()
 
     def get_score_in_regions(self):
         scores = {}
-        scores.update({'Asia': [3, 7, 9, self.score_card('Asia', 3, 7, 9)]})
-        scores.update({'Europe': [3, 7, 'Win', self.score_card('Europe', 3, 7, 100)]})
-        scores.update({'Middle East': [3, 5, 7, self.score_card('Middle East', 3, 5, 7)]})
-        scores.update({'Africa': [1, 4, 6, self.score_card('Africa', 1, 4, 6)]})
-        scores.update({'Central America': [1, 3, 5, self.score_card('Central America', 1, 3, 5)]})
-        scores.update({'South America': [2, 5, 6, self.score_card('South America', 2, 5, 6)]})
+        scorings = self.evaluate_regions()
+        for region in ['Asia', 'Europe', 'Middle East', 'Africa', 'Central America', 'South America']:
+            presence, domination, control = self.region_points[region]
+            if region == 'Europe':
+                control = 'Win'
+            scores.update({region: [presence, domination, control, scorings[region]['points']]})
 
         if not self.which_pile(self.cards['Southeast Asia Scoring']) == 'removed':
             scores.update({'Southeast Asia': self.southeast_asia_scoring()})
 
-        print("Current scores:")
+        self.report(self.format_region_scores, scores)
+        return scores
+
+    def format_region_scores(self, scores):
+        log_lines = ["Current scores:"]
         for score in scores:
             if score == 'Southeast Asia':
-                print("{s:>3} | {n:15}".format(s=scores[score], n=score))
+                log_lines.append("{s:>3} | {n:15}".format(s=scores[score], n=score))
             else:
-                print("{0:>3} | {1:15} [{2:^3}|{3:^3}|{4:^3}]".format(scores[score][3], score, scores[score][0],
-                                                                      scores[score][1], scores[score][2]))
+                log_lines.append("{0:>3} | {1:15} [{2:^3}|{3:^3}|{4:^3}]".format(scores[score][3], score,
+                                                                                 scores[score][0], scores[score][1],
+                                                                                 scores[score][2]))
+        return '\n'.join(log_lines)
 
     def final_scoring(self):
         self.cards['Shuttle Diplomacy'].effect_active = False
@@ -630,17 +1218,18 @@ class TwilightStruggleGame(CardGame):
         total = asia + europe + middle_east + central_america + africa + south_america
 
         log_string = 'Final scoring:'
-        print(log_string)
+        self.log(log_string)
         self.change_score(total)
 
         # Score china card
         owner = self.who_has_china()
         log_string = "{s} collects bonus for holding China.".format(s=owner.upper())
-        print(log_string)
+        self.log(log_string)
         self.change_score_by_side(owner, 1)
 
         # End the game
         self.game_active = False
+        self.end_reason = 'final scoring'
         winner = ''
         if self.score < 0:
             winner = 'USSR'
@@ -653,7 +1242,7 @@ class TwilightStruggleGame(CardGame):
 
         self.action_round_complete = True
         log_string = "Game over. Winner: {w}".format(w=winner)
-        print(log_string)
+        self.log(log_string)
 
     # Functions for space race
     def space_race_awards(self, s):
@@ -670,9 +1259,35 @@ class TwilightStruggleGame(CardGame):
         if self.sides[s].space_level == 8:
             pass
         else:
+            self.rehash(('space', s, self.sides[s].space_level), ('space', s, self.sides[s].space_level + 1))
             self.sides[s].space_level += 1
+            self.invalidate_eligibility('space')
             self.space_race_awards(s)
 
+    # Functions to look up cards, countries, piles and sides by integer ID, for code that holds IDs in arrays. The
+    # rules and the UI use names.
+    def card_by_id(self, card_id):
+        return self.cards_by_id[card_id]
+
+    def country_by_id(self, country_id):
+        return self.countries_by_id[country_id]
+
+    def pile_by_id(self, pile_id):
+        return self.piles_by_id[pile_id]
+
+    def side_by_id(self, side_id):
+        return self.sides_by_id[side_id]
+
+    def card_id(self, card_name):
+        return self.cards[card_name].id
+
+    def country_id(self, country_name):
+        return self.countries[country_name].id
+
+    def influence_by_id(self, country_id, side_id):
+        country = self.countries_by_id[country_id]
+        return country.usa_influence if side_id == USA else country.ussr_influence
+
     # Functions for checking access
     def countries_with_influence(self, s):
         country_list = []
@@ -685,12 +1300,7 @@ class TwilightStruggleGame(CardGame):
         return country_list
 
     def countries_in_region(self, region):
-        countries_in_region = []
-        for country in self.countries.values():
-            if country.region == region:
-                countries_in_region.append(country)
-
-        return countries_in_region
+        return list(self.countries_by_region.get(region, []))
 
     def countries_in_subregion(self, subregion):
         countries_in_subregion = []
@@ -774,18 +1384,51 @@ class TwilightStruggleGame(CardGame):
 
         return controlled_list
 
-    def accessible_countries(self, s):
-        influenced_countries = self.countries_with_influence(s)
-        accessible_countries = influenced_countries.copy()
-
-        for country in influenced_countries:
-            border_list = country.borders
-            for border in border_list:
-                if border != 'USA' and border != 'USSR':
-                    if self.countries[border] not in accessible_countries:
-                        accessible_countries.append(self.countries[border])
+    # Functions for the accessible country sets
+    def reset_accessibility(self):
+        """Counts for each side how many countries with its influence each country is in reach of, itself or a
+        neighbour. A country is accessible to the side while it has a count."""
+        self.access_counts = {'usa': {}, 'ussr': {}}
+        self.accessible_cache = {'usa': None, 'ussr': None}
+        for country in self.countries.values():
+            for side in ['usa', 'ussr']:
+                if self.get_influence(country.name, side) > 0:
+                    self.change_access(country, side, 1)
+
+    def change_access(self, country, side, change):
+        counts = self.access_counts[side]
+        for country_id in (country.id,) + country.border_ids:
+            count = counts.get(country_id, 0) + change
+            if count > 0:
+                if country_id not in counts:
+                    self.accessible_cache[side] = None
+                counts[country_id] = count
+            else:
+                del counts[country_id]
+                self.accessible_cache[side] = None
+
+    def update_accessibility(self, country):
+        """Updates the accessible countries when influence in the country goes from zero to positive or back. Reads
+        the influence before the change from the hashed influence, so must be called before rehash_influence."""
+        hashed_usa, hashed_ussr = self.hashed_influence.get(country.name, (0, 0))
+        for side, before, after in [('usa', hashed_usa, country.usa_influence),
+                                    ('ussr', hashed_ussr, country.ussr_influence)]:
+            if before == 0 and after > 0:
+                self.change_access(country, side, 1)
+            elif before > 0 and after == 0:
+                self.change_access(country, side, -1)
+
+    def is_accessible(self, country, s):
+        """Tests whether the side can place influence in the country, without building the list"""
+        return country.id in self.access_counts[s]
 
-        return accessible_countries
+    def accessible_countries(self, s):
+        """Returns the countries the side can place influence in, in order of ID. The list is only rebuilt when the
+        accessible countries change, callers get a copy they can change."""
+        if self.accessible_cache[s] is None:
+            countries_by_id = self.countries_by_id
+            self.accessible_cache[s] = [countries_by_id[country_id] for country_id in sorted(self.access_counts[s])]
+        return list(self.accessible_cache[s])
 
     def total_battlegrounds_controlled(self, side):
         country_list = []
@@ -797,14 +1440,8 @@ class TwilightStruggleGame(CardGame):
         return len(country_list)
 
     def adjacent_country_objects(self, country):
-        """Converts a country's list of borders from strings to the corresponding country objects"""
-        adjacent_country_strings = country.borders
-        adjacent_country_objects = []
-
-        for country in adjacent_country_strings:
-            adjacent_country_objects.append(self.countries[country])
-
-        return adjacent_country_objects
+        """Converts a country's list of borders to the corresponding country objects"""
+        return [self.countries_by_id[border_id] for border_id in country.border_ids]
 
     def are_all_targets_in_region(self, target_list, region):
         """Given a list of countries, checks to see if they are all in the specified region"""
@@ -854,27 +1491,29 @@ class TwilightStruggleGame(CardGame):
         current_pile = self.which_pile(c)
         self.piles[current_pile].remove_card(c)
         self.piles[pile_name].add_card(c)
+        self.rehash(('pile', c.name, current_pile), ('pile', c.name, pile_name))
         log_string = "{c} moved to {p}.".format(c=c.name, p=pile_name)
-        print(log_string)
+        self.log(log_string)
 
     def move_all_cards(self, pile_to_name, pile_from_name):
-        card_list = self.piles[pile_from_name].get_cards_in_pile().copy()
+        card_list = self.piles[pile_from_name].remove_all_cards()
+        self.piles[pile_to_name].add_cards(card_list)
         for c in card_list:
-            self.piles[pile_from_name].remove_card(self.cards[c])
-            self.piles[pile_to_name].add_card(self.cards[c])
+            self.zobrist ^= ZobristKeys.key('pile', c.name, pile_from_name) ^ ZobristKeys.key('pile', c.name, pile_to_name)
 
     def move_china_card(self, pile_to_name, face_up=False):
         current_pile = self.which_pile(self.cards['China'])
         self.piles[current_pile].remove_card(self.cards['China'])
         self.piles[pile_to_name].add_card(self.cards['China'])
+        self.rehash(('pile', 'China', current_pile), ('pile', 'China', pile_to_name))
         log_string_1 = "China card given to {s}.".format(s=self.pile_owners[pile_to_name].upper())
-        print(log_string_1)
+        self.log(log_string_1)
         if face_up:
             self.cards['China'].flip_face_up()
         else:
             self.cards['China'].face_up = False
             log_string_2 = 'China card is face down.'
-            print(log_string_2)
+            self.log(log_string_2)
 
     def who_has_china(self):
         current_pile = self.which_pile(self.cards['China'])
@@ -894,6 +1533,24 @@ class TwilightStruggleGame(CardGame):
     def reshuffle(self):
         self.move_all_cards('deck', 'discard')
 
+    def draw_card(self, pile_name):
+        """Moves the next card of the deck to the pile, reshuffling the discard pile into the deck when it is empty.
+        Returns None when there are no cards left to draw."""
+        if self.piles['deck'].get_pile_size() == 0:
+            self.reshuffle()
+            if self.piles['deck'].get_pile_size() == 0:
+                return None
+
+        dealt_card = self.piles['deck'].draw_card()
+        self.piles[pile_name].add_card(dealt_card)
+        self.rehash(('pile', dealt_card.name, 'deck'), ('pile', dealt_card.name, pile_name))
+        if pile_name in self.pile_owners:
+            drawn = self.cards_drawn[self.pile_owners[pile_name]]
+            drawn[self.turn] = drawn.get(self.turn, 0) + 1
+        log_string = "{c} moved to {p}.".format(c=dealt_card.name, p=pile_name)
+        self.log(log_string)
+        return dealt_card
+
     def deal_cards(self):
         hand_limit = {1: 8, 2: 8, 3: 8, 4: 9, 5: 9, 6: 9, 7: 9, 8: 9, 9: 9, 10: 9}
         current_hand_limit = hand_limit[self.turn]
@@ -902,13 +1559,7 @@ class TwilightStruggleGame(CardGame):
         for card_number in range(1, current_hand_limit + 1):
             for hand in hands:
                 if self.piles[hand].get_pile_size() < current_hand_limit:
-                    if self.piles['deck'].get_pile_size() > 0:
-                        dealt_card = self.piles['deck'].random_card()
-                        self.move_card(dealt_card, hand)
-                    else:
-                        self.reshuffle()
-                        dealt_card = self.piles['deck'].random_card()
-                        self.move_card(dealt_card, hand)
+                    self.draw_card(hand)
 
     def format_available_cards(self, cards_to_format):
         hand_list = []
@@ -962,17 +1613,16 @@ class TwilightStruggleGame(CardGame):
 
     # Functions to change military ops
     def add_military_ops(self, side, amount):
-        if side == 'usa':
-            self.sides['usa'].military_ops += amount
-            if self.sides['usa'].military_ops > 5:
-                self.sides['usa'].military_ops = 5
-        elif side == 'ussr':
-            self.sides['ussr'].military_ops += amount
-            if self.sides['ussr'].military_ops > 5:
-                self.sides['ussr'].military_ops = 5
-        else:
+        if side not in ['usa', 'ussr']:
             raise ValueError("Side must be 'usa' or 'ussr'")
 
+        initial_military_ops = self.sides[side].military_ops
+        self.sides[side].military_ops += amount
+        if self.sides[side].military_ops > 5:
+            self.sides[side].military_ops = 5
+
+        self.rehash(('military ops', side, initial_military_ops), ('military ops', side, self.sides[side].military_ops))
+
     def check_required_military_ops(self):
         usa_points = 0
         ussr_points = 0
@@ -990,6 +1640,8 @@ class TwilightStruggleGame(CardGame):
             self.change_score_by_side('ussr', points)
 
     def reset_military_ops(self):
+        for side, player in self.sides.items():
+            self.rehash(('military ops', side, player.military_ops), ('military ops', side, 0))
         self.sides['usa'].military_ops = 0
         self.sides['ussr'].military_ops = 0
 
@@ -1024,34 +1676,66 @@ class TwilightStruggleGame(CardGame):
 
         return eligible_cards
 
+    # Conditions on events, each reads only the parts of the game state listed with it in event_conditions
+    def prerequisite_played(self, card_name):
+        for pre_req in self.pre_reqs[card_name]:
+            if pre_req in self.cards and self.cards[pre_req].played:
+                return True
+        return False
+
+    def not_prevented(self, card_name):
+        preventing_card = self.prevents[card_name]
+        return not (preventing_card in self.cards and self.cards[preventing_card].played)
+
+    def usa_leads_battlegrounds(self, card_name):
+        return self.total_battlegrounds_controlled('usa') > self.total_battlegrounds_controlled('ussr')
+
+    def usa_leads_space_race(self, card_name):
+        return self.sides['usa'].space_level > self.sides['ussr'].space_level
+
+    def usa_controls_middle_east(self, card_name):
+        return len(self.controlled_in_region('Middle East', 'usa')) > 0
+
+    def defcon_at_2(self, card_name):
+        return self.defcon == 2
+
+    # Cards whose events have conditions. Results are cached until one of the listed inputs changes.
+    # Inputs are 'played' flags, 'control' of countries, 'space' levels and 'defcon'.
+    event_conditions = {'NATO':                     (('played',), prerequisite_played),
+                        'Solidarity':               (('played',), prerequisite_played),
+                        'Arab-Israeli War':         (('played',), not_prevented),
+                        'Socialist Governments':    (('played',), not_prevented),
+                        'OPEC':                     (('played',), not_prevented),
+                        'Willy Brandt':             (('played',), not_prevented),
+                        'Flower Power':             (('played',), not_prevented),
+                        'Muslim Revolution':        (('played',), not_prevented),
+                        'Kitchen Debates':          (('control',), usa_leads_battlegrounds),
+                        'Star Wars':                (('space',), usa_leads_space_race),
+                        'Our Man in Tehran':        (('control',), usa_controls_middle_east),
+                        'Wargames':                 (('defcon',), defcon_at_2)}
+
+    def invalidate_eligibility(self, state_input):
+        """Marks cached event eligibility that depends on the input as out of date"""
+        self.eligibility_versions[state_input] += 1
+
     def check_event_eligibility(self, card):
-        eligible = False
-        if card.name in self.pre_reqs.keys():
-            for pre_req in self.pre_reqs[card.name]:
-                if self.cards[pre_req].played:
-                    eligible = True
-        elif card.name in self.prevents.keys():
-            if not self.cards[self.prevents[card.name]].played:
-                eligible = True
-        elif card.name == 'Kitchen Debates':
-            usa_battlegrounds = self.total_battlegrounds_controlled('usa')
-            ussr_battlegrounds = self.total_battlegrounds_controlled('ussr')
-            eligible = True if usa_battlegrounds > ussr_battlegrounds else False
-        elif card.name == 'Star Wars':
-            usa_space = self.sides['usa'].space_level
-            ussr_space = self.sides['ussr'].space_level
-            eligible = True if usa_space > ussr_space else False
-        elif card.name == 'Our Man in Tehran':
-            usa_controlled_middle_east = self.controlled_in_region('Middle East', 'usa')
-            if len(usa_controlled_middle_east) > 0:
-                eligible = True
-        elif card.name == 'Wargames':
-            eligible = True if self.defcon == 2 else False
-        else:
-            eligible = True
+        if card.name not in self.event_conditions:
+            return True
 
+        state_inputs, condition = self.event_conditions[card.name]
+        versions = tuple(self.eligibility_versions[state_input] for state_input in state_inputs)
+        cached = self.eligibility_cache.get(card.name)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        eligible = condition(self, card.name)
+        self.eligibility_cache[card.name] = (versions, eligible)
         return eligible
 
+    def eligible_events(self, card_list):
+        """Returns the cards in the list whose events can be played"""
+        return [card for card in card_list if self.check_event_eligibility(card)]
+
     def trigger_event(self, card):
         eligible = self.check_event_eligibility(card)
         self.active_card = card
@@ -1059,18 +1743,22 @@ class TwilightStruggleGame(CardGame):
         if eligible:
             log_string = "Event {no} - {na}.".format(no=card.number,
                                                      na=card.name)
-            print(log_string)
+            self.log(log_string)
+            score = self.score
             self.events[card.name](self)
+            if card.event_type == 'scoring':
+                self.event_scores.append([self.turn, card.number, self.score - score])
             card.played = True
             card.effect_active = True
 
             # Check for active effects
-            self.trigger_effect(self.cards['Flower Power'])
+            if 'Flower Power' in self.active_effects['event']:
+                self.trigger_effect(self.cards['Flower Power'])
 
             # Event 60 - U2 Incident
-            if card.name == 'UN Intervention' and self.cards['U2 Incident'].effect_active:
+            if card.name == 'UN Intervention' and 'U2 Incident' in self.active_effects['event']:
                 log_string = 'Event 60 - U2 Incident activated due to UN Intervention:'
-                print(log_string)
+                self.log(log_string)
                 self.change_score_by_side('ussr', 1)
 
             if card.removed:
@@ -1101,17 +1789,17 @@ class TwilightStruggleGame(CardGame):
                                                                             a=number_adjacent,
                                                                             m=modified_die_roll,
                                                                             su=success)
-        print(log_string_1)
+        self.log(log_string_1)
         if modified_die_roll >= success:
             log_string_2 = "Success!"
-            print(log_string_2)
+            self.log(log_string_2)
             self.change_score_by_side(side, points)
             influence = self.get_influence(country.name, self.opponent[side])
             self.remove_all_influence(country.name, self.opponent[side])
             self.add_influence(country.name, side, influence)
         else:
             log_string_2 = "Failure."
-            print(log_string_2)
+            self.log(log_string_2)
 
     def score_type(self, region):
         usa_type = 'no influence'
@@ -1124,7 +1812,7 @@ class TwilightStruggleGame(CardGame):
         ussr_bgs = len(self.battlegrounds_controlled_in_region(region, 'ussr'))
 
         # Event 73 - Shuttle Diplomacy
-        if self.cards['Shuttle Diplomacy'].effect_active and (region == 'Asia' or region == 'Middle East'):
+        if 'Shuttle Diplomacy' in self.active_effects['scoring'] and (region == 'Asia' or region == 'Middle East'):
             if ussr_bgs > 0:
                 ussr_bgs = ussr_bgs - 1
                 ussr_countries = ussr_countries - 1
@@ -1146,12 +1834,15 @@ class TwilightStruggleGame(CardGame):
         return [usa_type, ussr_type]
 
     def score_card(self, region, presence, domination, control, log=False):
+        scoring_effects = self.active_effects['scoring']
+
         # Event 35 - Formosan Resolution
-        if self.cards['Formosan Resolution'].effect_active and region == 'Asia':
+        if 'Formosan Resolution' in scoring_effects and region == 'Asia':
             if self.countries['Taiwan'].controlled == 'usa':
                 self.countries['Taiwan'].battleground = True
+                self.invalidate_eligibility('control')
                 ui_string = 'Effect 35 - Formosan Resolution: Taiwan counts as battleground.'
-                print(ui_string)
+                self.log(ui_string)
 
         score_types = self.score_type(region)
         usa_score_type = score_types[0]
@@ -1175,55 +1866,175 @@ class TwilightStruggleGame(CardGame):
                         ussr_adjacent_bonus += 1
 
         # Event 73 - Shuttle Diplomacy
-        if self.cards['Shuttle Diplomacy'].effect_active and (region == 'Asia' or region == 'Middle East'):
+        if 'Shuttle Diplomacy' in scoring_effects and (region == 'Asia' or region == 'Middle East'):
             if self.countries['Japan'] in self.battlegrounds_controlled_in_region(region, 'ussr'):
                 ussr_bg_bonus = ussr_bg_bonus - 1
                 ussr_adjacent_bonus = ussr_adjacent_bonus - 1
                 ui_string = "Event 40 - Shuttle Diplomacy in effect. " \
                             "Japan is removed from total - USSR loses battleground & adjacent bonus."
-                print(ui_string)
+                self.log(ui_string)
 
             elif ussr_bg_bonus > 0:
                 ussr_bg_bonus = ussr_bg_bonus - 1
                 ui_string = "Event 40 - Shuttle Diplomacy in effect. USSR loses 1 battleground from total."
-                print(ui_string)
+                self.log(ui_string)
 
             self.cards['Shuttle Diplomacy'].effect_active = False
 
         usa_total = score_dict[usa_score_type] + usa_adjacent_bonus + usa_bg_bonus
         ussr_total = score_dict[ussr_score_type] + ussr_adjacent_bonus + ussr_bg_bonus
-        log_string = "\n{r} SCORING".format(r=region.upper())
-        print(log_string)
-
-        log_string_usa = "USA has {t}\n" \
-                         "Base score:         {s}\n" \
-                         "Adjacent countries: {a}\n" \
-                         "Battlegrounds:      {b}\n" \
-                         "Total:              {st}\n".format(t=usa_score_type.upper(),
-                                                             tl=usa_score_type,
-                                                             s=score_dict[usa_score_type],
-                                                             a=usa_adjacent_bonus,
-                                                             b=usa_bg_bonus,
-                                                             st=usa_total)
-        log_string_ussr = "USSR has {t}\n" \
-                          "Base score:         {s}\n" \
-                          "Adjacent countries: {a}\n" \
-                          "Battlegrounds:      {b}\n" \
-                          "Total:              {st}\n".format(t=ussr_score_type.upper(),
-                                                              tl=ussr_score_type,
-                                                              s=score_dict[ussr_score_type],
-                                                              a=ussr_adjacent_bonus,
-                                                              b=ussr_bg_bonus,
-                                                              st=ussr_total)
+        scoring = {'region': region,
+                   'usa': {'type': usa_score_type,
+                           'base': score_dict[usa_score_type],
+                           'adjacent': usa_adjacent_bonus,
+                           'battlegrounds': usa_bg_bonus,
+                           'total': usa_total},
+                   'ussr': {'type': ussr_score_type,
+                            'base': score_dict[ussr_score_type],
+                            'adjacent': ussr_adjacent_bonus,
+                            'battlegrounds': ussr_bg_bonus,
+                            'total': ussr_total},
+                   'points': usa_total - ussr_total}
+        self.last_scoring = scoring
         if log:
-            print(log_string_usa)
-            print(log_string_ussr)
+            self.report(self.format_scoring_report, scoring)
 
         # Event 35 - Formosan Resolution: Turn off Taiwan as battleground.
-        self.countries['Taiwan'].battleground = False
+        if self.countries['Taiwan'].battleground:
+            self.countries['Taiwan'].battleground = False
+            self.invalidate_eligibility('control')
 
         return usa_total - ussr_total
 
+    def format_scoring_report(self, scoring):
+        log_string = "\n{r} SCORING\n".format(r=scoring['region'].upper())
+
+        for side in ['usa', 'ussr']:
+            log_string += "\n{p} has {t}\n" \
+                          "Base score:         {s}\n" \
+                          "Adjacent countries: {a}\n" \
+                          "Battlegrounds:      {b}\n" \
+                          "Total:              {st}\n".format(p=side.upper(),
+                                                              t=scoring[side]['type'].upper(),
+                                                              s=scoring[side]['base'],
+                                                              a=scoring[side]['adjacent'],
+                                                              b=scoring[side]['battlegrounds'],
+                                                              st=scoring[side]['total'])
+        return log_string
+
+    # Functions to evaluate scoring without changing the game
+    # Counts that decide a region's score, in the order of region_contribution
+    region_count_names = ('usa countries', 'ussr countries', 'usa battlegrounds', 'ussr battlegrounds', 'usa adjacent',
+                          'ussr adjacent', 'battlegrounds', 'ussr japan')
+
+    def region_contribution(self, country, side, formosan=False):
+        """Returns what the country adds to its region's counts when controlled by the side ('' for no one)"""
+        # Event 35 - Formosan Resolution
+        battleground = country.battleground or (formosan and country.name == 'Taiwan' and side == 'usa')
+        counts = [0, 0, 0, 0, 0, 0, 1 if battleground else 0, 0]
+        if side != '':
+            offset = 0 if side == 'usa' else 1
+            counts[offset] = 1
+            if battleground:
+                counts[2 + offset] = 1
+                if country.name == 'Japan' and side == 'ussr':
+                    counts[7] = 1
+            if self.opponent[side].upper() in country.borders:
+                counts[4 + offset] = 1
+        return counts
+
+    def evaluate_region(self, region, controlled=None):
+        """Scores a region the way score_card would, without changing the game or turning off effects.
+        Controlled maps country names to the side that would control them, in place of their current control."""
+        formosan = 'Formosan Resolution' in self.active_effects['scoring'] and region == 'Asia'
+        counts = [0] * len(self.region_count_names)
+
+        for country in self.countries_by_region[region]:
+            side = country.controlled
+            if controlled is not None:
+                side = controlled.get(country.name, side)
+            for index, count in enumerate(self.region_contribution(country, side, formosan)):
+                counts[index] += count
+
+        return self.score_region_counts(region, counts)
+
+    def score_region_counts(self, region, counts):
+        """Scores a region from the counts of controlled countries, battlegrounds and adjacent countries"""
+        presence, domination, control = self.region_points[region]
+        score_dict = {'no influence': 0, 'presence': presence, 'domination': domination, 'control': control}
+        usa_countries, ussr_countries, usa_bgs, ussr_bgs, usa_adjacent, ussr_adjacent, battlegrounds_in_region, \
+            ussr_japan = counts
+
+        countries = {'usa': usa_countries, 'ussr': ussr_countries}
+        battlegrounds = {'usa': usa_bgs, 'ussr': ussr_bgs}
+        adjacent = {'usa': usa_adjacent, 'ussr': ussr_adjacent}
+        type_countries = countries.copy()
+        type_battlegrounds = battlegrounds.copy()
+
+        # Event 73 - Shuttle Diplomacy
+        if 'Shuttle Diplomacy' in self.active_effects['scoring'] and (region == 'Asia' or region == 'Middle East'):
+            if type_battlegrounds['ussr'] > 0:
+                type_battlegrounds['ussr'] -= 1
+                type_countries['ussr'] -= 1
+            if ussr_japan:
+                battlegrounds['ussr'] -= 1
+                adjacent['ussr'] -= 1
+            elif battlegrounds['ussr'] > 0:
+                battlegrounds['ussr'] -= 1
+
+        scoring = {'region': region}
+        for side in ['usa', 'ussr']:
+            opponent = self.opponent[side]
+            score_type = 'no influence'
+            if type_countries[side] > 0:
+                score_type = 'presence'
+            if type_countries[side] > type_countries[opponent] \
+                    and type_battlegrounds[side] > type_battlegrounds[opponent] \
+                    and type_countries[side] > type_battlegrounds[side]:
+                score_type = 'domination'
+            if type_countries[side] > type_countries[opponent] and type_battlegrounds[side] == battlegrounds_in_region:
+                score_type = 'control'
+
+            scoring[side] = {'type': score_type,
+                             'base': score_dict[score_type],
+                             'adjacent': adjacent[side],
+                             'battlegrounds': battlegrounds[side],
+                             'total': score_dict[score_type] + adjacent[side] + battlegrounds[side]}
+        scoring['points'] = scoring['usa']['total'] - scoring['ussr']['total']
+        return scoring
+
+    def evaluate_regions(self):
+        """Returns the scoring of every region at the current state. Results are reused until the state changes."""
+        if self.region_evaluation is None or self.region_evaluation[0] != self.zobrist:
+            scorings = {region: self.evaluate_region(region) for region in self.region_points}
+            self.region_evaluation = (self.zobrist, scorings)
+        return self.region_evaluation[1]
+
+    def placement_delta(self, placements, side):
+        """Returns the change in points of each region if the side placed the influence in placements, a dict of
+        country names and amounts of influence. Only the regions of the placed countries are scored again."""
+        current = self.evaluate_regions()
+        controlled = {}
+        regions = set()
+
+        for country_name, influence in placements.items():
+            country = self.countries[country_name]
+            usa_influence = country.usa_influence + (influence if side == 'usa' else 0)
+            ussr_influence = country.ussr_influence + (influence if side == 'ussr' else 0)
+            if usa_influence - ussr_influence >= country.stability:
+                controlled[country_name] = 'usa'
+            elif ussr_influence - usa_influence >= country.stability:
+                controlled[country_name] = 'ussr'
+            else:
+                controlled[country_name] = ''
+            if controlled[country_name] != country.controlled:
+                regions.add(country.region)
+
+        deltas = {region: 0 for region in self.region_points}
+        for region in regions:
+            deltas[region] = self.evaluate_region(region, controlled)['points'] - current[region]['points']
+        return deltas
+
     def southeast_asia_scoring(self, log=False):
         usa_score = 0
         usa_thailand = 0
@@ -1253,8 +2064,8 @@ class TwilightStruggleGame(CardGame):
                                                                                                          b=ussr_thailand,
                                                                                                          t=ussr_total)
         if log:
-            print(log_string_usa)
-            print(log_string_ussr)
+            self.log(log_string_usa)
+            self.log(log_string_ussr)
 
         return usa_total - ussr_total
 
@@ -1283,9 +2094,9 @@ class TwilightStruggleGame(CardGame):
     def event_005(self):
         """Five Year Plan"""
         if len(self.get_available_cards('ussr', False)) > 0:
-            card = self.piles['USSR hand'].random_card()
+            card = self.piles['USSR hand'].random_card(self.rng)
             log_string = "USSR randomly discards {c}.".format(c=card.name)
-            print(log_string)
+            self.log(log_string)
 
             if card.event_type == 'usa':
                 self.trigger_event(card)
@@ -1320,7 +2131,7 @@ class TwilightStruggleGame(CardGame):
         else:
             options = [['a', "Discard a card with operations value of 3 or more"],
                        ['b', "Remove all US influence from W. Germany"]]
-            response = self.select_option(options)
+            response = self.select_option(options, 'usa')
             if response == 'a':
                 selected_card = self.select_a_card(eligible_cards, 'usa')
                 self.move_card(selected_card, 'discard')
@@ -1357,7 +2168,7 @@ class TwilightStruggleGame(CardGame):
         eligible_countries = self.countries_in_subregion('Eastern Europe')
         options = [['a', "Remove all USA influence from 4 countries in Eastern Europe"],
                    ['b', "Add 5 USSR influence in Eastern Europe, no more than 2 per country"]]
-        response = self.select_option(options)
+        response = self.select_option(options, 'ussr')
         if response == 'a':
             self.ask_to_remove_all_influence(eligible_countries, 4, 'ussr')
         elif response == 'b':
@@ -1395,24 +2206,24 @@ class TwilightStruggleGame(CardGame):
         if response == 'a':
             while True:
                 sponsor_roll = self.die_roll() + 2
-                print("Sponsor {p} rolled {r1} + 2".format(p=self.phasing.upper(),
+                self.log("Sponsor {p} rolled {r1} + 2".format(p=self.phasing.upper(),
                                                            r1=(sponsor_roll - 2)))
 
                 opponent_roll = self.die_roll()
-                print("Opponent {o} rolled {r2}".format(o=self.opponent[self.phasing].upper(),
+                self.log("Opponent {o} rolled {r2}".format(o=self.opponent[self.phasing].upper(),
                                                         r2=opponent_roll))
 
                 if sponsor_roll > opponent_roll:
-                    print("Sponsor {p} wins!".format(p=self.phasing.upper()))
+                    self.log("Sponsor {p} wins!".format(p=self.phasing.upper()))
                     self.change_score_by_side(self.phasing, 2)
                     break
                 elif opponent_roll > sponsor_roll:
-                    print("Opponent {o} wins!".format(o=self.opponent[self.phasing].upper()))
+                    self.log("Opponent {o} wins!".format(o=self.opponent[self.phasing].upper()))
                     self.change_score_by_side(self.opponent[self.phasing], 2)
                     break
                 else:
                     log_string = 'Tied - rerolling'
-                    print(log_string)
+                    self.log(log_string)
         elif response == 'b':
             self.change_defcon(-1)
             self.conduct_operations(self.phasing, 4)
@@ -1437,7 +2248,7 @@ class TwilightStruggleGame(CardGame):
                               self.countries['Hungary'],
                               self.countries['Czechoslovakia']]
 
-        target_country = self.select_a_country(eligible_countries)
+        target_country = self.select_a_country(eligible_countries, False, 'usa')
         usa_inf = self.get_influence(target_country.name, 'usa')
         ussr_inf = self.get_opponent_influence(target_country.name, 'usa')
         self.add_influence(target_country.name, 'usa', (ussr_inf - usa_inf))
@@ -1465,7 +2276,7 @@ class TwilightStruggleGame(CardGame):
     def event_026(self):
         """CIA Created"""
         visible_cards = self.get_available_cards('ussr', False)
-        print(visible_cards)
+        self.log(visible_cards)
 
         self.conduct_operations('usa', self.cards['CIA Created'].ops)
 
@@ -1495,7 +2306,7 @@ class TwilightStruggleGame(CardGame):
         """Red Scare/Purge"""
         self.sides[(self.opponent[self.phasing])].ops_adjustment = -1
         ui_string = "-1 to all {s} operations.".format(s=self.opponent[self.phasing].upper())
-        print(ui_string)
+        self.log(ui_string)
 
     def event_032(self):
         """UN Intervention"""
@@ -1520,13 +2331,13 @@ class TwilightStruggleGame(CardGame):
         possible_targets = self.countries_with_influence('ussr')
 
         while influence_to_remove > 0:
-            confirmation = self.confirm_action("Continue removing influence")
+            confirmation = self.confirm_action("Continue removing influence", 'ussr')
             if confirmation:
-                print("Remove {i} influence".format(i=influence_to_remove))
-                target = self.select_a_country(possible_targets)
+                self.log("Remove {i} influence".format(i=influence_to_remove))
+                target = self.select_a_country(possible_targets, side='ussr')
                 if target is None:
                     break
-                amount = self.select_influence_amount(target, influence_to_remove, 1, target.ussr_influence)
+                amount = self.select_influence_amount(target, influence_to_remove, 1, target.ussr_influence, 'ussr')
                 if amount is None:
                     break
                 target_list.append([target, amount])
@@ -1648,29 +2459,29 @@ class TwilightStruggleGame(CardGame):
                                                   br=ussr_roll,
                                                   bb=ussr_bonus)
 
-        print(ui_string)
+        self.log(ui_string)
 
         if usa_total > ussr_total:
             winner = 'usa'
             ui_string = "Winner: {w}".format(w=winner.upper())
-            print(ui_string)
+            self.log(ui_string)
             self.change_score_by_side('usa', 2)
 
         elif ussr_total > usa_total:
             winner = 'ussr'
             ui_string = "Winner: {w}".format(w=winner.upper())
-            print(ui_string)
+            self.log(ui_string)
             self.change_score_by_side('ussr', 2)
 
         else:
             ui_string = "Tie: no effect."
-            print(ui_string)
+            self.log(ui_string)
 
         if winner != '':
             options = [['+', "Improve DEFCON + 1"],
                        ['-', "Reduce DEFCON - 1"],
                        ['0', "No change"]]
-            response = self.select_option(options)
+            response = self.select_option(options, winner)
             if response == '+':
                 self.change_defcon(1)
             elif response == '-':
@@ -1718,7 +2529,7 @@ class TwilightStruggleGame(CardGame):
                 eligible_cards.append(card)
 
         ui_string = "Choose card to give to opponent."
-        print(ui_string)
+        self.log(ui_string)
         selected_card = self.select_a_card(eligible_cards, self.opponent[self.phasing])
 
         # Collected rulings - Missile Envy goes in opponent hand so it could be pulled by Grain Sales
@@ -1750,7 +2561,7 @@ class TwilightStruggleGame(CardGame):
         """South African Unrest"""
         options = [['a', "USSR adds 2 influence to South Africa"],
                    ['b', "USSR adds 1 influence to South Africa and 2 to a single country adjacent to South Africa"]]
-        response = self.select_option(options)
+        response = self.select_option(options, 'ussr')
         if response == 'a':
             self.add_influence('South Africa', 'ussr', 2)
         elif response == 'b':
@@ -1817,7 +2628,7 @@ class TwilightStruggleGame(CardGame):
     def event_062(self):
         """Lone Gunman"""
         visible_cards = self.get_available_cards('usa', False)
-        print(visible_cards)
+        self.log(visible_cards)
 
         self.conduct_operations('ussr', self.cards['"Lone Gunman"'].ops)
 
@@ -1856,18 +2667,18 @@ class TwilightStruggleGame(CardGame):
     def event_067(self):
         """Grain Sales to Soviets"""
         if len(self.get_available_cards('ussr', False)) > 0:
-            card = self.piles['USSR hand'].random_card()
+            card = self.piles['USSR hand'].random_card(self.rng)
             log_string = "USSR randomly discards {c}.".format(c=card.name)
-            print(log_string)
+            self.log(log_string)
 
             # In the headline phase you must return UN intervention (in FAQs)
             if self.phase == 'headline' and card.name == 'UN Intervention':
-                print('UN intervention may not be played in headline phase, automatically returned.')
+                self.log('UN intervention may not be played in headline phase, automatically returned.')
                 response = 'b'
             else:
                 options = [['a', "Play card"],
                            ['b', "Return card"]]
-                response = self.select_option(options)
+                response = self.select_option(options, 'usa')
 
             if response == 'a':
                 self.move_card(card, 'USA hand')
@@ -1888,13 +2699,17 @@ class TwilightStruggleGame(CardGame):
                                          " r| Realignment roll\n" \
                                          " s| Space race\n"
                         eligible_actions = ['e', 'c', 'i', 'r', 's']
-                    print(self.line)
-                    print("Select use for " + card.name + ':')
-                    print(action_options)
-                    while True:
-                        selected_action = input("Selection: ").lower()
-                        if selected_action in eligible_actions:
-                            break
+                    bot = self.bot_for('usa')
+                    if bot is not None:
+                        selected_action = self.bot_decision(bot, 'usa', 'action', eligible_actions)
+                    else:
+                        self.log(self.line)
+                        self.log("Select use for " + card.name + ':')
+                        self.log(action_options)
+                        while True:
+                            selected_action = input("Selection: ").lower()
+                            if selected_action in eligible_actions:
+                                break
 
                     adjusted_card_ops = self.adjust_ops(card.ops, 'usa', 1, 4)
                     if selected_action == 'e':
@@ -1985,30 +2800,27 @@ class TwilightStruggleGame(CardGame):
             selected_list = []
             card_list_names = ''
 
-            print('Discard up to entire hard:')
+            self.log('Discard up to entire hard:')
 
             while True:
                 card = self.select_a_card(card_options, 'usa')
                 selected_list.append(card)
                 card_options.remove(card)
 
-                if self.confirm_action('Finish discarding cards') or len(card_options) == 0:
+                if self.confirm_action('Finish discarding cards', 'usa') or len(card_options) == 0:
                     break
 
             # Format a string with the card names
             for card in selected_list:
                 card_list_names = card_list_names + card.name + '\n'
 
-            confirmation = self.confirm_action("Discard these cards:\n{l}".format(l=card_list_names))
+            confirmation = self.confirm_action("Discard these cards:\n{l}".format(l=card_list_names), 'usa')
 
             if confirmation:
                 for card in selected_list:
                     self.move_card(card, 'discard')
-                draw_number = 0
-                while draw_number < len(selected_list):
-                    dealt_card = self.piles['deck'].random_card()
-                    self.move_card(dealt_card, 'USA hand')
-                    draw_number += 1
+                for draw_number in range(len(selected_list)):
+                    self.draw_card('USA hand')
                 break
 
     def event_078(self):
@@ -2025,7 +2837,10 @@ class TwilightStruggleGame(CardGame):
     def event_080(self):
         """One Small Step..."""
         if self.sides[self.phasing].space_level < self.sides[self.opponent[self.phasing]].space_level:
+            self.rehash(('space', self.phasing, self.sides[self.phasing].space_level),
+                        ('space', self.phasing, self.sides[self.phasing].space_level + 1))
             self.sides[self.phasing].space_level += 1
+            self.invalidate_eligibility('space')
             self.increase_space_level(self.phasing)
 
     def event_081(self):
@@ -2081,7 +2896,7 @@ class TwilightStruggleGame(CardGame):
 
         if self.countries['S. Korea'].controlled == 'usa':
             card_value = self.adjust_ops(self.cards['Soviets Shoot Down KAL-007'].ops, 'usa', 1, 4)
-            selected_action = self.select_action_limited(False, False, True, True, False)
+            selected_action = self.select_action_limited(False, False, True, True, False, 'usa')
 
             if selected_action == 'i':
                 eligible_countries = self.accessible_countries('usa')
@@ -2097,7 +2912,7 @@ class TwilightStruggleGame(CardGame):
 
         if self.cards['The Reformer'].effect_active:
             card_value = self.adjust_ops(self.cards['Glasnost'].ops, 'ussr', 1, 4)
-            selected_action = self.select_action_limited(False, False, True, True, False)
+            selected_action = self.select_action_limited(False, False, True, True, False, 'ussr')
 
             if selected_action == 'i':
                 eligible_countries = self.accessible_countries('ussr')
@@ -2116,11 +2931,11 @@ class TwilightStruggleGame(CardGame):
     def event_092(self):
         """Terrorism"""
         if self.piles['USA hand'].get_pile_size() > 0:
-            discard = self.piles['USA hand'].random_card()
+            discard = self.piles['USA hand'].random_card(self.rng)
             self.move_card(discard, 'discard')
         if self.cards['Iranian Hostage Crisis'].played:
             if self.piles['USA hand'].get_pile_size() > 0:
-                discard = self.piles['USA hand'].random_card()
+                discard = self.piles['USA hand'].random_card(self.rng)
                 self.move_card(discard, 'discard')
 
     def event_093(self):
@@ -2135,7 +2950,7 @@ class TwilightStruggleGame(CardGame):
                    ['4', "USSR cannot add influence in Europe"],
                    ['5', "USSR cannot add influence in the Middle East"],
                    ['6', "USSR cannot add influence in South America"]]
-        response = self.select_option(options)
+        response = self.select_option(options, 'usa')
         if response == '1':
             self.chernobyl = 'Africa'
         elif response == '2':
@@ -2164,7 +2979,7 @@ class TwilightStruggleGame(CardGame):
         else:
             options = [['a', "Discard a card with operations value of 3 or more"],
                        ['b', "USSR may double amount of USSR influence in 2 countries in South America"]]
-            response = self.select_option(options)
+            response = self.select_option(options, 'usa')
             if response == 'a':
                 selected_card = self.select_a_card(eligible_cards, 'usa')
                 self.move_card(selected_card, 'discard')
@@ -2179,7 +2994,7 @@ class TwilightStruggleGame(CardGame):
                 targeted_countries = 0
 
                 while targeted_countries < 2:
-                    country = self.select_a_country(eligible_countries)
+                    country = self.select_a_country(eligible_countries, side='ussr')
                     target_list.append(country)
                     eligible_countries.remove(country)
                     targeted_countries += 1
@@ -2187,7 +3002,7 @@ class TwilightStruggleGame(CardGame):
                 for country in target_list:
                     target_list_names = target_list_names + country.name + '\n'
 
-                confirmation = self.confirm_action("Double USSR influence in:\n{l}".format(l=target_list_names))
+                confirmation = self.confirm_action("Double USSR influence in:\n{l}".format(l=target_list_names), 'ussr')
 
                 if confirmation:
                     for country in target_list:
@@ -2202,7 +3017,7 @@ class TwilightStruggleGame(CardGame):
 
         european_countries = self.countries_in_region('Europe')
         card_value = self.adjust_ops(self.cards['Tear Down this Wall'].ops, 'usa', 1, 4)
-        selected_action = self.select_action_limited(False, True, False, True, False)
+        selected_action = self.select_action_limited(False, True, False, True, False, 'usa')
 
         if selected_action == 'c':
             self.ask_to_coup_attempt(european_countries, card_value, 'usa', False)
@@ -2217,12 +3032,12 @@ class TwilightStruggleGame(CardGame):
     def event_098(self):
         """Aldrich Ames Remix"""
         eligible_cards = self.get_available_cards('usa', False)
-        print(eligible_cards)
+        self.log(eligible_cards)
 
         while True:
-            print("Discard a card from the USA hand.")
+            self.log("Discard a card from the USA hand.")
             card = self.select_a_card(eligible_cards, 'ussr')
-            if self.confirm_action("Discard {c} from USA hand".format(c=card.name)):
+            if self.confirm_action("Discard {c} from USA hand".format(c=card.name), 'ussr'):
                 self.move_card(card, 'discard')
                 break
 
@@ -2240,7 +3055,14 @@ class TwilightStruggleGame(CardGame):
             response = self.select_option(options)
             if response == 'a':
                 self.change_score_by_side(self.active_player.opponent, 6)
-                self.game_active = False
+                winner = ''
+                if self.score > 0:
+                    winner = 'usa'
+                elif self.score < 0:
+                    winner = 'ussr'
+                log_string = "Game over by Wargames. Winner: {w}".format(w=winner.upper())
+                self.log(log_string)
+                self.end_game(winner, 'wargames')
 
     def event_101(self):
         """Solidarity"""
@@ -2277,12 +3099,12 @@ class TwilightStruggleGame(CardGame):
             usa_hand = self.piles['USA hand'].get_cards_in_pile()
             for card in usa_hand.values():
                 if card.name == 'Southeast Asia':
-                    print(card.name)
+                    self.log(card.name)
                     country_list = self.countries_in_subregion('Southeast Asia')
                     for country in country_list:
                         eligible_countries.append(country)
                 elif card.name in scoring_conversion:
-                    print(card.name)
+                    self.log(card.name)
                     country_list = self.countries_in_region(scoring_conversion[card.name])
                     for country in country_list:
                         eligible_countries.append(country)
@@ -2320,37 +3142,28 @@ class TwilightStruggleGame(CardGame):
 
     def event_108(self):
         """Our Man In Tehran"""
-        drawn_cards = []
-        number_drawn = 0
+        drawn_cards = self.piles['deck'].top_cards(5)
 
-        draw_pile = list(self.piles['deck'].get_cards_in_pile().values())
-        if len(draw_pile) >= 5:
-            cards_to_draw = 5
-        else:
-            cards_to_draw = len(draw_pile)
-
-        print('USA draws following cards:')
-
-        while number_drawn < cards_to_draw:
-            card = self.piles['deck'].random_card()
-            if card not in drawn_cards:
-                drawn_cards.append(card)
-                print(card.name)
-                number_drawn += 1
+        self.log('USA draws following cards:')
+        for card in drawn_cards:
+            self.log(card.name)
 
         while True:
             target_cards = []
             target_card_names = ''
             for card in drawn_cards:
-                if self.confirm_action("Discard {c}".format(c=card.name)):
+                if self.confirm_action("Discard {c}".format(c=card.name), 'usa'):
                     target_cards.append(card)
                     target_card_names = target_card_names + card.name + '\n'
 
-            if self.confirm_action("Discard the following cards:\n{c}".format(c=target_card_names)):
+            if self.confirm_action("Discard the following cards:\n{c}".format(c=target_card_names), 'usa'):
                 for card in target_cards:
                     self.move_card(card, 'discard')
                 break
 
+        # The cards that were not discarded are shuffled back into the deck
+        self.piles['deck'].shuffle()
+
     def event_109(self):
         """Yuri and Samantha"""
         pass
@@ -2474,7 +3287,7 @@ class TwilightStruggleGame(CardGame):
     def effect_040(self):
         """Cuban Missile Crisis - Effect"""
         ui_string = 'Event 40 - Cuban Missile Crisis in effect.'
-        print(ui_string)
+        self.log(ui_string)
         if self.phasing == 'ussr':
             if self.countries['Cuba'].ussr_influence >= 2:
                 confirmation = self.confirm_action("Remove influence from Cuba to cancel Cuban Missile Crisis")
@@ -2511,7 +3324,7 @@ class TwilightStruggleGame(CardGame):
 
         if len(eligible_cards) == 0 and len(scoring_cards) == 0:
             log_string = 'No eligible cards to discard to Quagmire.'
-            print(log_string)
+            self.log(log_string)
             self.action_round_complete = True
             return
         elif len(eligible_cards) == 0 and len(scoring_cards) > 0:
@@ -2530,7 +3343,7 @@ class TwilightStruggleGame(CardGame):
             ui_string = 'Must play scoring card'
         else:
             ui_string = "Discard to Quagmire"
-        print(ui_string)
+        self.log(ui_string)
 
         selected_card = self.select_a_card(card_options, 'usa')
         self.active_card = selected_card
@@ -2550,11 +3363,11 @@ class TwilightStruggleGame(CardGame):
 
             if roll <= 4:
                 log_string = "SUCCESS! USA rolled {r}. Quagmire is not longer active.".format(r=roll)
-                print(log_string)
+                self.log(log_string)
                 self.cards['Quagmire'].effect_active = False
             else:
                 log_string = "Failure. USA rolled {r}. Quagmire remains active.".format(r=roll)
-                print(log_string)
+                self.log(log_string)
 
         self.action_round_complete = True
 
@@ -2568,7 +3381,7 @@ class TwilightStruggleGame(CardGame):
 
         if len(eligible_cards) == 0 and len(scoring_cards) == 0:
             log_string = 'No eligible cards to discard to Bear Trap.'
-            print(log_string)
+            self.log(log_string)
             self.action_round_complete = True
             return
         elif len(eligible_cards) == 0 and len(scoring_cards) > 0:
@@ -2587,7 +3400,7 @@ class TwilightStruggleGame(CardGame):
             ui_string = 'Must play scoring card'
         else:
             ui_string = "Discard to Bear Trap"
-        print(ui_string)
+        self.log(ui_string)
 
         selected_card = self.select_a_card(card_options, 'ussr')
         self.active_card = selected_card
@@ -2608,11 +3421,11 @@ class TwilightStruggleGame(CardGame):
 
             if roll <= 4:
                 log_string = "SUCCESS! USSR rolled {r}. Bear Trap is not longer active.".format(r=roll)
-                print(log_string)
+                self.log(log_string)
                 self.cards['Bear Trap'].effect_active = False
             else:
                 log_string = "Failure. USSR rolled {r}. Bear Trap remains active.".format(r=roll)
-                print(log_string)
+                self.log(log_string)
 
         self.action_round_complete = True
 
@@ -2633,7 +3446,7 @@ class TwilightStruggleGame(CardGame):
 
                 if card in impacted_cards:
                     log_string = "Flower Power in effect"
-                    print(log_string)
+                    self.log(log_string)
                     self.change_score_by_side('ussr', 2)
 
     def effect_106(self):
@@ -2642,7 +3455,7 @@ class TwilightStruggleGame(CardGame):
                 and self.norad_check \
                 and self.countries['Canada'].controlled == 'usa':
             ui_string = 'Event 106 - NORAD active. Add 1 influence in a single country containing USA influence.'
-            print(ui_string)
+            self.log(ui_string)
             self.ask_to_place_influence(self.countries_with_influence('usa'), 1, 'usa', 1, 1)
             self.norad_check = False
 
@@ -2652,8 +3465,8 @@ class TwilightStruggleGame(CardGame):
                 and self.sides['ussr'].space_level < 6 \
                 and len(self.get_available_cards('usa', False)) > 0:
             ui_string = 'Eagle has Landed. USA may discard held card.'
-            print(ui_string)
-            confirmation = self.confirm_action('Discard held card')
+            self.log(ui_string)
+            confirmation = self.confirm_action('Discard held card', 'usa')
             if confirmation:
                 card = self.select_a_card(self.get_available_cards('usa', False), 'usa')
                 self.move_card(card, 'discard')
@@ -2662,8 +3475,8 @@ class TwilightStruggleGame(CardGame):
                 and self.sides['usa'].space_level < 6 \
                 and len(self.get_available_cards('ussr', False)) > 0:
             ui_string = 'Bear has Landed. USSR may discard held card.'
-            print(ui_string)
-            confirmation = self.confirm_action('Discard held card')
+            self.log(ui_string)
+            confirmation = self.confirm_action('Discard held card', 'ussr')
             if confirmation:
                 card = self.select_a_card(self.get_available_cards('ussr', False), 'ussr')
                 self.move_card(card, 'discard')
@@ -2674,8 +3487,8 @@ class TwilightStruggleGame(CardGame):
                 and self.sides['ussr'].space_level < 8 \
                 and len(self.get_available_cards('usa', False)) > 0:
             ui_string = 'Space Station. USA may play additional action round.'
-            print(ui_string)
-            confirmation = self.confirm_action('Play additional action round')
+            self.log(ui_string)
+            confirmation = self.confirm_action('Play additional action round', 'usa')
             if confirmation:
                 self.action_round('usa')
 
@@ -2683,8 +3496,8 @@ class TwilightStruggleGame(CardGame):
                 and self.sides['usa'].space_level < 8 \
                 and len(self.get_available_cards('ussr', False)) > 0:
             ui_string = 'Space Station. USSR may play additional action round.'
-            print(ui_string)
-            confirmation = self.confirm_action('Play additional action round')
+            self.log(ui_string)
+            confirmation = self.confirm_action('Play additional action round', 'ussr')
             if confirmation:
                 self.action_round('ussr')
 
@@ -2707,55 +3520,55 @@ class TwilightStruggleGame(CardGame):
         coup_successful = False
         adjusted_ops = ops
         latin_adjustment = 0
+        coup_effects = self.active_effects['coup roll']
 
         # Event 006 - China Card
         if self.active_card == self.cards['China'] and country.region == 'Asia':
             log_string = "Event 6 - China card: +1 operation point."
-            print(log_string)
+            self.log(log_string)
             adjusted_ops = ops + 1
 
         # Event 009 - Vietnam Revolts
-        if self.cards['Vietnam Revolts'].effect_active and self.cards['Vietnam Revolts'].effect_side == side:
+        if 'Vietnam Revolts' in coup_effects and coup_effects['Vietnam Revolts'].effect_side == side:
             if country.subregion == 'Southeast Asia':
                 log_string = "Event 9 - Vietnam Revolts: +1 operation point."
-                print(log_string)
+                self.log(log_string)
                 adjusted_ops = ops + 1
 
         # Event 069 - Latin American Death Squads
-        log_string_latin = ""
-        if self.cards['Latin American Death Squads'].effect_active:
+        if 'Latin American Death Squads' in coup_effects:
             if country.region == 'Central America' or country.region == 'South America':
-                if self.cards['Latin American Death Squads'].effect_side == side:
+                if coup_effects['Latin American Death Squads'].effect_side == side:
                     latin_adjustment = 1
-                    log_string_latin = " + 1 from Latin American Death Squads"
-                elif self.cards['Latin American Death Squads'].effect_side == self.opponent[side]:
+                elif coup_effects['Latin American Death Squads'].effect_side == self.opponent[side]:
                     latin_adjustment = -1
-                    log_string_latin = " - 1 from Latin American Death Squads"
 
         roll = self.die_roll()
         modified_roll = roll + adjusted_ops + latin_adjustment
 
         # Event 43 - SALT Negotiations
-        log_string_salt = ""
-        if self.cards['SALT Negotiations'].effect_active:
+        salt_adjustment = 0
+        if 'SALT Negotiations' in coup_effects:
+            salt_adjustment = -1
             modified_roll = modified_roll - 1
-            log_string_salt = " - 1 from SALT Negotiations"
 
         opponent_inf = self.get_opponent_influence(country.name, side)
-        log_string = "Modified roll must be more than {d}. " \
-                     "{s} rolled {r}{latin} + {o} ops{salt}, total of {t}.".format(d=doubled_stability,
-                                                                                    s=side.upper(),
-                                                                                    r=roll,
-                                                                                   latin=log_string_latin,
-                                                                                    o=adjusted_ops,
-                                                                                    salt=log_string_salt,
-                                                                                    t=modified_roll)
-        print(log_string)
+        coup = {'country': country.name,
+                'side': side,
+                'roll': roll,
+                'ops': adjusted_ops,
+                'latin american death squads': latin_adjustment,
+                'salt negotiations': salt_adjustment,
+                'modified roll': modified_roll,
+                'doubled stability': doubled_stability,
+                'successful': modified_roll > doubled_stability}
+        self.last_coup_attempt = coup
+        self.report(self.format_coup_report, coup)
 
         if modified_roll > doubled_stability:
             coup_successful = True
             log_string = 'Coup result: Success!'
-            print(log_string)
+            self.log(log_string)
             influence_to_remove = modified_roll - doubled_stability
             if influence_to_remove > opponent_inf:
                 influence_to_add = influence_to_remove - opponent_inf
@@ -2766,50 +3579,71 @@ class TwilightStruggleGame(CardGame):
 
         else:
             log_string = 'Coup result: Failure'
-            print(log_string)
+            self.log(log_string)
 
         if mil_ops:
             self.add_military_ops(side, adjusted_ops)
 
+        result_effects = self.active_effects['coup result']
+
         if country.battleground:
             # Event 41 - Nuclear Subs
-            if self.cards['Nuclear Subs'].effect_active and side == 'usa':
+            if 'Nuclear Subs' in result_effects and side == 'usa':
                 log_string = 'DEFCON unchanged due to Event 41 - Nuclear Subs.'
-                print(log_string)
+                self.log(log_string)
                 pass
             else:
                 self.change_defcon(-1)
 
         # Event 109 - Yuri and Samantha
-        if self.cards['Yuri and Samantha'].effect_active:
+        if 'Yuri and Samantha' in result_effects:
             if side == 'usa':
                 log_string = "Event 109 - Yuri and Samantha activated due to USA coup:"
-                print(log_string)
+                self.log(log_string)
                 self.change_score_by_side('ussr', 1)
 
         # Event 40 - Cuban Missile Crisis
-        if self.cards['Cuban Missile Crisis'].effect_active \
-                and self.cards['Cuban Missile Crisis'].effect_player == side:
+        if 'Cuban Missile Crisis' in result_effects \
+                and result_effects['Cuban Missile Crisis'].effect_player == side:
             log_string = "Game over due to Cuban Missile Crisis. Winner: {s}".format(s=self.opponent[side].upper())
-            print(log_string)
-            self.sides[self.opponent[side]].winner = True
-            self.game_active = False
-            quit()
+            self.log(log_string)
+            self.end_game(self.opponent[side], 'cuban missile crisis')
 
         return coup_successful
 
+    def format_coup_report(self, coup):
+        log_string_latin = ""
+        if coup['latin american death squads'] == 1:
+            log_string_latin = " + 1 from Latin American Death Squads"
+        elif coup['latin american death squads'] == -1:
+            log_string_latin = " - 1 from Latin American Death Squads"
+
+        log_string_salt = ""
+        if coup['salt negotiations'] == -1:
+            log_string_salt = " - 1 from SALT Negotiations"
+
+        log_string = "Modified roll must be more than {d}. " \
+                     "{s} rolled {r}{latin} + {o} ops{salt}, total of {t}.".format(d=coup['doubled stability'],
+                                                                                    s=coup['side'].upper(),
+                                                                                    r=coup['roll'],
+                                                                                    latin=log_string_latin,
+                                                                                    o=coup['ops'],
+                                                                                    salt=log_string_salt,
+                                                                                    t=coup['modified roll'])
+        return log_string
+
     def action_coup_attempt(self, ops, side):
         attempt_completed = False
         while not attempt_completed:
-            print("Coup Attempt")
+            self.log("Coup Attempt")
             target_list = self.countries_with_influence(self.opponent[side])
             eligible_targets = self.checked_coup_targets(target_list, side, True)
-            target = self.select_a_country(eligible_targets)
+            target = self.select_a_country(eligible_targets, side=side)
 
             if target is None:
                 break
             else:
-                confirmation = self.confirm_action("Attempt coup in {t}".format(t=target.name))
+                confirmation = self.confirm_action("Attempt coup in {t}".format(t=target.name), side)
                 if confirmation:
                     self.coup_attempt(target, ops, side)
                     attempt_completed = True
@@ -2824,10 +3658,10 @@ class TwilightStruggleGame(CardGame):
 
         if len(eligible_targets) > 0:
             while not attempt_completed:
-                print("Coup Attempt")
-                target = self.select_a_country(eligible_targets, False)
+                self.log("Coup Attempt")
+                target = self.select_a_country(eligible_targets, False, side=side)
 
-                confirmation = self.confirm_action("Attempt coup in {t}".format(t=target.name))
+                confirmation = self.confirm_action("Attempt coup in {t}".format(t=target.name), side)
                 if confirmation:
                     coup_successful = self.coup_attempt(target, ops, side, False)
                     attempt_completed = True
@@ -2868,11 +3702,11 @@ class TwilightStruggleGame(CardGame):
             eligible = False
 
         # Effect 027 - US/Japan Mutual Defense Pact
-        if country.name == 'Japan' and self.cards['US/Japan Mutual Defense Pact'].effect_active:
+        if country.name == 'Japan' and 'US/Japan Mutual Defense Pact' in self.active_effects['coup restriction']:
             eligible = False
 
         # Effect 087 - The Reformer
-        if country.region == 'Europe' and self.cards['The Reformer'].effect_active:
+        if country.region == 'Europe' and 'The Reformer' in self.active_effects['coup restriction']:
             eligible = False
 
         return eligible
@@ -2891,7 +3725,7 @@ class TwilightStruggleGame(CardGame):
         defense_iran_contra = 0
 
         # Effect 93 - Iran-Contra Scandal
-        if self.cards['Iran-Contra Scandal'].effect_active:
+        if 'Iran-Contra Scandal' in self.active_effects['realignment roll']:
             if side == 'usa':
                 offense_iran_contra = -1
             else:
@@ -2924,6 +3758,35 @@ class TwilightStruggleGame(CardGame):
                                  defense_adjacent_superpower +
                                  defense_iran_contra)
 
+        realignment = {'country': country.name,
+                       'side': side,
+                       side: {'roll': offense_roll,
+                              'adjacent controlled': offense_adjacent_controlled,
+                              'more influence': offense_more_inf,
+                              'adjacent superpower': offense_adjacent_superpower,
+                              'iran-contra': offense_iran_contra,
+                              'total': offense_roll_modified},
+                       self.opponent[side]: {'roll': defense_roll,
+                                             'adjacent controlled': defense_adjacent_controlled,
+                                             'more influence': defense_more_inf,
+                                             'adjacent superpower': defense_adjacent_superpower,
+                                             'iran-contra': defense_iran_contra,
+                                             'total': defense_roll_modified},
+                       'difference': offense_roll_modified - defense_roll_modified}
+        self.last_realignment_roll = realignment
+        self.report(self.format_realignment_report, realignment)
+
+        if offense_roll_modified > defense_roll_modified:
+            self.remove_influence(country.name, self.opponent[side], (offense_roll_modified - defense_roll_modified))
+        elif defense_roll_modified > offense_roll_modified:
+            self.remove_influence(country.name, side, (defense_roll_modified - offense_roll_modified))
+
+        return realignment
+
+    def format_realignment_report(self, realignment):
+        side = realignment['side']
+        offense = realignment[side]
+        defense = realignment[self.opponent[side]]
         log_string = "{s} realignment attempt in {c}\n" \
                      "{o:4}\n" \
                      "Rolled:              {o1}\n" \
@@ -2940,26 +3803,21 @@ class TwilightStruggleGame(CardGame):
                      "Iran-Contra effect:  {d5}\n" \
                      "\n" \
                      "             TOTAL = {t}\n".format(s=side.upper(),
-                                                         c=country.name,
+                                                         c=realignment['country'],
                                                          o=side.upper(),
-                                                         o1=offense_roll,
-                                                         o2=offense_adjacent_controlled,
-                                                         o3=offense_more_inf,
-                                                         o4=offense_adjacent_superpower,
-                                                         o5=offense_iran_contra,
+                                                         o1=offense['roll'],
+                                                         o2=offense['adjacent controlled'],
+                                                         o3=offense['more influence'],
+                                                         o4=offense['adjacent superpower'],
+                                                         o5=offense['iran-contra'],
                                                          d=self.opponent[side].upper(),
-                                                         d1=defense_roll,
-                                                         d2=defense_adjacent_controlled,
-                                                         d3=defense_more_inf,
-                                                         d4=defense_adjacent_superpower,
-                                                         d5=defense_iran_contra,
-                                                         t=offense_roll_modified - defense_roll_modified)
-        print(log_string)
-
-        if offense_roll_modified > defense_roll_modified:
-            self.remove_influence(country.name, self.opponent[side], (offense_roll_modified - defense_roll_modified))
-        elif defense_roll_modified > offense_roll_modified:
-            self.remove_influence(country.name, side, (defense_roll_modified - offense_roll_modified))
+                                                         d1=defense['roll'],
+                                                         d2=defense['adjacent controlled'],
+                                                         d3=defense['more influence'],
+                                                         d4=defense['adjacent superpower'],
+                                                         d5=defense['iran-contra'],
+                                                         t=realignment['difference'])
+        return log_string
 
     def action_realignment_roll(self, ops, side):
         possible_targets = self.countries_with_influence(self.opponent[side])
@@ -2993,7 +3851,7 @@ class TwilightStruggleGame(CardGame):
                     if self.active_card == self.cards['China'] and not china_bonus_taken:
                         check_for_china_bonus = self.are_all_targets_in_region(targeted_countries, 'Asia')
                         if check_for_china_bonus:
-                            print('China bonus')
+                            self.log('China bonus')
                             realignments_to_attempt = 1
                             china_bonus_given = True
                         else:
@@ -3003,7 +3861,7 @@ class TwilightStruggleGame(CardGame):
                         if self.cards['Vietnam Revolts'].effect_active and side == 'ussr' and not vietnam_bonus_taken:
                             vietnam_bonus = self.are_all_targets_in_subregion(targeted_countries, 'Southeast Asia')
                             if vietnam_bonus:
-                                print('Vietnam bonus')
+                                self.log('Vietnam bonus')
                                 realignments_to_attempt = 1
                                 vietnam_bonus_given = True
                             else:
@@ -3014,12 +3872,12 @@ class TwilightStruggleGame(CardGame):
                             realignments_completed = True
                             break
                 elif realignments_to_attempt < ops:
-                    continue_confirmation = self.confirm_action("Continue realignment attempts")
+                    continue_confirmation = self.confirm_action("Continue realignment attempts", side)
                     if not continue_confirmation:
                         realignments_completed = True
                         break
 
-                print("Attempt a realignment roll ({r} remaining)".format(r=realignments_to_attempt))
+                self.log("Attempt a realignment roll ({r} remaining)".format(r=realignments_to_attempt))
 
                 if china_bonus_given:
                     eligible_targets = self.checked_realignment_targets(self.countries_in_region('Asia'), side)
@@ -3027,13 +3885,13 @@ class TwilightStruggleGame(CardGame):
                 if vietnam_bonus_given:
                     eligible_targets = self.checked_realignment_targets(self.countries_in_subregion('Southeast Asia'), side)
 
-                target = self.select_a_country(eligible_targets)
-                print(target)
+                target = self.select_a_country(eligible_targets, side=side)
+                self.log(target)
                 if target is None:
                     cancellation = True
                     break
 
-                target_confirmation = self.confirm_action("Attempt a realignment in {t}".format(t=target.name))
+                target_confirmation = self.confirm_action("Attempt a realignment in {t}".format(t=target.name), side)
                 if target_confirmation:
                     self.realignment_roll(target, side)
                     realignments_to_attempt = realignments_to_attempt - 1
@@ -3046,7 +3904,7 @@ class TwilightStruggleGame(CardGame):
                         vietnam_bonus_taken = True
 
             if cancellation:
-                continue_confirmation = self.confirm_action("Continue realignment attempts")
+                continue_confirmation = self.confirm_action("Continue realignment attempts", side)
                 if not continue_confirmation:
                     realignments_completed = True
 
@@ -3085,7 +3943,7 @@ class TwilightStruggleGame(CardGame):
             eligible = False
 
         # Effect 027 - US/Japan Mutual Defense Pact
-        if country.name == 'Japan' and self.cards['US/Japan Mutual Defense Pact'].effect_active:
+        if country.name == 'Japan' and 'US/Japan Mutual Defense Pact' in self.active_effects['realignment restriction']:
             eligible = False
 
         return eligible
@@ -3101,10 +3959,11 @@ class TwilightStruggleGame(CardGame):
             china_bonus_given = False
             vietnam_bonus_given = False
 
-            if self.cards['Chernobyl'].effect_active and self.cards['Chernobyl'].effect_side == side:
+            placement_effects = self.active_effects['placement']
+            if 'Chernobyl' in placement_effects and placement_effects['Chernobyl'].effect_side == side:
                 log_string = "Event 94 - Chernoble in effect. {s} cannot place influece in {r}.".format(s=side.upper(),
                                                                                                      r=self.chernobyl)
-                print(log_string)
+                self.log(log_string)
                 all_countries = self.accessible_countries(side)
                 possible_targets = []
                 for country in all_countries:
@@ -3114,12 +3973,12 @@ class TwilightStruggleGame(CardGame):
                 possible_targets = self.accessible_countries(side)
 
             while influence_to_place > 0:
-                print("Place {i} influence".format(i=influence_to_place))
-                target = self.select_a_country(possible_targets)
+                self.log("Place {i} influence".format(i=influence_to_place))
+                target = self.select_a_country(possible_targets, side=side)
                 if target is None:
                     cancelled = True
                     break
-                amount = self.select_influence_amount(target, influence_to_place)
+                amount = self.select_influence_amount(target, influence_to_place, side=side)
                 if amount is None:
                     break
                 target_list.append([target, amount])
@@ -3132,34 +3991,30 @@ class TwilightStruggleGame(CardGame):
                     check_for_vietnam_bonus = self.are_all_targets_in_subregion(targeted_countries, 'Southeast Asia')
                     if self.active_card == self.cards['China'] and check_for_china_bonus and not china_bonus_given:
                         log_string = "Event 6 - China bonus"
-                        print(log_string)
+                        self.log(log_string)
                         influence_to_place = 1
                         china_bonus_given = True
-                        possible_targets = []
-                        for country in self.accessible_countries(side):
-                            if country.region == 'Asia':
-                                possible_targets.append(country)
-                    elif self.cards['Vietnam Revolts'].effect_active and side == 'ussr' and check_for_vietnam_bonus and not vietnam_bonus_given:
+                        possible_targets = [country for country in self.countries_in_region('Asia')
+                                            if self.is_accessible(country, side)]
+                    elif 'Vietnam Revolts' in placement_effects and side == 'ussr' and check_for_vietnam_bonus and not vietnam_bonus_given:
                         log_string = "Event 9 - Vietnam bonus"
-                        print(log_string)
+                        self.log(log_string)
                         influence_to_place = 1
                         vietnam_bonus_given = True
-                        possible_targets = []
-                        for country in self.accessible_countries(side):
-                            if country.subregion == 'Southeast Asia':
-                                possible_targets.append(country)
+                        possible_targets = [country for country in self.countries_in_region('Asia')
+                                            if country.subregion == 'Southeast Asia' and self.is_accessible(country, side)]
 
             if cancelled:
                 break
             elif self.check_influence_targets_add(target_list, side):
                 if influence_to_place == 0:
-                    confirmation = self.confirm_action("Place influence in {t}".format(t=target_list))
+                    confirmation = self.confirm_action("Place influence in {t}".format(t=target_list), side)
                     if confirmation:
                         self.place_influence_from_list(target_list, side)
                         placement_completed = True
                         self.action_round_complete = True
                         self.conduct_operations_complete = True
-            else:
+            elif self.bot_for(side) is None:
                 user_input = input('Invalid influence placement. Restart influence placement? (y/n): ').lower()
                 if user_input == 'n':
                     break
@@ -3174,11 +4029,11 @@ class TwilightStruggleGame(CardGame):
                 possible_targets.append(country)
 
             while influence_to_place > 0:
-                print("Place {i} influence".format(i=influence_to_place))
-                target = self.select_a_country(possible_targets)
+                self.log("Place {i} influence".format(i=influence_to_place))
+                target = self.select_a_country(possible_targets, side=side)
                 if target is None:
                     break
-                amount = self.select_influence_amount(target, influence_to_place, min_inf, max_inf)
+                amount = self.select_influence_amount(target, influence_to_place, min_inf, max_inf, side=side)
                 if amount is None:
                     break
                 target_list.append([target, amount])
@@ -3187,11 +4042,11 @@ class TwilightStruggleGame(CardGame):
 
             if self.check_influence_targets_add(target_list, side):
                 if influence_to_place == 0:
-                    confirmation = self.confirm_action("Place influence in {t}".format(t=target_list))
+                    confirmation = self.confirm_action("Place influence in {t}".format(t=target_list), side)
                     if confirmation:
                         self.place_influence_from_list(target_list, side)
                         placement_completed = True
-            else:
+            elif self.bot_for(side) is None:
                 user_input = input('Invalid influence placement. Restart influence placement? (y/n): ').lower()
                 if user_input == 'n':
                     break
@@ -3207,11 +4062,11 @@ class TwilightStruggleGame(CardGame):
                     possible_targets.append(country)
 
             while influence_to_remove > 0:
-                print("Remove {i} influence".format(i=influence_to_remove))
-                target = self.select_a_country(possible_targets)
+                self.log("Remove {i} influence".format(i=influence_to_remove))
+                target = self.select_a_country(possible_targets, side=side)
                 if target is None:
                     break
-                amount = self.select_influence_amount(target, influence_to_remove, min_inf, max_inf)
+                amount = self.select_influence_amount(target, influence_to_remove, min_inf, max_inf, side=side)
                 if amount is None:
                     break
                 target_list.append([target, amount])
@@ -3222,12 +4077,12 @@ class TwilightStruggleGame(CardGame):
 
             if self.check_influence_targets_remove(target_list, side):
                 if influence_to_remove == 0 or len(possible_targets) == 0:
-                    confirmation = self.confirm_action("Remove influence in {t}".format(t=target_list))
+                    confirmation = self.confirm_action("Remove influence in {t}".format(t=target_list), side)
                     if confirmation:
                         self.remove_influence_from_list(target_list, side)
                         removal_completed = True
             else:
-                print('Invalid influence removal. Restart influence removal')
+                self.log('Invalid influence removal. Restart influence removal')
 
     def ask_to_remove_all_influence(self, country_list, number_of_countries, side):
         removal_completed = False
@@ -3240,8 +4095,8 @@ class TwilightStruggleGame(CardGame):
                     possible_targets.append(country)
 
             while countries_to_remove > 0:
-                print("Remove all influence in {n} countries".format(n=countries_to_remove))
-                target = self.select_a_country(possible_targets)
+                self.log("Remove all influence in {n} countries".format(n=countries_to_remove))
+                target = self.select_a_country(possible_targets, side=side)
                 if target is None:
                     break
                 target_list.append(target)
@@ -3258,7 +4113,7 @@ class TwilightStruggleGame(CardGame):
 
                 confirmation = self.confirm_action(
                     "Remove all {s} influence in:{t}".format(s=self.opponent[side].upper(),
-                                                             t=log_countries))
+                                                             t=log_countries), side)
                 if confirmation:
                     self.remove_all_influence_from_list(target_list, side)
                     removal_completed = True
@@ -3337,7 +4192,16 @@ class TwilightStruggleGame(CardGame):
 
         return eligible
 
-    def select_influence_amount(self, country, ops, min_inf=None, max_inf=None):
+    def select_influence_amount(self, country, ops, min_inf=None, max_inf=None, side=None):
+        bot = self.bot_for(side)
+        if bot is not None:
+            lowest = 0 if min_inf is None else min_inf
+            highest = ops if max_inf is None else min(ops, max_inf)
+            amounts = list(range(lowest, highest + 1))
+            if len(amounts) == 0:
+                amounts.append(None)
+            return self.bot_decision(bot, side, 'amount', amounts)
+
         influence_amount = None
         while True:
             user_input = input("How much influence in {c}: ".format(c=country.name))
@@ -3368,7 +4232,7 @@ class TwilightStruggleGame(CardGame):
         self.conduct_operations_complete = False
 
         while not self.conduct_operations_complete:
-            selected_action = self.select_operation()
+            selected_action = self.select_operation(side)
             adjusted_card_ops = self.adjust_ops(ops, side, 1, 4)
             if selected_action == 'c':
                 self.action_coup_attempt(adjusted_card_ops, side)
@@ -3380,19 +4244,21 @@ class TwilightStruggleGame(CardGame):
     # Functions for the headline phase
     def headline_phase(self):
         self.phase = 'headline'
-        print('HEADLINE PHASE')
+        self.log('HEADLINE PHASE')
         if self.sides['usa'].space_level >= 4 and self.sides['ussr'].space_level < 4:
             ussr_headline = self.select_a_headline('ussr')
-            print(ussr_headline.name)
+            self.log(ussr_headline.name)
             usa_headline = self.select_a_headline('usa')
         elif self.sides['ussr'].space_level >= 4 and self.sides['usa'].space_level < 4:
             usa_headline = self.select_a_headline('usa')
-            print(usa_headline.name)
+            self.log(usa_headline.name)
             ussr_headline = self.select_a_headline('ussr')
         else:
             usa_headline = self.select_a_headline('usa')
             ussr_headline = self.select_a_headline('ussr')
 
+        self.headlines.append([self.turn, 'usa', usa_headline.number])
+        self.headlines.append([self.turn, 'ussr', ussr_headline.number])
         headline_order = self.evaluate_headlines(usa_headline, ussr_headline)
 
         for headline in headline_order:
@@ -3431,33 +4297,35 @@ class TwilightStruggleGame(CardGame):
         self.active_card = None
         self.norad_check = False
         log_string = self.phase.upper()
-        print(log_string)
-        print(self.line)
+        self.log(log_string)
+        self.log(self.line)
+
+        round_effects = self.active_effects['action round']
 
         # Event 42 - Quagmire
-        if self.cards['Quagmire'].effect_active and side == 'usa':
+        if 'Quagmire' in round_effects and side == 'usa':
             self.trigger_effect(self.cards['Quagmire'])
             selected_action = ''
 
         # Event 44 - Bear Trap
-        if self.cards['Bear Trap'].effect_active and side == 'ussr':
+        if 'Bear Trap' in round_effects and side == 'ussr':
             self.trigger_effect(self.cards['Bear Trap'])
             selected_action = ''
 
         # Event 50 - "We Will Bury You"
-        if self.cards['"We Will Bury You"'].effect_active and side == 'usa':
+        if '"We Will Bury You"' in round_effects and side == 'usa':
             ui_string = "! Event 50 - We Will Bury You active. USA must play UN Intervention or USSR scores 3 points!"
-            print(ui_string)
+            self.log(ui_string)
             self.we_will_un_check = True
 
         # Event 40 - Cuban Missile Crisis
-        if self.cards['Cuban Missile Crisis'].effect_active and self.cards['Cuban Missile Crisis'].effect_player == side:
+        if 'Cuban Missile Crisis' in round_effects and round_effects['Cuban Missile Crisis'].effect_player == side:
             self.trigger_effect(self.cards['Cuban Missile Crisis'])
 
 
         while not self.action_round_complete:
             # Set eligible cards
-            if self.cards['Missile Envy'].effect_active and side == self.cards['Missile Envy'].effect_player:
+            if 'Missile Envy' in round_effects and side == round_effects['Missile Envy'].effect_player:
                 # Event 49 - Missile Envy
                 eligible_cards = [self.cards['Missile Envy']]
             else:
@@ -3475,6 +4343,14 @@ class TwilightStruggleGame(CardGame):
                 if not self.cards['China'].face_up:
                     eligible_cards.remove(self.cards['China'])
 
+            # A side without a card to play passes the action round
+            if len(eligible_cards) == 0:
+                log_string = "{s} has no cards to play.".format(s=side.upper())
+                self.log(log_string)
+                self.action_round_complete = True
+                selected_action = ''
+                break
+
             selected_card = self.select_a_card(eligible_cards, side)
             self.active_card = selected_card
             adjusted_card_ops = self.adjust_ops(selected_card.ops, side, 1, 4)
@@ -3577,7 +4453,7 @@ class TwilightStruggleGame(CardGame):
                 if side == 'usa' and self.cards['Formosan Resolution'].effect_active:
                     self.cards['Formosan Resolution'].effect_active = False
                     ui_string = 'Event 35 - Formosan Resolution: Effect cancelled.'
-                    print(ui_string)
+                    self.log(ui_string)
 
             # Event 49 - Missile Envy (turn off missile envy)
             if self.cards['Missile Envy'].effect_active \
@@ -3592,7 +4468,7 @@ class TwilightStruggleGame(CardGame):
             # If the card had a scoring element, the USSR will have already received points
             if self.we_will_un_check:
                 ui_string = 'Event 50 - We Will Bury You: USA did not play UN Intervention.'
-                print(ui_string)
+                self.log(ui_string)
                 self.change_score_by_side('ussr', 3)
             self.cards['"We Will Bury You"'].effect_active = False
             self.we_will_un_check = False
@@ -3601,22 +4477,60 @@ class TwilightStruggleGame(CardGame):
         self.trigger_effect(self.cards['NORAD'])
 
         log_string = "Action round complete."
-        print(log_string)
-        print(self.line)
+        self.log(log_string)
+        self.log(self.line)
+
+    # Functions for decisions
+    def bot_for(self, side):
+        """Returns the bot making decisions for the side, or None when a person is deciding"""
+        if side is None:
+            side = self.phasing
+        if side not in self.sides:
+            return None
+        return self.sides[side].bot
+
+    def bot_decision(self, bot, side, decision, options):
+        if side is None:
+            side = self.phasing
+        self.decisions += 1
+
+        if len(options) == 0 or self.decisions > self.max_decisions:
+            log_string = "Game stalled. {s} has no way to continue.".format(s=side.upper())
+            self.log(log_string)
+            self.end_game('', 'stalled')
+
+        if self.decision_time is not None:
+            self.decision_deadline = time.perf_counter() + self.decision_time
+        choice = bot.choose(self, side, decision, options)
+        if self.decision_deadline is not None and time.perf_counter() > self.decision_deadline:
+            self.late_decisions += 1
+
+        if choice in options:
+            self.decision_log.append(options.index(choice))
+        elif self.replayable:
+            self.replayable = False
+            log_string = "{s} chose {c}, which is not one of the options. The game can no longer be replayed from its " \
+                         "decisions.".format(s=side.upper(), c=choice)
+            self.log(log_string)
+        return choice
 
     def select_a_card(self, card_list, side):
+        bot = self.bot_for(side)
+        if bot is not None:
+            return self.bot_decision(bot, side, 'card', card_list)
+
         available_cards = card_list
         card_strings = self.format_available_cards(available_cards)
         available_card_numbers = []
         selected_card = None
 
-        print("{s} select a card:".format(s=side.upper()))
+        self.log("{s} select a card:".format(s=side.upper()))
 
         cards_printed = 0
         while cards_printed < len(card_strings):
             output_string = "{c:>2}| {s}".format(c=(cards_printed + 1),
                                                  s=card_strings[cards_printed])
-            print(output_string)
+            self.log(output_string)
             available_card_numbers.append(cards_printed + 1)
             cards_printed += 1
 
@@ -3633,23 +4547,30 @@ class TwilightStruggleGame(CardGame):
 
         return selected_card
 
-    def select_a_country(self, country_list, allow_cancelling=True):
+    def select_a_country(self, country_list, allow_cancelling=True, side=None):
         sorted_country_list = sorted(country_list, key=lambda x: x.name)
+
+        bot = self.bot_for(side)
+        if bot is not None:
+            if allow_cancelling:
+                sorted_country_list.append(None)
+            return self.bot_decision(bot, side, 'country', sorted_country_list)
+
         available_country_numbers = []
         selected_country = None
 
-        print("Select a country to target:")
+        self.log("Select a country to target:")
 
         countries_printed = 0
         while countries_printed < len(sorted_country_list):
             output_string = "{c:>2}| {s}".format(c=(countries_printed + 1),
                                                  s=sorted_country_list[countries_printed].name)
-            print(output_string)
+            self.log(output_string)
             available_country_numbers.append(countries_printed + 1)
             countries_printed += 1
 
         if allow_cancelling:
-            print(" x| --Cancel--")
+            self.log(" x| --Cancel--")
         while True:
             user_input = input("Selection: ")
             if user_input.isdigit():
@@ -3664,13 +4585,17 @@ class TwilightStruggleGame(CardGame):
 
         return selected_country
 
-    def select_option(self, option_list):
+    def select_option(self, option_list, side=None):
+        bot = self.bot_for(side)
+        if bot is not None:
+            return self.bot_decision(bot, side, 'option', [option[0] for option in option_list])
+
         option = None
         available_options = []
 
-        print("Select an option:")
+        self.log("Select an option:")
         for option in option_list:
-            print("{l}| {t}".format(l=option[0], t=option[1]))
+            self.log("{l}| {t}".format(l=option[0], t=option[1]))
             available_options.append(option[0])
 
         while True:
@@ -3711,18 +4636,22 @@ class TwilightStruggleGame(CardGame):
 
         roll = self.die_roll()
         log_string = "Roll between 1-{l}. {s} rolled {r}.".format(s=side.upper(), r=roll, l=max_roll)
-        print(log_string)
+        self.log(log_string)
 
         if roll <= max_roll:
             log_string = 'Space race attempt result: Success!'
-            print(log_string)
+            self.log(log_string)
             self.increase_space_level(side)
         else:
             log_string = 'Space race attempt result: Failure.'
-            print(log_string)
+            self.log(log_string)
         self.sides[side].space_attempts += 1
 
     def select_action(self, card, opponent=False):
+        bot = self.bot_for(self.phasing)
+        if bot is not None:
+            return self.bot_decision(bot, self.phasing, 'action', ['e', 'c', 'i', 'r', 's', 'x'])
+
         if opponent:
             action_options = " e| Trigger opponent event first\n" \
                              " c| Coup attempt\n" \
@@ -3737,15 +4666,15 @@ class TwilightStruggleGame(CardGame):
                              " r| Realignment roll\n" \
                              " s| Space race\n" \
                              " x| --Choose another card--"
-        print(self.line)
-        print("Select use for " + card.name + ':')
-        print(action_options)
+        self.log(self.line)
+        self.log("Select use for " + card.name + ':')
+        self.log(action_options)
         while True:
             selected_action = input("Selection: ").lower()
             if selected_action in ['e', 'c', 'i', 'r', 's', 'x']:
                 return selected_action
 
-    def select_action_limited(self, event, coup, influence, realignment, space):
+    def select_action_limited(self, event, coup, influence, realignment, space, side=None):
         action_options = ""
         selectable_actions = []
 
@@ -3769,28 +4698,40 @@ class TwilightStruggleGame(CardGame):
             action_options = action_options + " s| Space race\n"
             selectable_actions.append('s')
 
-        print(self.line)
-        print("Select action:")
-        print(action_options)
+        bot = self.bot_for(side)
+        if bot is not None:
+            return self.bot_decision(bot, side, 'action', selectable_actions)
+
+        self.log(self.line)
+        self.log("Select action:")
+        self.log(action_options)
         while True:
             selected_action = input("Selection: ").lower()
             if selected_action in selectable_actions:
                 return selected_action
 
-    def select_operation(self):
+    def select_operation(self, side=None):
+        bot = self.bot_for(side)
+        if bot is not None:
+            return self.bot_decision(bot, side, 'action', ['c', 'i', 'r'])
+
         operation_options = " c| Coup attempt\n" \
                             " i| Place influence\n" \
                             " r| Realignment roll\n"
 
-        print(self.line)
-        print("Select operation:")
-        print(operation_options)
+        self.log(self.line)
+        self.log("Select operation:")
+        self.log(operation_options)
         while True:
             selected_action = input("Selection: ").lower()
             if selected_action in ['c', 'i', 'r']:
                 return selected_action
 
-    def confirm_action(self, text):
+    def confirm_action(self, text, side=None):
+        bot = self.bot_for(side)
+        if bot is not None:
+            return self.bot_decision(bot, side, 'confirm', [True, False])
+
         while True:
             confirmation = input("Confirm action - {t} (y/n): ".format(t=text)).lower()
             if confirmation == 'y':
@@ -3829,20 +4770,23 @@ class TwilightStruggleGame(CardGame):
             self.sides['ussr'].winner = True
             self.game_active = False
             self.action_round_complete = True
+            self.end_reason = 'scoring card held'
             log_string = "Game over due to USA holding a score card. Winner: USSR"
-            print(log_string)
+            self.log(log_string)
         elif ussr_held_scoring and not usa_held_scoring:
             self.sides['usa'].winner = True
             self.game_active = False
             self.action_round_complete = True
+            self.end_reason = 'scoring card held'
             log_string = "Game over due to USSR holding a score card. Winner: USA"
-            print(log_string)
+            self.log(log_string)
         elif ussr_held_scoring and usa_held_scoring:
             self.sides['usa'].winner = True
             self.game_active = False
             self.action_round_complete = True
+            self.end_reason = 'scoring card held'
             log_string = "Game over due to both sides holding a score card. Winner: USA"
-            print(log_string)
+            self.log(log_string)
 
     def turn_cleanup(self):
         for side in self.sides.values():
@@ -3850,19 +4794,29 @@ class TwilightStruggleGame(CardGame):
             side.ops_adjustment = 0
 
         # Turn off all turn based effects
-        for card in self.cards.values():
-            if card.name == 'China':
-                pass
-            elif card.effect_turn and card.effect_active:
-                card.effect_active = False
-                log_string = "{c} is no longer active.".format(c=card.name)
-                print(log_string)
+        for card in list(self.active_effects['turn cleanup'].values()):
+            card.effect_active = False
+            log_string = "{c} is no longer active.".format(c=card.name)
+            self.log(log_string)
 
     # Initial influence placement
+    def set_handicap(self, side, amount):
+        """Gives a side bonus influence for the initial placement, instead of asking for it when the game starts"""
+        if side not in ['usa', 'ussr']:
+            raise ValueError("Error setting handicap. Side must be 'usa' or 'ussr'")
+        if amount < 0:
+            raise ValueError("Error setting handicap. Bonus influence cannot be negative")
+
+        if side == 'usa':
+            self.usa_handicap = amount
+        elif side == 'ussr':
+            self.ussr_handicap = amount
+        self.handicap_set = True
+
     def extra_initial_influence(self):
         if self.extra_inf == 'bid':
             self.bid_for_sides()
-        elif self.extra_inf == 'handicap':
+        elif self.extra_inf == 'handicap' and not self.handicap_set:
             options = [['a', "Give USA bonus influence"],
                        ['b', "Give USSR bonus influence"]]
             response = self.select_option(options)
@@ -3885,78 +4839,94 @@ class TwilightStruggleGame(CardGame):
     def bid_for_sides(self):
         pass
 
-    def initial_placement(self):
-        self.ask_to_place_influence(self.countries_in_subregion('Eastern Europe'), 6, 'ussr')
-        if self.ussr_handicap > 0:
-            self.ask_to_place_influence(self.countries_with_influence('ussr'), self.ussr_handicap, 'ussr')
-
-        self.ask_to_place_influence(self.countries_in_subregion('Western Europe'), 7, 'usa')
-        if self.usa_handicap > 0:
-            self.ask_to_place_influence(self.countries_with_influence('usa'), self.usa_handicap, 'usa')
-
+    # Functions to play the game
+    def play(self):
+        """Plays the game from the initial placement through final scoring"""
+        try:
+            self.extra_initial_influence()
+            self.initial_placement()
 
-def main():
-    game = TwilightStruggleGame("Game 2022-02-01", "2022-02-01", "1", "")
+            for turn in range(1, self.turns + 1):
+                self.play_turn(turn)
+                if not self.game_active:
+                    break
 
-    game.extra_initial_influence()
-    game.initial_placement()
+            if self.game_active:
+                self.final_scoring()
+        except TwilightStruggleGameOver:
+            self.trajectory.append([self.turn, self.score, self.defcon])
 
-    for turn in range(1, game.turns + 1):
-        game.turn = turn
+    def play_turn(self, turn):
+        self.turn = turn
 
         log_string = "\n--- TURN {t} ---\n".format(t=turn)
-        print(log_string)
+        self.log(log_string)
 
         # Phase A - Improve DEFCON Status
-        game.change_defcon(1)
+        self.change_defcon(1)
 
         if turn > 1:
             # Phase B - Deal Cards
-            game.deal_cards()
+            self.deal_cards()
 
         # Phase C - Headline Phase
-        game.headline_phase()
+        self.headline_phase()
 
         # Phase D - Action Rounds
-        for ar in range(1, game.action_rounds[game.turn] + 1):
-            game.ar = ar
+        for ar in range(1, self.action_rounds[self.turn] + 1):
+            self.ar = ar
             log_string = "\n--- TURN {t} | ACTION ROUND {a} ---".format(t=turn, a=ar)
-            print(log_string)
+            self.log(log_string)
 
-            log_string = "Score: {s}\nDEFCON: {d}\n".format(s=game.score, d=game.defcon)
-            print(log_string)
+            log_string = "Score: {s}\nDEFCON: {d}\n".format(s=self.score, d=self.defcon)
+            self.log(log_string)
 
-            game.action_round('ussr')
-            game.action_round('usa')
+            self.action_round('ussr')
+            self.action_round('usa')
 
-        if game.cards['North Sea Oil'].effect_active:
-            if len(game.get_available_cards('usa', False)) > 0:
+        if 'North Sea Oil' in self.active_effects['turn end']:
+            if len(self.get_available_cards('usa', False)) > 0:
                 log_string = 'Bonus USA action round from North Sea Oil'
-                print(log_string)
-                game.action_round('usa')
+                self.log(log_string)
+                self.action_round('usa')
 
-        game.turn_cleanup()
+        self.turn_cleanup()
 
         # Phase E - Check Military Operations
-        game.check_required_military_ops()
-        game.reset_military_ops()
+        self.check_required_military_ops()
+        self.reset_military_ops()
 
         # Phase F - Check held card
-        game.check_held_cards()
+        self.check_held_cards()
 
         # Space Race 6 - Eagle/Bear has Landed
-        game.space_6_effect()
+        self.space_6_effect()
 
         # Phase G - Flip China Card
-        game.cards['China'].flip_face_up()
+        self.cards['China'].flip_face_up()
 
         # Phase H - Advance turn marker (add in mid/late game cards)
         if turn == 3:
-            game.move_all_cards('deck', 'mid war')
+            self.move_all_cards('deck', 'mid war')
         elif turn == 7:
-            game.move_all_cards('deck', 'late war')
+            self.move_all_cards('deck', 'late war')
+
+        self.trajectory.append([turn, self.score, self.defcon])
 
-    game.final_scoring()
+    def initial_placement(self):
+        self.ask_to_place_influence(self.countries_in_subregion('Eastern Europe'), 6, 'ussr')
+        if self.ussr_handicap > 0:
+            self.ask_to_place_influence(self.countries_with_influence('ussr'), self.ussr_handicap, 'ussr')
+
+        self.ask_to_place_influence(self.countries_in_subregion('Western Europe'), 7, 'usa')
+        if self.usa_handicap > 0:
+            self.ask_to_place_influence(self.countries_with_influence('usa'), self.usa_handicap, 'usa')
+
+
+def main():
+    game = TwilightStruggleGame("Game 2022-02-01", "2022-02-01", "1", "")
+    game.play()
 
 
-main()
+if __name__ == '__main__':
+    main()
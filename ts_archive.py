@@ -0,0 +1,337 @@
+# Append-only archive of twilight struggle game records, read through mmap
+import json
+import mmap
+import os
+
+import numpy
+
+data_magic = b'TSARCHV1'
+index_magic = b'TSINDEX1'
+hash_magic = b'TSHASH01'
+
+# Every index entry has the same size, so entry n is found at a fixed offset
+index_dtype = numpy.dtype([('game_id', '<u8'),
+                           ('state_hash', '<u8'),
+                           ('offset', '<u8'),
+                           ('length', '<u4'),
+                           ('winner', 'u1'),
+                           ('end_reason', 'u1'),
+                           ('turn', 'u1'),
+                           ('score', 'i1'),
+                           ('events', 'u1', 16),
+                           ('headlines', 'u1', 16)])
+hash_dtype = numpy.dtype([('state_hash', '<u8'), ('position', '<u8')])
+header_size = index_dtype.itemsize
+
+winners = ['', 'usa', 'ussr']
+end_reasons = ['', 'defcon', 'score', 'cuban missile crisis', 'wargames', 'stalled', 'scoring card held',
+               'final scoring', 'error']
+
+
+def index_path(path):
+    return path + '.index'
+
+
+def hash_path(path):
+    return path + '.hash'
+
+
+def end_reason_code(end_reason):
+    if end_reason.startswith('error'):
+        return end_reasons.index('error')
+    return end_reasons.index(end_reason) if end_reason in end_reasons else 0
+
+
+def card_bits(card_numbers):
+    """Packs card numbers into a 128 bit set"""
+    bits = numpy.zeros(16, dtype=numpy.uint8)
+    for number in card_numbers:
+        bits[number >> 3] |= 1 << (number & 7)
+    return bits
+
+
+def has_card(bits, card_number):
+    """Tests a card in an array of card bit sets, one per entry"""
+    return (bits[..., card_number >> 3] & (1 << (card_number & 7))) != 0
+
+
+def index_entry(record, offset, length):
+    entry = numpy.zeros(1, dtype=index_dtype)
+    entry['game_id'] = record.get('game_id', record['seed'])
+    entry['state_hash'] = record.get('state_hash', 0)
+    entry['offset'] = offset
+    entry['length'] = length
+    entry['winner'] = winners.index(record['winner'])
+    entry['end_reason'] = end_reason_code(record['end_reason'])
+    entry['turn'] = record['turn']
+    entry['score'] = max(-128, min(127, record['score']))
+    entry['events'] = card_bits(record.get('events', []))
+    entry['headlines'] = card_bits(card for turn, side, card in record.get('headlines', []))
+    return entry
+
+
+def read_header(handle, magic, path):
+    handle.seek(0)
+    header = handle.read(header_size)
+    if len(header) < header_size or header[:len(magic)] != magic:
+        raise ValueError("Error opening game archive. " + str(path) + " is not a game archive file")
+
+
+class GameArchiveWriter:
+    """Appends game records to an archive.
+
+    The archive is a data file of compact JSON records and an index file of fixed-size entries holding the offset
+    and length of each record, its game ID and final state hash, and the fields used to filter games. Records are
+    buffered and the data is always written before the index entries that point at it, so readers never see an
+    entry for a record that is not on disk. Opening an existing archive drops any partly written tail and appends
+    after the last whole record.
+
+    On close, a table of state hashes in sorted order is written next to the index for lookups by state hash. The
+    writer can be passed to run_batch in place of a GameRecordWriter."""
+
+    def __init__(self, path, buffer_size=1024 * 1024, fsync='close', hash_index=True):
+        if fsync not in ['flush', 'close', 'never']:
+            raise ValueError("Error creating game archive writer. Fsync policy must be one of: 'flush', 'close', or 'never'")
+
+        self.path = path
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.hash_index = hash_index
+
+        self.data_buffer = []
+        self.index_buffer = []
+        self.buffered_bytes = 0
+
+        self.data_handle = None
+        self.index_handle = None
+        self.open_files()
+
+    def open_files(self):
+        for file_path, magic in [(self.path, data_magic), (index_path(self.path), index_magic)]:
+            if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+                with open(file_path, 'wb') as handle:
+                    handle.write(magic.ljust(header_size, b'\0'))
+
+        with open(index_path(self.path), 'r+b') as index_handle, open(self.path, 'r+b') as data_handle:
+            read_header(index_handle, index_magic, index_path(self.path))
+            read_header(data_handle, data_magic, self.path)
+
+            # Keep whole entries whose records are complete
+            data_size = os.path.getsize(self.path)
+            entries = (os.path.getsize(index_path(self.path)) - header_size) // header_size
+            index_handle.seek(header_size)
+            index = numpy.frombuffer(index_handle.read(entries * header_size), dtype=index_dtype)
+            ends = index['offset'] + index['length']
+            entries = int(numpy.searchsorted(ends > data_size, True))
+
+            index_handle.truncate(header_size + entries * header_size)
+            data_handle.truncate(int(ends[entries - 1]) if entries > 0 else header_size)
+
+        # The hash table is written again on close
+        if os.path.exists(hash_path(self.path)):
+            os.remove(hash_path(self.path))
+
+        self.records_written = entries
+        self.data_handle = open(self.path, 'ab')
+        self.index_handle = open(index_path(self.path), 'ab')
+        self.data_bytes = self.data_handle.tell()
+
+    def write(self, record):
+        payload = json.dumps(record, separators=(',', ':')).encode()
+        self.index_buffer.append(index_entry(record, self.data_bytes, len(payload)))
+        self.data_buffer.append(payload)
+        self.data_bytes += len(payload)
+        self.buffered_bytes += len(payload)
+        self.records_written += 1
+
+        if self.buffered_bytes >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.data_buffer) == 0:
+            return
+
+        self.data_handle.write(b''.join(self.data_buffer))
+        self.data_handle.flush()
+        if self.fsync == 'flush':
+            os.fsync(self.data_handle.fileno())
+
+        self.index_handle.write(numpy.concatenate(self.index_buffer).tobytes())
+        self.index_handle.flush()
+        if self.fsync == 'flush':
+            os.fsync(self.index_handle.fileno())
+
+        self.data_buffer = []
+        self.index_buffer = []
+        self.buffered_bytes = 0
+
+    def close(self):
+        if self.data_handle is None:
+            return
+        self.flush()
+        for handle in [self.data_handle, self.index_handle]:
+            if self.fsync != 'never':
+                os.fsync(handle.fileno())
+            handle.close()
+        self.data_handle = None
+        self.index_handle = None
+
+        if self.hash_index:
+            write_hash_index(self.path)
+
+    def checkpoint(self):
+        """Writes every buffered record to disk and returns the position of the writer"""
+        self.flush()
+        if self.fsync != 'never':
+            os.fsync(self.data_handle.fileno())
+            os.fsync(self.index_handle.fileno())
+        return {'records_written': self.records_written, 'data_bytes': self.data_bytes}
+
+    def restore(self, state):
+        """Returns the writer to a checkpointed position, dropping records written after it"""
+        self.data_buffer = []
+        self.index_buffer = []
+        self.buffered_bytes = 0
+        self.data_handle.close()
+        self.index_handle.close()
+
+        with open(self.path, 'r+b') as handle:
+            handle.truncate(state['data_bytes'])
+        with open(index_path(self.path), 'r+b') as handle:
+            handle.truncate(header_size + state['records_written'] * header_size)
+
+        self.open_files()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "<GameArchiveWriter: %s, %s records>" % (self.path, self.records_written)
+
+
+def write_hash_index(path):
+    """Writes the state hashes of an archive in sorted order with their entry positions"""
+    with GameArchive(path, hashes=False) as archive:
+        order = numpy.argsort(archive.entries['state_hash'], kind='stable')
+        table = numpy.empty(len(order), dtype=hash_dtype)
+        table['state_hash'] = archive.entries['state_hash'][order]
+        table['position'] = order
+
+    temporary_path = hash_path(path) + '.tmp'
+    with open(temporary_path, 'wb') as handle:
+        handle.write(hash_magic.ljust(header_size, b'\0'))
+        handle.write(table.tobytes())
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary_path, hash_path(path))
+
+
+class GameArchive:
+    """Reads an archive through mmap.
+
+    The index is viewed in place as a numpy structured array, so filtering on its fields reads the mapped pages
+    directly, and record_bytes returns a memoryview of the mapped data without copying. Any number of processes can
+    read the same archive while it is appended to, each sees the records that were indexed when it was opened or
+    last refreshed."""
+
+    def __init__(self, path, hashes=True):
+        self.path = path
+        self.use_hashes = hashes
+        self.data_map = None
+        self.index_map = None
+        self.hash_map = None
+        self.refresh()
+
+    @staticmethod
+    def map_file(file_path, magic):
+        with open(file_path, 'rb') as handle:
+            read_header(handle, magic, file_path)
+            return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def refresh(self):
+        """Maps the files again to pick up records appended since the archive was opened"""
+        self.close()
+        self.index_map = self.map_file(index_path(self.path), index_magic)
+        self.data_map = self.map_file(self.path, data_magic)
+
+        # An entry written after the data was mapped is left for the next refresh
+        entries = (len(self.index_map) - header_size) // header_size
+        self.entries = numpy.frombuffer(self.index_map, dtype=index_dtype, count=entries, offset=header_size)
+        ends = self.entries['offset'] + self.entries['length']
+        self.entries = self.entries[:int(numpy.searchsorted(ends > len(self.data_map), True))]
+        self.ids_sorted = bool(numpy.all(self.entries['game_id'][1:] >= self.entries['game_id'][:-1]))
+
+        self.hashes = None
+        if self.use_hashes and os.path.exists(hash_path(self.path)):
+            self.hash_map = self.map_file(hash_path(self.path), hash_magic)
+            self.hashes = numpy.frombuffer(self.hash_map, dtype=hash_dtype, offset=header_size)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def record_bytes(self, position):
+        entry = self.entries[position]
+        offset = int(entry['offset'])
+        return memoryview(self.data_map)[offset:offset + int(entry['length'])]
+
+    def record(self, position):
+        return json.loads(self.record_bytes(position).tobytes())
+
+    def records(self, positions=None):
+        if positions is None:
+            positions = range(len(self.entries))
+        for position in positions:
+            yield self.record(position)
+
+    def find(self, game_id):
+        """Returns the position of the game with the ID, or None"""
+        ids = self.entries['game_id']
+        if self.ids_sorted:
+            position = int(numpy.searchsorted(ids, game_id))
+            if position < len(ids) and ids[position] == game_id:
+                return position
+            return None
+        positions = numpy.flatnonzero(ids == game_id)
+        return int(positions[0]) if len(positions) > 0 else None
+
+    def find_by_hash(self, state_hash):
+        """Returns the positions of every game that ended in the state with the hash"""
+        positions = []
+        searched = 0
+        if self.hashes is not None:
+            first = numpy.searchsorted(self.hashes['state_hash'], state_hash, side='left')
+            last = numpy.searchsorted(self.hashes['state_hash'], state_hash, side='right')
+            positions = [int(position) for position in self.hashes['position'][first:last]
+                         if position < len(self.entries)]
+            searched = len(self.hashes)
+
+        # Records appended after the hash table was written are scanned
+        tail = numpy.flatnonzero(self.entries['state_hash'][searched:] == state_hash) + searched
+        return sorted(positions + [int(position) for position in tail])
+
+    def game(self, game_id):
+        position = self.find(game_id)
+        return self.record(position) if position is not None else None
+
+    def close(self):
+        # Views of the maps must be released before the maps are closed
+        self.entries = None
+        self.hashes = None
+        for mapped in [self.data_map, self.index_map, self.hash_map]:
+            if mapped is not None:
+                mapped.close()
+        self.data_map = None
+        self.index_map = None
+        self.hash_map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "<GameArchive: %s, %s records>" % (self.path, len(self.entries) if self.entries is not None else 0)
@@ -0,0 +1,136 @@
+# Beliefs about the hidden hand of the opponent in twilight struggle
+import numpy
+
+# Piles every player can see, the hand of the observing side is added to these
+public_piles = ['early war', 'mid war', 'late war', 'discard', 'removed', 'USA China', 'USSR China']
+
+
+class BeliefState:
+    """Tracks what one side can know about the hand of its opponent, and samples hands consistent with it.
+
+    Only public information is read: the public piles, the side's own hand, the size of the opponent's hand, the
+    card being played and the number of cards each side has drawn. The cards that are in none of these piles are
+    the unknown pool, split between the deck and the opponent's hand. Cards revealed to the side are known to be in
+    the hand until they are seen leaving it.
+
+    A card known not to be in the opponent's hand while it was in the deck can only be there now if the opponent
+    drew it since, so it is in the hand with probability about the opponent's draws since then over the deck size
+    then. This applies to the rest of the pool when the whole hand is revealed, and to scoring cards after each
+    turn, as a scoring card cannot be held through the end of a turn. The other unknown cards are equally likely to
+    fill the remaining places in the hand."""
+
+    def __init__(self, game, side):
+        if side not in ['usa', 'ussr']:
+            raise ValueError("Error creating belief state. Side must be 'usa' or 'ussr'")
+
+        self.game = game
+        self.side = side
+        self.opponent = game.opponent[side]
+        self.known = set()
+        # Card name: (opponent draws, deck size) when the card was known to be in the deck
+        self.excluded = {}
+        self.update()
+
+    def opponent_draws(self, before_turn=None):
+        drawn = self.game.cards_drawn[self.opponent]
+        return sum(count for turn, count in drawn.items() if before_turn is None or turn < before_turn)
+
+    def update(self):
+        """Reads the public state of the game. Call before using the belief after the game has moved on."""
+        game = self.game
+        visible = set(game.piles[game.hands[self.side]].cards)
+        for pile_name in public_piles:
+            visible.update(game.piles[pile_name].cards)
+
+        self.unknown = [name for name in game.cards if name not in visible]
+        self.hand_size = game.piles[game.hands[self.opponent]].get_pile_size()
+        self.deck_size = len(self.unknown) - self.hand_size
+
+        # A card the opponent is playing has been seen
+        if game.active_card is not None and game.phasing == self.opponent and game.active_card.name in self.unknown:
+            self.known.add(game.active_card.name)
+        self.known.intersection_update(self.unknown)
+        for name in list(self.excluded):
+            if name not in self.unknown or name in self.known:
+                del self.excluded[name]
+
+        # No scoring card was held through the end of the last turn. Scoring cards in the pool were in the deck
+        # before this turn's deal, or came back to it with a reshuffle since.
+        if game.turn > 1:
+            draws_before_turn = self.opponent_draws(game.turn)
+            drawn_this_turn = sum(game.cards_drawn[side].get(game.turn, 0) for side in ['usa', 'ussr'])
+            for name in self.unknown:
+                if game.cards[name].event_type == 'scoring' and name not in self.known:
+                    exclusion = (draws_before_turn, self.deck_size + drawn_this_turn)
+                    if self.excluded.get(name, (-1, 0))[0] < draws_before_turn:
+                        self.excluded[name] = exclusion
+
+        self.pool = [name for name in self.unknown if name not in self.known]
+        self.pool_numbers = numpy.array([game.cards[name].number for name in self.pool], dtype=numpy.int16)
+        draws = self.opponent_draws()
+        self.inclusion = numpy.array([min(1.0, (draws - self.excluded[name][0]) / max(self.excluded[name][1], 1))
+                                      if name in self.excluded else numpy.nan for name in self.pool])
+
+    def reveal(self, card_names):
+        """Records cards the side has seen in the opponent's hand"""
+        self.known.update(card_names)
+        self.update()
+
+    def reveal_hand(self):
+        """Records that the side has seen the whole hand of the opponent, as with CIA Created or Aldrich Ames Remix"""
+        self.known = set(self.game.piles[self.game.hands[self.opponent]].cards)
+        self.update()
+        draws = self.opponent_draws()
+        for name in self.pool:
+            self.excluded[name] = (draws, self.deck_size)
+        self.update()
+
+    def probabilities(self):
+        """Returns the probability of each unknown card being in the opponent's hand. The probabilities of the
+        cards that are not excluded are the places left after the expected number of excluded cards."""
+        excluded = ~numpy.isnan(self.inclusion)
+        places = self.hand_size - len(self.known)
+        expected_excluded = min(float(self.inclusion[excluded].sum()), places)
+        regular = len(self.pool) - int(excluded.sum())
+        regular_probability = min(1.0, (places - expected_excluded) / regular) if regular > 0 else 0.0
+
+        probabilities = {name: 1.0 for name in self.known}
+        for name, inclusion in zip(self.pool, self.inclusion):
+            probabilities[name] = regular_probability if numpy.isnan(inclusion) else float(inclusion)
+        return probabilities
+
+    def sample(self, count, rng=None):
+        """Returns count hands as an array of card numbers, one hand per row with the known cards first.
+
+        Each excluded card is drawn into the hand with its probability, and the places left are filled at random
+        from the other unknown cards. Excluded cards that were not drawn only fill places when nothing else can."""
+        if rng is None:
+            rng = numpy.random.default_rng()
+        places = self.hand_size - len(self.known)
+        known = numpy.array([self.game.cards[name].number for name in sorted(self.known)], dtype=numpy.int16)
+
+        keys = rng.random((count, len(self.pool)))
+        excluded = ~numpy.isnan(self.inclusion)
+        if excluded.any():
+            drawn = rng.random((count, int(excluded.sum()))) < self.inclusion[excluded]
+            keys[:, excluded] += numpy.where(drawn, 2.0, -2.0)
+
+        if places <= 0:
+            chosen = numpy.zeros((count, 0), dtype=int)
+        elif places >= len(self.pool):
+            chosen = numpy.tile(numpy.arange(len(self.pool)), (count, 1))
+        else:
+            chosen = numpy.argpartition(-keys, places - 1, axis=1)[:, :places]
+
+        return numpy.concatenate([numpy.tile(known, (count, 1)), self.pool_numbers[chosen]], axis=1)
+
+    def determinize(self, rng=None):
+        """Returns one consistent assignment of the hidden cards, as the names of the cards in the opponent's hand and
+        the deck in a random order"""
+        if rng is None:
+            rng = numpy.random.default_rng()
+        hand = [self.game.card_by_id(int(number)).name for number in self.sample(1, rng)[0]]
+        in_hand = set(hand)
+        deck = [name for name in self.unknown if name not in in_hand]
+        rng.shuffle(deck)
+        return {'hand': hand, 'deck': deck}
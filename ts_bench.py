@@ -0,0 +1,59 @@
+# Benchmarks for the twilight struggle engine
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+
+from ts_app import TwilightStruggleGame
+
+
+def build_games(number_of_games, optional_cards='1'):
+    games = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for game_number in range(number_of_games):
+            games.append(TwilightStruggleGame("Benchmark {n}".format(n=game_number), "", optional_cards, ""))
+    return games
+
+
+def measure_game_memory(number_of_games=100, optional_cards='1'):
+    """Returns the average number of bytes held by one game, measured with tracemalloc"""
+    # Build one game first so caches shared by every game are not counted
+    build_games(1, optional_cards)
+
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    games = build_games(number_of_games, optional_cards)
+    end_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    bytes_per_game = (end_memory - start_memory) / len(games)
+    return bytes_per_game
+
+
+def measure_game_construction(number_of_games=100, optional_cards='1'):
+    """Returns the average number of seconds to construct one game"""
+    build_games(1, optional_cards)
+
+    start_time = time.perf_counter()
+    build_games(number_of_games, optional_cards)
+    end_time = time.perf_counter()
+
+    return (end_time - start_time) / number_of_games
+
+
+def main():
+    number_of_games = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    bytes_per_game = measure_game_memory(number_of_games)
+    log_string = "Memory per game:       {b:>10,.0f} bytes ({k:.1f} KiB)".format(b=bytes_per_game,
+                                                                              k=bytes_per_game / 1024)
+    print(log_string)
+
+    seconds_per_game = measure_game_construction(number_of_games)
+    log_string = "Construction per game: {s:>10.3f} ms".format(s=seconds_per_game * 1000)
+    print(log_string)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Command line runner for batches of headless twilight struggle games
+import argparse
+import json
+import sys
+import time
+
+from ts_sim import run_batch, bot_types, GameRecordWriter
+from ts_archive import GameArchiveWriter
+
+
+def parse_handicap(text):
+    """Reads a handicap such as 'usa:2' into a [side, bonus influence] pair"""
+    side, _, amount = text.partition(':')
+    if side not in ['usa', 'ussr'] or not amount.isdigit():
+        raise argparse.ArgumentTypeError("Handicap must be SIDE:AMOUNT, for example usa:2")
+    return [side, int(amount)]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Plays batches of twilight struggle games between bots.")
+    parser.add_argument('--games', type=int, default=100, help="number of games to play")
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes")
+    parser.add_argument('--seed', type=int, default=1, help="seed of the first game, games use consecutive seeds")
+    parser.add_argument('--usa-bot', default='random', choices=sorted(bot_types), help="bot playing the USA")
+    parser.add_argument('--ussr-bot', default='random', choices=sorted(bot_types), help="bot playing the USSR")
+    parser.add_argument('--optional-cards', default='1', choices=['0', '1'], help="1 to include the optional cards")
+    parser.add_argument('--extra-inf', default='', choices=['', 'bid', 'handicap'],
+                        help="extra influence mode of the games")
+    parser.add_argument('--handicap', type=parse_handicap, default=None,
+                        help="bonus influence for a side as SIDE:AMOUNT, with --extra-inf handicap")
+    parser.add_argument('--output', default=None,
+                        help="path for the game records, a .tsa path writes an archive and any other path JSON lines")
+    parser.add_argument('--checkpoint', default=None, help="path of a checkpoint to resume an interrupted batch")
+    parser.add_argument('--progress', type=float, default=2.0,
+                        help="seconds between progress lines on stderr, 0 for none")
+    return parser
+
+
+class ProgressReport:
+    """Writes the games completed, throughput and win rates to a stream at most every interval seconds"""
+
+    def __init__(self, games, interval, stream=sys.stderr):
+        self.games = games
+        self.interval = interval
+        self.stream = stream
+        self.start_time = time.perf_counter()
+        self.last_report = self.start_time
+        self.first_completed = None
+
+    def __call__(self, completed, totals):
+        if self.first_completed is None:
+            # Games resumed from a checkpoint are not counted in the throughput
+            self.first_completed = completed - 1
+        now = time.perf_counter()
+        if self.interval > 0 and (now - self.last_report >= self.interval or completed == self.games):
+            self.last_report = now
+            self.stream.write(self.format(completed, totals, now) + '\n')
+            self.stream.flush()
+
+    def throughput(self, completed, now=None):
+        elapsed = (now or time.perf_counter()) - self.start_time
+        played = completed - (self.first_completed or 0)
+        return played / elapsed if elapsed > 0 else 0.0
+
+    def format(self, completed, totals, now):
+        rate = self.throughput(completed, now)
+        remaining = (self.games - completed) / rate if rate > 0 else 0
+        decided = max(totals['games'], 1)
+        return "{c:>{w},}/{g:,} games ({p:5.1%}) | {r:8,.1f} games/s | USA {u:5.1%} USSR {s:5.1%} | " \
+               "{e} errors | ETA {t:,.0f}s".format(c=completed, w=len("{:,}".format(self.games)), g=self.games,
+                                                   p=completed / max(self.games, 1), r=rate,
+                                                   u=totals['usa'] / decided, s=totals['ussr'] / decided,
+                                                   e=totals['errors'], t=remaining)
+
+
+def create_writer(path):
+    if path is None:
+        return None
+    if path.endswith('.tsa'):
+        return GameArchiveWriter(path)
+    return GameRecordWriter(path)
+
+
+def main(arguments=None):
+    options = build_parser().parse_args(arguments)
+    if (options.handicap is not None) != (options.extra_inf == 'handicap'):
+        # Without a handicap the game would ask for one on the terminal
+        build_parser().error("--handicap and --extra-inf handicap must be used together")
+    if options.games < 1 or options.workers < 1:
+        build_parser().error("--games and --workers must be at least 1")
+
+    seeds = range(options.seed, options.seed + options.games)
+    progress = ProgressReport(options.games, options.progress)
+    writer = create_writer(options.output)
+
+    try:
+        totals = run_batch(seeds, options.usa_bot, options.ussr_bot, options.optional_cards, writer=writer,
+                           workers=options.workers, checkpoint_path=options.checkpoint, extra_inf=options.extra_inf,
+                           handicap=options.handicap, progress=progress)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - progress.start_time
+    summary = dict(totals)
+    summary['seconds'] = round(elapsed, 3)
+    summary['games per second'] = round(progress.throughput(totals['games']), 1)
+    if options.output is not None:
+        summary['output'] = options.output
+    print(json.dumps(summary))
+    return summary
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+# Simulation of twilight struggle games across machines, with a coordinator handing out seeds to TCP workers
+import json
+import multiprocessing
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from ts_sim import simulate_game, add_to_totals
+
+
+def send_message(stream, message):
+    stream.write((json.dumps(message, separators=(',', ':')) + '\n').encode())
+    stream.flush()
+
+
+def receive_message(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed")
+    return json.loads(line)
+
+
+class WorkUnit:
+    """A range of seeds handed to one worker at a time"""
+
+    def __init__(self, number, seeds):
+        self.number = number
+        self.seeds = seeds
+        self.worker = None
+        self.issued = 0
+        self.complete = False
+
+
+class CoordinatorHandler(socketserver.StreamRequestHandler):
+    """Serves one worker connection. Records of a unit are held until the worker finishes the unit, so a unit
+    taken back from a worker that died is never counted twice."""
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        self.connection.settimeout(coordinator.timeout)
+        worker = "{h}:{p}".format(h=self.client_address[0], p=self.client_address[1])
+        unit = None
+        records = []
+
+        try:
+            message = receive_message(self.rfile)
+            worker = message.get('worker', worker)
+            coordinator.log("Worker {w} connected".format(w=worker))
+
+            while True:
+                if unit is None:
+                    unit = coordinator.issue(worker)
+                    if unit is None:
+                        send_message(self.wfile, {'type': 'done'})
+                        return
+                    if unit == 'wait':
+                        unit = None
+                        send_message(self.wfile, {'type': 'wait'})
+                        receive_message(self.rfile)
+                        continue
+                    records = []
+                    send_message(self.wfile, {'type': 'work', 'unit': unit.number, 'seeds': unit.seeds,
+                                              'config': coordinator.config})
+
+                message = receive_message(self.rfile)
+                if message['type'] == 'record':
+                    records.append(message['record'])
+                elif message['type'] == 'finished' and message['unit'] == unit.number:
+                    coordinator.complete(unit, records)
+                    unit = None
+        except (ConnectionError, OSError, ValueError) as error:
+            coordinator.log("Worker {w} lost: {e}".format(w=worker, e=error))
+        finally:
+            if unit is not None:
+                coordinator.reissue(unit)
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SimulationCoordinator:
+    """Hands out seeds in units of unit_size to workers that connect over TCP, and merges their results.
+
+    Workers ask for a unit, stream back one record per game and then report the unit finished. A unit held by a
+    worker that disconnects or sends nothing for timeout seconds is put back in the queue for another worker. A
+    unit finished twice, by a slow worker and the worker it was given to again, is counted once. Records of
+    finished units are passed to the writer in the order the units finish."""
+
+    def __init__(self, seeds, usa_bot='random', ussr_bot='random', optional_cards='1', unit_size=100,
+                 host='127.0.0.1', port=0, writer=None, timeout=60, log=None):
+        if unit_size < 1:
+            raise ValueError("Error creating simulation coordinator. Unit size must be at least 1")
+
+        seeds = list(seeds)
+        self.units = [WorkUnit(number, seeds[start:start + unit_size])
+                      for number, start in enumerate(range(0, len(seeds), unit_size))]
+        self.pending = list(self.units)
+        self.config = {'usa_bot': usa_bot, 'ussr_bot': ussr_bot, 'optional_cards': optional_cards}
+        self.writer = writer
+        self.timeout = timeout
+        self.log_function = log
+
+        self.totals = {'games': 0, 'usa': 0, 'ussr': 0, 'draw': 0, 'stalled': 0, 'errors': 0}
+        self.units_complete = 0
+        self.reissued = 0
+        self.lock = threading.Condition()
+
+        self.server = CoordinatorServer((host, port), CoordinatorHandler)
+        self.server.coordinator = self
+        self.address = self.server.server_address
+
+    def log(self, log_string):
+        if self.log_function is not None:
+            self.log_function(log_string)
+
+    def issue(self, worker):
+        """Returns the next unit for the worker, 'wait' while every unit left is held by a worker, or None when all
+        units are complete"""
+        with self.lock:
+            if self.units_complete == len(self.units):
+                return None
+            if len(self.pending) == 0:
+                return 'wait'
+            unit = self.pending.pop(0)
+            unit.worker = worker
+            unit.issued += 1
+            return unit
+
+    def reissue(self, unit):
+        with self.lock:
+            if not unit.complete and unit not in self.pending:
+                self.pending.insert(0, unit)
+                self.reissued += 1
+                self.log("Unit {u} reissued".format(u=unit.number))
+
+    def complete(self, unit, records):
+        with self.lock:
+            if unit.complete:
+                return
+            unit.complete = True
+            for record in records:
+                add_to_totals(self.totals, record)
+                if self.writer is not None:
+                    self.writer.write(record)
+            self.units_complete += 1
+            self.lock.notify_all()
+
+    def run(self, workers_alive=None, poll_seconds=1.0):
+        """Serves workers until every unit is complete and returns the totals. When workers_alive is given, it is
+        called every poll_seconds, and the run gives up with an error once it returns False while units are left."""
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with self.lock:
+                while self.units_complete < len(self.units):
+                    self.lock.wait(poll_seconds)
+                    if self.units_complete < len(self.units) and workers_alive is not None and not workers_alive():
+                        raise RuntimeError("Error running simulation coordinator. Every worker has exited with "
+                                           + str(len(self.units) - self.units_complete) + " units not complete")
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+        return self.totals
+
+
+def run_worker(host, port, name=None, retry_seconds=10, wait_seconds=0.1):
+    """Connects to a coordinator and plays the units it hands out until it has no more. Returns the number of games
+    played."""
+    deadline = time.monotonic() + retry_seconds
+    while True:
+        try:
+            connection = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+    games = 0
+    with connection, connection.makefile('rwb') as stream:
+        send_message(stream, {'type': 'hello', 'worker': name or socket.gethostname()})
+        try:
+            while True:
+                message = receive_message(stream)
+                if message['type'] == 'done':
+                    break
+                if message['type'] == 'wait':
+                    time.sleep(wait_seconds)
+                    send_message(stream, {'type': 'ready'})
+                    continue
+
+                config = message['config']
+                for seed in message['seeds']:
+                    record = simulate_game(seed, config['usa_bot'], config['ussr_bot'], config['optional_cards'])
+                    send_message(stream, {'type': 'record', 'record': record})
+                    games += 1
+                send_message(stream, {'type': 'finished', 'unit': message['unit']})
+        except OSError:
+            # The coordinator has finished, or has given up on this worker and handed its unit to another
+            pass
+
+    return games
+
+
+def run_local(seeds, workers=2, usa_bot='random', ussr_bot='random', optional_cards='1', unit_size=100,
+              writer=None, timeout=60):
+    """Runs a coordinator with local worker processes connecting over TCP, and returns the totals"""
+    coordinator = SimulationCoordinator(seeds, usa_bot, ussr_bot, optional_cards, unit_size, writer=writer,
+                                        timeout=timeout)
+    host, port = coordinator.address
+    processes = [multiprocessing.Process(target=run_worker, args=(host, port, "local-{n}".format(n=number)))
+                 for number in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        totals = coordinator.run(lambda: any(process.is_alive() for process in processes))
+    finally:
+        for process in processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+    return totals
+
+
+def main():
+    """Usage:
+        python ts_cluster.py coordinator PORT GAMES [FIRST_SEED]
+        python ts_cluster.py worker HOST PORT"""
+    if len(sys.argv) >= 4 and sys.argv[1] == 'coordinator':
+        first_seed = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+        seeds = range(first_seed, first_seed + int(sys.argv[3]))
+        coordinator = SimulationCoordinator(seeds, host='0.0.0.0', port=int(sys.argv[2]), log=print)
+        print(coordinator.run())
+    elif len(sys.argv) >= 4 and sys.argv[1] == 'worker':
+        games = run_worker(sys.argv[2], int(sys.argv[3]))
+        log_string = "Worker played {g} games".format(g=games)
+        print(log_string)
+    else:
+        print(main.__doc__)
+
+
+if __name__ == '__main__':
+    main()
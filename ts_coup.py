@@ -0,0 +1,149 @@
+# Expected value ranking of coup targets in twilight struggle
+import numpy
+
+
+class CoupRanker:
+    """Ranks coup targets by the expected result of the roll, following the rules of coup_attempt.
+
+    Every legal target is evaluated against all six die rolls at once, as arrays of targets by rolls. For each target
+    the ranking gives the probability of success, of control changing and of the side taking control, the expected
+    influence swing, the DEFCON after the coup and whether it loses the game, and the change in the military ops
+    shortfall checked by check_required_military_ops."""
+
+    rolls = numpy.arange(1, 7)
+
+    def __init__(self, game, side, control_weight=2.0, military_ops_weight=1.0, victory_point_weight=1.0):
+        if side not in ['usa', 'ussr']:
+            raise ValueError("Error creating coup ranker. Side must be 'usa' or 'ussr'")
+
+        self.game = game
+        self.side = side
+        self.control_weight = control_weight
+        self.military_ops_weight = military_ops_weight
+        self.victory_point_weight = victory_point_weight
+
+    def targets(self, defcon_restrictions=True):
+        game = self.game
+        country_list = game.countries_with_influence(game.opponent[self.side])
+        return game.checked_coup_targets(country_list, self.side, defcon_restrictions)
+
+    def rank(self, ops, targets=None, mil_ops=True, defcon_restrictions=True, china_card_played=None):
+        """Returns a dict of results for each target, best expected value first"""
+        game = self.game
+        side = self.side
+        opponent = game.opponent[side]
+        if targets is None:
+            targets = self.targets(defcon_restrictions)
+        if len(targets) == 0:
+            return []
+        if china_card_played is None:
+            china_card_played = game.active_card is game.cards['China']
+
+        coup_effects = game.active_effects['coup roll']
+        result_effects = game.active_effects['coup result']
+
+        # Target attributes as arrays
+        stability = numpy.array([country.stability for country in targets])
+        own = numpy.array([game.get_influence(country.name, side) for country in targets])
+        opposing = numpy.array([game.get_opponent_influence(country.name, side) for country in targets])
+        battleground = numpy.array([country.battleground for country in targets])
+        region = numpy.array([country.region for country in targets])
+        subregion = numpy.array([country.subregion for country in targets])
+        controlled = numpy.array([country.controlled for country in targets])
+
+        # Modifiers from coup_attempt
+        adjusted_ops = numpy.full(len(targets), ops)
+        if china_card_played:
+            # Event 006 - China Card
+            adjusted_ops = adjusted_ops + (region == 'Asia')
+        elif 'Vietnam Revolts' in coup_effects and coup_effects['Vietnam Revolts'].effect_side == side:
+            # Event 009 - Vietnam Revolts
+            adjusted_ops = adjusted_ops + (subregion == 'Southeast Asia')
+
+        modifier = adjusted_ops.copy()
+        if 'Latin American Death Squads' in coup_effects:
+            # Event 069 - Latin American Death Squads
+            latin_america = (region == 'Central America') | (region == 'South America')
+            effect_side = coup_effects['Latin American Death Squads'].effect_side
+            if effect_side == side:
+                modifier = modifier + latin_america
+            elif effect_side == opponent:
+                modifier = modifier - latin_america
+        if 'SALT Negotiations' in coup_effects:
+            # Event 43 - SALT Negotiations
+            modifier = modifier - 1
+
+        # Outcomes of each roll, as arrays of targets by rolls
+        excess = self.rolls[None, :] + modifier[:, None] - 2 * stability[:, None]
+        success = excess > 0
+        removed = numpy.where(success, numpy.minimum(excess, opposing[:, None]), 0)
+        added = numpy.where(success, numpy.maximum(excess - opposing[:, None], 0), 0)
+        own_after = own[:, None] + added
+        opposing_after = opposing[:, None] - removed
+        side_controls = (own_after - opposing_after) >= stability[:, None]
+        opponent_controls = (opposing_after - own_after) >= stability[:, None]
+        controlled_after = numpy.where(side_controls, side, numpy.where(opponent_controls, opponent, ''))
+
+        success_probability = success.mean(axis=1)
+        flip_probability = (controlled_after != controlled[:, None]).mean(axis=1)
+        control_probability = side_controls.mean(axis=1)
+        influence_swing = (removed + added).mean(axis=1)
+
+        # DEFCON drops for battlegrounds, except for the USA with Event 41 - Nuclear Subs
+        defcon_drop = battleground.astype(int)
+        if 'Nuclear Subs' in result_effects and side == 'usa':
+            defcon_drop = numpy.zeros(len(targets), dtype=int)
+        defcon_after = numpy.maximum(game.defcon - defcon_drop, 1)
+        loses_game = defcon_after < 2
+        # Event 40 - Cuban Missile Crisis
+        if 'Cuban Missile Crisis' in result_effects and result_effects['Cuban Missile Crisis'].effect_player == side:
+            loses_game = numpy.ones(len(targets), dtype=bool)
+
+        # Military ops credit, capped at 5 as in add_military_ops, against the requirement at the DEFCON after the coup
+        military_ops = game.sides[side].military_ops
+        military_ops_after = numpy.minimum(military_ops + (adjusted_ops if mil_ops else 0), 5)
+        shortfall_before = max(game.defcon - military_ops, 0)
+        shortfall_after = numpy.maximum(defcon_after - military_ops_after, 0)
+
+        # Event 109 - Yuri and Samantha
+        victory_points = -1 if 'Yuri and Samantha' in result_effects and side == 'usa' else 0
+
+        expected_value = influence_swing \
+            + self.control_weight * control_probability * numpy.where(battleground, 2, 1) \
+            + self.military_ops_weight * (shortfall_before - shortfall_after) \
+            + self.victory_point_weight * victory_points
+        expected_value = numpy.where(loses_game, -numpy.inf, expected_value)
+
+        ranking = []
+        for index in numpy.argsort(-expected_value, kind='stable'):
+            ranking.append({'country': targets[index].name,
+                            'expected value': float(expected_value[index]),
+                            'success probability': float(success_probability[index]),
+                            'flip probability': float(flip_probability[index]),
+                            'control probability': float(control_probability[index]),
+                            'influence swing': float(influence_swing[index]),
+                            'defcon after': int(defcon_after[index]),
+                            'loses game': bool(loses_game[index]),
+                            'military ops shortfall': int(shortfall_after[index]),
+                            'military ops shortfall change': int(shortfall_after[index] - shortfall_before)})
+        return ranking
+
+
+def rank_coup_targets(game, ops, side, **options):
+    return CoupRanker(game, side).rank(ops, **options)
+
+
+def format_coup_ranking(ranking):
+    """Formats a ranking as lines for a hint"""
+    lines = []
+    for result in ranking:
+        warning = ' LOSES GAME' if result['loses game'] else ''
+        lines.append("{c:20} EV {v:+6.2f} | success {s:4.0%} | control {p:4.0%} | swing {w:.2f} | "
+                     "DEFCON {d}{l}".format(c=result['country'],
+                                            v=result['expected value'],
+                                            s=result['success probability'],
+                                            p=result['control probability'],
+                                            w=result['influence swing'],
+                                            d=result['defcon after'],
+                                            l=warning))
+    return '\n'.join(lines)
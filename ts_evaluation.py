@@ -0,0 +1,245 @@
+# Batched evaluation of twilight struggle positions for bots playing many games at once
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy
+
+from ts_app import TwilightStruggleGame, RandomBot
+from ts_features import FeatureEncoder
+from ts_search import SearchBot
+from ts_sim import game_record
+
+
+class LinearEvaluator:
+    """Values positions for the USA between 0 and 1 with a logistic model over the features of FeatureEncoder.
+
+    Without weights, the model only looks at the score, with a 10 point lead worth about 82%. Weights can be fitted
+    to positions labelled by collect_positions."""
+
+    def __init__(self, encoder=None, weights=None, bias=0.0):
+        self.encoder = encoder if encoder is not None else FeatureEncoder()
+        if weights is None:
+            weights = numpy.zeros(self.encoder.size, dtype=numpy.float32)
+            weights[self.encoder.feature_names.index('score')] = 3.0
+        if len(weights) != self.encoder.size:
+            raise ValueError("Error creating linear evaluator. Weights must have one value for each of the "
+                             + str(self.encoder.size) + " features")
+        self.weights = numpy.asarray(weights, dtype=numpy.float32)
+        self.bias = bias
+
+    def evaluate_features(self, features):
+        # The logistic function written with tanh, which does not overflow
+        return 0.5 + 0.5 * numpy.tanh(0.5 * (features @ self.weights + self.bias))
+
+    def evaluate_batch(self, raw):
+        """Values a matrix of raw state rows in one call"""
+        return self.evaluate_features(self.encoder.encode_batch(raw))
+
+    def evaluate_game(self, game):
+        return float(self.evaluate_batch(self.encoder.raw_state(game))[0])
+
+    def fit(self, features, labels, steps=200, learning_rate=0.5, ridge=1e-4):
+        """Fits the weights by gradient descent on the log loss. Labels are 1 for a USA win, -1 for a USSR win and 0
+        for a draw."""
+        targets = (numpy.asarray(labels, dtype=numpy.float32) + 1) / 2
+        features = numpy.asarray(features, dtype=numpy.float32)
+        for step in range(steps):
+            error = self.evaluate_features(features) - targets
+            self.weights -= learning_rate * (features.T @ error / len(targets) + ridge * self.weights)
+            self.bias -= learning_rate * float(error.mean())
+
+    def save(self, path):
+        numpy.savez(path, weights=self.weights, bias=self.bias)
+
+    @classmethod
+    def load(cls, path, encoder=None):
+        with numpy.load(path) as data:
+            return cls(encoder, data['weights'], float(data['bias']))
+
+
+class EvaluationQueue:
+    """Collects position evaluations from many games or search threads and evaluates them in batches.
+
+    submit returns a Future for the value of a raw state row. A worker thread waits until max_batch positions are
+    pending, or max_wait seconds after the oldest pending position, and evaluates them all with one call of
+    evaluate_batch, which takes a matrix of raw rows and returns an array of values. When every producer blocks on
+    its result, as searches in threads do, max_batch is best set to the number of producers so a batch is evaluated
+    as soon as each has submitted. With start=False there is no worker thread and pending positions are evaluated
+    when flush is called, for a single thread stepping many games."""
+
+    def __init__(self, evaluate_batch, max_batch=256, max_wait=0.002, start=True):
+        if max_batch < 1:
+            raise ValueError("Error creating evaluation queue. Maximum batch size must be at least 1")
+
+        self.evaluate_batch = evaluate_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.batches = 0
+        self.positions = 0
+
+        self.thread = None
+        if start:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def submit(self, raw_state):
+        future = Future()
+        with self.condition:
+            if self.closed:
+                raise ValueError("Error submitting evaluation. The evaluation queue is closed")
+            self.pending.append((raw_state, future, time.perf_counter()))
+            if len(self.pending) == 1 or len(self.pending) >= self.max_batch:
+                self.condition.notify()
+        return future
+
+    def evaluate(self, raw_state):
+        """Submits a position and waits for its value"""
+        future = self.submit(raw_state)
+        if self.thread is None:
+            self.flush()
+        return future.result()
+
+    def take_batch(self):
+        batch = self.pending[:self.max_batch]
+        del self.pending[:self.max_batch]
+        return batch
+
+    def evaluate_pending(self, batch):
+        try:
+            values = self.evaluate_batch(numpy.stack([raw_state for raw_state, future, submitted in batch]))
+        except Exception as error:
+            for raw_state, future, submitted in batch:
+                future.set_exception(error)
+            return
+        for (raw_state, future, submitted), value in zip(batch, values):
+            future.set_result(float(value))
+        self.batches += 1
+        self.positions += len(batch)
+
+    def flush(self):
+        """Evaluates every pending position in the calling thread"""
+        while True:
+            with self.condition:
+                batch = self.take_batch()
+            if len(batch) == 0:
+                return
+            self.evaluate_pending(batch)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while len(self.pending) == 0 and not self.closed:
+                    self.condition.wait()
+                if len(self.pending) == 0:
+                    return
+
+                # Wait for the batch to fill, but no longer than max_wait after the oldest position was submitted
+                deadline = self.pending[0][2] + self.max_wait
+                while len(self.pending) < self.max_batch and not self.closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch = self.take_batch()
+
+            self.evaluate_pending(batch)
+
+    def close(self):
+        """Evaluates the positions still pending and stops the worker thread"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
+
+    def mean_batch_size(self):
+        return self.positions / self.batches if self.batches > 0 else 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "<EvaluationQueue: %s positions in %s batches>" % (self.positions, self.batches)
+
+
+class QueuedEvaluation:
+    """Leaf evaluation for searches that sends positions through an evaluation queue, so searches running in
+    several threads share batches"""
+
+    def __init__(self, queue, encoder):
+        self.queue = queue
+        self.encoder = encoder
+
+    def __call__(self, game):
+        return self.queue.evaluate(self.encoder.raw_state(game))
+
+
+def play_queued_games(seeds, evaluator=None, side='usa', time_limit=0.05, rollout_decisions=5, max_wait=0.002,
+                      optional_cards='1'):
+    """Plays one game per seed, each in a thread of its own, with a search bot for the side against a random bot.
+    The leaf positions of every search go through one evaluation queue, so the searches of different games share
+    batches. Returns the game records with the batches, positions and mean batch size of the queue.
+
+    A batch is evaluated once every running game has submitted a position, or max_wait after the first. The engine
+    is pure Python, so the threads share one core: they batch their evaluations but do not play faster."""
+    evaluator = evaluator if evaluator is not None else LinearEvaluator()
+    seeds = list(seeds)
+    records = [None] * len(seeds)
+    queue = EvaluationQueue(evaluator.evaluate_batch, max_batch=max(1, len(seeds)), max_wait=max_wait)
+    start_time = time.perf_counter()
+
+    def play(index, seed):
+        search_bot = SearchBot(seed * 2, time_limit, rollout_decisions=rollout_decisions,
+                               leaf_evaluation=QueuedEvaluation(queue, evaluator.encoder))
+        bots = {side: search_bot, 'usa' if side == 'ussr' else 'ussr': RandomBot(seed * 2 + 1)}
+        game = TwilightStruggleGame("Queued {s}".format(s=seed), "", optional_cards, "", seed, bots, log_sink=None)
+        game.report_sink = None
+        try:
+            game.play()
+        except Exception as error:
+            game.end_reason = 'error: ' + type(error).__name__ + ': ' + str(error)
+        finally:
+            # One producer fewer, so batches no longer wait for this game
+            with queue.condition:
+                queue.max_batch = max(1, queue.max_batch - 1)
+                queue.condition.notify()
+        records[index] = game_record(game, bots['usa'].name, bots['ussr'].name)
+
+    threads = [threading.Thread(target=play, args=(index, seed)) for index, seed in enumerate(seeds)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.close()
+
+    return {'records': records,
+            'games': len(seeds),
+            'batches': queue.batches,
+            'positions': queue.positions,
+            'mean batch size': queue.mean_batch_size(),
+            'seconds': time.perf_counter() - start_time}
+
+
+def main():
+    """Usage: python ts_evaluation.py [GAMES] [SECONDS PER DECISION]"""
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    time_limit = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    result = play_queued_games(range(1, games + 1), time_limit=time_limit)
+    errors = sum(1 for record in result['records'] if record['end_reason'].startswith('error'))
+    log_string = "{g} games in threads: {p:,} positions in {b:,} batches, mean batch size {m:.2f}, {e} errors, " \
+                 "{s:.1f}s".format(g=result['games'], p=result['positions'], b=result['batches'],
+                                   m=result['mean batch size'], e=errors, s=result['seconds'])
+    print(log_string)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+# Numeric features of twilight struggle game states, for training evaluation models
+import contextlib
+import os
+
+import numpy
+
+from ts_app import TwilightStruggleGame, TwilightStruggleDefinitions
+from ts_sim import create_bot
+
+
+class FeatureEncoder:
+    """Encodes game states as fixed-size vectors.
+
+    A state is first read into a row of raw integers (influence, card locations, effects and tracks). All other
+    features are computed from a matrix of raw rows at once, so encoding a batch has no per-state Python loop."""
+
+    piles = ['early war', 'mid war', 'late war', 'deck', 'discard', 'removed', 'USA hand', 'USSR hand',
+             'USA China', 'USSR China']
+    regions = ['Europe', 'Asia', 'Middle East', 'Africa', 'Central America', 'South America']
+    score_types = ['no influence', 'presence', 'domination', 'control']
+
+    def __init__(self):
+        definitions = TwilightStruggleDefinitions.load()
+
+        self.country_names = [country.name for country in definitions.countries]
+        self.card_names = [card.name for card in definitions.cards] + ['China']
+        self.country_index = {name: index for index, name in enumerate(self.country_names)}
+        self.card_index = {name: index for index, name in enumerate(self.card_names)}
+        self.pile_index = {name: index for index, name in enumerate(self.piles)}
+
+        countries = len(self.country_names)
+        cards = len(self.card_names)
+
+        self.stability = numpy.array([country.stability for country in definitions.countries])
+        self.battleground = numpy.array([country.battleground for country in definitions.countries])
+        self.region_matrix = numpy.zeros((countries, len(self.regions)))
+        for index, country in enumerate(definitions.countries):
+            self.region_matrix[index, self.regions.index(country.region)] = 1
+        self.battleground_matrix = self.region_matrix * self.battleground[:, None]
+        self.battlegrounds_in_region = self.battleground_matrix.sum(axis=0)
+
+        self.card_ops = numpy.array([card.ops for card in definitions.cards] + [4])
+        self.card_scoring = numpy.array([card.event_type == 'scoring' for card in definitions.cards] + [False])
+
+        # Layout of a raw state row
+        self.usa_slice = slice(0, countries)
+        self.ussr_slice = slice(countries, 2 * countries)
+        self.location_slice = slice(2 * countries, 2 * countries + cards)
+        self.effect_slice = slice(2 * countries + cards, 2 * countries + 2 * cards)
+        self.track_names = ['defcon', 'score', 'usa space', 'ussr space', 'usa military ops', 'ussr military ops',
+                            'turn', 'action round', 'phasing', 'china face up']
+        self.track_start = 2 * countries + 2 * cards
+        self.raw_size = self.track_start + len(self.track_names)
+
+        self.feature_names = self.build_feature_names()
+        self.size = len(self.feature_names)
+
+    def build_feature_names(self):
+        names = []
+        names += ['usa influence: ' + name for name in self.country_names]
+        names += ['ussr influence: ' + name for name in self.country_names]
+        names += ['usa control: ' + name for name in self.country_names]
+        names += ['ussr control: ' + name for name in self.country_names]
+        for side in ['usa', 'ussr']:
+            for region in self.regions:
+                names += [side + ' ' + score_type + ': ' + region for score_type in self.score_types]
+        for card in self.card_names:
+            names += [pile + ': ' + card for pile in self.piles]
+        names += ['effect active: ' + name for name in self.card_names]
+        for side in ['usa', 'ussr']:
+            names += [side + ' hand cards', side + ' hand ops', side + ' hand scoring cards']
+        names += ['defcon ' + str(level) for level in range(1, 6)]
+        names += ['score', 'usa space', 'ussr space', 'usa military ops', 'ussr military ops', 'turn',
+                  'action round', 'usa phasing', 'ussr phasing', 'china face up']
+        return names
+
+    def raw_state(self, game):
+        """Reads the state of a game into a row of integers"""
+        row = numpy.zeros(self.raw_size, dtype=numpy.int16)
+
+        for name, country in game.countries.items():
+            index = self.country_index[name]
+            row[index] = country.usa_influence
+            row[self.ussr_slice.start + index] = country.ussr_influence
+
+        # Cards that are not in the game, such as unused optional cards, have location -1
+        row[self.location_slice] = -1
+        for pile_name, pile in game.piles.items():
+            pile_number = self.pile_index[pile_name]
+            for card_name in pile.cards:
+                row[self.location_slice.start + self.card_index[card_name]] = pile_number
+
+        for name, card in game.cards.items():
+            if name != 'China' and card.effect_active:
+                row[self.effect_slice.start + self.card_index[name]] = 1
+
+        phasing = {'usa': 1, 'ussr': 2}.get(game.phasing, 0)
+        row[self.track_start:] = [game.defcon, game.score, game.sides['usa'].space_level,
+                                  game.sides['ussr'].space_level, game.sides['usa'].military_ops,
+                                  game.sides['ussr'].military_ops, game.turn, game.ar, phasing,
+                                  game.cards['China'].face_up]
+        return row
+
+    def raw_states(self, games):
+        return numpy.stack([self.raw_state(game) for game in games])
+
+    def encode_batch(self, raw):
+        """Encodes a matrix of raw state rows into a matrix of features, one row per state"""
+        raw = numpy.atleast_2d(raw).astype(numpy.int32)
+        states = raw.shape[0]
+        usa = raw[:, self.usa_slice]
+        ussr = raw[:, self.ussr_slice]
+
+        usa_control = (usa - ussr) >= self.stability
+        ussr_control = (ussr - usa) >= self.stability
+
+        features = [usa / 10, ussr / 10, usa_control, ussr_control]
+
+        # Region score types, following TwilightStruggleGame.score_type
+        usa_countries = usa_control @ self.region_matrix
+        ussr_countries = ussr_control @ self.region_matrix
+        usa_bgs = usa_control @ self.battleground_matrix
+        ussr_bgs = ussr_control @ self.battleground_matrix
+        for side_countries, side_bgs, other_countries, other_bgs in [(usa_countries, usa_bgs, ussr_countries, ussr_bgs),
+                                                                     (ussr_countries, ussr_bgs, usa_countries, usa_bgs)]:
+            level = (side_countries > 0).astype(numpy.int8)
+            domination = (side_countries > other_countries) & (side_bgs > other_bgs) & (side_countries > side_bgs)
+            control = (side_countries > other_countries) & (side_bgs == self.battlegrounds_in_region)
+            level[domination] = 2
+            level[control] = 3
+            features.append(numpy.eye(len(self.score_types))[level].reshape(states, -1))
+
+        # Card locations as one-hot piles, cards outside the game have no pile
+        locations = raw[:, self.location_slice]
+        one_hot = numpy.eye(len(self.piles) + 1)[locations + 1][:, :, 1:]
+        features.append(one_hot.reshape(states, -1))
+        features.append(raw[:, self.effect_slice])
+
+        for hand in ['USA hand', 'USSR hand']:
+            in_hand = locations == self.pile_index[hand]
+            features.append(numpy.stack([in_hand.sum(axis=1),
+                                         in_hand @ self.card_ops,
+                                         in_hand @ self.card_scoring], axis=1))
+
+        tracks = raw[:, self.track_start:]
+        features.append(numpy.eye(5)[numpy.clip(tracks[:, 0], 1, 5) - 1])
+        features.append(numpy.stack([tracks[:, 1] / 20,
+                                     tracks[:, 2] / 8,
+                                     tracks[:, 3] / 8,
+                                     tracks[:, 4] / 5,
+                                     tracks[:, 5] / 5,
+                                     tracks[:, 6] / 10,
+                                     tracks[:, 7] / 8,
+                                     tracks[:, 8] == 1,
+                                     tracks[:, 8] == 2,
+                                     tracks[:, 9]], axis=1))
+
+        return numpy.concatenate([numpy.asarray(feature, dtype=numpy.float32) for feature in features], axis=1)
+
+    def encode(self, game):
+        return self.encode_batch(self.raw_state(game))[0]
+
+
+class DatasetWriter:
+    """Writes encoded positions and labels to numbered .npz shards of at most shard_size positions"""
+
+    def __init__(self, directory, encoder, shard_size=100000, prefix='positions'):
+        self.directory = directory
+        self.encoder = encoder
+        self.shard_size = shard_size
+        self.prefix = prefix
+
+        self.raw = []
+        self.labels = []
+        self.shard_number = 0
+        self.positions_written = 0
+        self.paths = []
+
+        os.makedirs(directory, exist_ok=True)
+
+    def add(self, raw_state, label):
+        self.raw.append(raw_state)
+        self.labels.append(label)
+        if len(self.raw) >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.raw) == 0:
+            return
+
+        raw = numpy.stack(self.raw)
+        path = os.path.join(self.directory, "{p}-{n:05d}.npz".format(p=self.prefix, n=self.shard_number))
+        numpy.savez_compressed(path,
+                               features=self.encoder.encode_batch(raw),
+                               labels=numpy.asarray(self.labels, dtype=numpy.float32),
+                               raw=raw)
+
+        self.paths.append(path)
+        self.positions_written += len(self.raw)
+        self.shard_number += 1
+        self.raw = []
+        self.labels = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PositionRecorder:
+    """Wraps a bot and records the raw state every time the bot chooses a card"""
+
+    def __init__(self, bot, encoder):
+        self.bot = bot
+        self.encoder = encoder
+        self.positions = []
+        self.name = bot.name
+
+    def choose(self, game, side, decision, options):
+        if decision == 'card':
+            self.positions.append(self.encoder.raw_state(game))
+        return self.bot.choose(game, side, decision, options)
+
+
+def collect_positions(seeds, writer, usa_bot='random', ussr_bot='random', optional_cards='1'):
+    """Plays a game for each seed and adds every recorded position to the writer. Positions are labelled 1 when the
+    USA won the game, -1 when the USSR won, and 0 otherwise."""
+    outcomes = {'usa': 1, 'ussr': -1, '': 0}
+
+    for seed in seeds:
+        recorders = {'usa': PositionRecorder(create_bot(usa_bot, seed * 2), writer.encoder),
+                     'ussr': PositionRecorder(create_bot(ussr_bot, seed * 2 + 1), writer.encoder)}
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            game = TwilightStruggleGame("Positions {s}".format(s=seed), "", optional_cards, "", seed, recorders)
+            game.report_sink = None
+            try:
+                game.play()
+            except Exception:
+                # Positions from games that hit an engine error are not labelled
+                continue
+
+        label = outcomes[game.get_winner()]
+        for recorder in recorders.values():
+            for raw_state in recorder.positions:
+                writer.add(raw_state, label)
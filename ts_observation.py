@@ -0,0 +1,260 @@
+# Read-only views of a twilight struggle game as seen by one side
+import weakref
+from types import MappingProxyType, MethodType
+
+from ts_app import Card, Country
+
+# Attributes of the game that every player can see
+public_attributes = ('name', 'turn', 'turns', 'ar', 'defcon', 'score', 'phase', 'phasing', 'game_active',
+                     'active_card', 'chernobyl', 'opponent', 'hands', 'china_owner', 'pile_owners',
+                     'headlines', 'event_scores', 'cards_drawn', 'end_reason')
+
+# What each proxy and view wraps, by the id of the proxy or view. It is kept here instead of in attributes, so a bot
+# holding a view cannot read the game behind it. Entries are removed when their proxy or view is collected.
+_wrapped = {}
+
+
+def _wrap(holder, *contents):
+    _wrapped[id(holder)] = contents
+    weakref.finalize(holder, _wrapped.pop, id(holder), None)
+
+
+def _unwrap(holder):
+    return _wrapped[id(holder)]
+
+
+def _frozen(value):
+    """Read-only copy of public data, with nested dicts behind mapping proxies and lists as tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _frozen(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(item) for item in value)
+    return value
+
+
+class ReadOnly:
+    """Read-only proxy of an object of the game. Attributes are read through to the object, so the proxy always shows
+    the current state, except the hidden attributes, private attributes, methods and the link back to the game."""
+
+    __slots__ = ('__weakref__',)
+
+    def __init__(self, target, hidden=()):
+        _wrap(self, target, hidden)
+
+    def __getattribute__(self, name):
+        target, hidden = _unwrap(self)
+        if name.startswith('_') or name == 'game' or name in hidden:
+            raise AttributeError("{n} is hidden in an observation view".format(n=name))
+        value = getattr(target, name)
+        if isinstance(value, MethodType):
+            # A bound method could change the object, and links back to it
+            raise AttributeError("Methods such as {n} cannot be called in an observation view".format(n=name))
+        return value
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Observation views are read-only")
+
+    def __eq__(self, other):
+        target = _unwrap(self)[0]
+        return target is (_unwrap(other)[0] if isinstance(other, ReadOnly) else other)
+
+    def __hash__(self):
+        return id(_unwrap(self)[0])
+
+    def __repr__(self):
+        return "<ReadOnly: %r>" % (_unwrap(self)[0],)
+
+    def __str__(self):
+        return str(_unwrap(self)[0])
+
+
+class ReadOnlyMapping:
+    """Read-only mapping that wraps each value in a ReadOnly proxy as it is read, without copying the mapping"""
+
+    __slots__ = ('__weakref__',)
+
+    def __init__(self, mapping, hidden=()):
+        _wrap(self, mapping, hidden)
+
+    def __getattribute__(self, name):
+        if name.startswith('_'):
+            raise AttributeError("{n} is hidden in an observation view".format(n=name))
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Observation views are read-only")
+
+    def __getitem__(self, key):
+        mapping, hidden = _unwrap(self)
+        return ReadOnly(mapping[key], hidden)
+
+    def __contains__(self, key):
+        return key in _unwrap(self)[0]
+
+    def __iter__(self):
+        return iter(list(_unwrap(self)[0]))
+
+    def __len__(self):
+        return len(_unwrap(self)[0])
+
+    def keys(self):
+        return list(_unwrap(self)[0])
+
+    def values(self):
+        mapping, hidden = _unwrap(self)
+        return [ReadOnly(value, hidden) for value in mapping.values()]
+
+    def items(self):
+        mapping, hidden = _unwrap(self)
+        return [(key, ReadOnly(value, hidden)) for key, value in mapping.items()]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+class PileView:
+    """View of a pile. The cards of a hidden pile, and the order of any draw pile, are not shown, only its size."""
+
+    __slots__ = ('__weakref__',)
+
+    def __init__(self, pile, visible):
+        _wrap(self, pile, visible)
+
+    def __getattribute__(self, name):
+        if name.startswith('_'):
+            raise AttributeError("{n} is hidden in an observation view".format(n=name))
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Observation views are read-only")
+
+    @property
+    def name(self):
+        return _unwrap(self)[0].name
+
+    @property
+    def visible(self):
+        return _unwrap(self)[1]
+
+    @property
+    def cards(self):
+        pile, visible = _unwrap(self)
+        if not visible:
+            raise AttributeError("The cards in {p} are hidden in an observation view".format(p=pile.name))
+        return ReadOnlyMapping(pile.cards, ('game',))
+
+    def get_pile_size(self):
+        return len(_unwrap(self)[0].cards)
+
+    def get_cards_in_pile(self):
+        return list(self.cards.values())
+
+    def __repr__(self):
+        pile, visible = _unwrap(self)
+        return "<PileView: %s, %s cards%s>" % (pile.name, len(pile.cards), '' if visible else ', hidden')
+
+
+class ObservationView:
+    """What one side can see of a game: everything public and its own hand, but not the opponent's hand, the order of
+    the deck, the state hash or the bots.
+
+    The view reads through to the game instead of copying it, so it is cheap to create and always shows the current
+    state. Objects of the game are returned behind read-only proxies, and the game itself is kept out of reach of
+    attribute reads. to_dict gives the same information as plain data, for sending to clients."""
+
+    def __init__(self, game, side):
+        if side not in ['usa', 'ussr']:
+            raise ValueError("Error creating observation view. Side must be 'usa' or 'ussr'")
+
+        _wrap(self, game)
+        object.__setattr__(self, 'side', side)
+        hidden_piles = ['deck', game.hands[game.opponent[side]]]
+        object.__setattr__(self, 'piles', MappingProxyType({name: PileView(pile, name not in hidden_piles)
+                                                            for name, pile in game.piles.items()}))
+        object.__setattr__(self, 'countries', ReadOnlyMapping(game.countries))
+        object.__setattr__(self, 'cards', ReadOnlyMapping(game.cards, ('game',)))
+        object.__setattr__(self, 'sides', ReadOnlyMapping(game.sides, ('bot',)))
+        object.__setattr__(self, 'active_effects', MappingProxyType({hook: ReadOnlyMapping(effects, ('game',))
+                                                                     for hook, effects in
+                                                                     game.active_effects.items()}))
+
+    def __getattribute__(self, name):
+        if name.startswith('_'):
+            raise AttributeError("{n} is not part of an observation view".format(n=name))
+        return object.__getattribute__(self, name)
+
+    def __getattr__(self, name):
+        if name not in public_attributes:
+            raise AttributeError("{n} is not part of an observation view".format(n=name))
+        value = getattr(_unwrap(self)[0], name)
+        if name == 'active_card' and value is not None:
+            return ReadOnly(value, ('game',))
+        return _frozen(value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Observation views are read-only")
+
+    @property
+    def hand(self):
+        game = _unwrap(self)[0]
+        return self.piles[game.hands[self.side]].cards
+
+    @property
+    def opponent_hand_size(self):
+        game = _unwrap(self)[0]
+        return self.piles[game.hands[game.opponent[self.side]]].get_pile_size()
+
+    def get_influence(self, country_name, side):
+        return _unwrap(self)[0].get_influence(country_name, side)
+
+    def to_dict(self):
+        game = _unwrap(self)[0]
+        return {'side': self.side,
+                'turn': game.turn,
+                'action round': game.ar,
+                'phase': game.phase,
+                'phasing': game.phasing,
+                'defcon': game.defcon,
+                'score': game.score,
+                'space': {side: player.space_level for side, player in game.sides.items()},
+                'military ops': {side: player.military_ops for side, player in game.sides.items()},
+                'influence': {name: [country.usa_influence, country.ussr_influence]
+                              for name, country in game.countries.items()
+                              if country.usa_influence > 0 or country.ussr_influence > 0},
+                'piles': {name: sorted(game.piles[name].cards) if view.visible else view.get_pile_size()
+                          for name, view in self.piles.items()},
+                'china face up': game.cards['China'].face_up,
+                'active card': game.active_card.name if game.active_card is not None else None,
+                'effects': sorted(name for name, card in game.cards.items()
+                                  if name != 'China' and card.effect_active),
+                'played': sorted(name for name, card in game.cards.items() if name != 'China' and card.played),
+                'headlines': [list(headline) for headline in game.headlines],
+                'cards drawn': {side: dict(drawn) for side, drawn in game.cards_drawn.items()}}
+
+    def __repr__(self):
+        return "<ObservationView: %s, %s>" % (_unwrap(self)[0].name, self.side)
+
+
+def observation(game, side):
+    return ObservationView(game, side)
+
+
+class RedactedBot:
+    """Wraps a bot so that it decides from the observation view of its side instead of the whole game"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.name = bot.name
+        self.views = {}
+
+    def choose(self, game, side, decision, options):
+        if (id(game), side) not in self.views:
+            self.views = {(id(game), side): ObservationView(game, side)}
+
+        # Cards and countries link back to the game, so they are offered behind proxies
+        options_view = [ReadOnly(option, ('game',)) if isinstance(option, (Card, Country)) else option
+                        for option in options]
+        choice = self.bot.choose(self.views[(id(game), side)], side, decision, options_view)
+        if isinstance(choice, ReadOnly):
+            return _unwrap(choice)[0]
+        return choice
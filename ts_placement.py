@@ -0,0 +1,216 @@
+# Search for the best influence placements in twilight struggle
+import heapq
+from operator import itemgetter
+
+
+def default_country_value(country, side, influence, controlled):
+    """Small value for the influence itself, so placements that score the same prefer battlegrounds"""
+    return influence * (0.1 if country.battleground else 0.05)
+
+
+def influence_for_ops(country, side, ops):
+    """Returns the influence gained by spending the ops in the country, or None when the ops cannot all be spent.
+    Follows place_influence_from_list and check_enough_influence_to_add: each point costs 2 ops while the opponent
+    controls the country."""
+    side_influence = country.usa_influence if side == 'usa' else country.ussr_influence
+    opponent_influence = country.ussr_influence if side == 'usa' else country.usa_influence
+    influence = 0
+
+    while ops > 0:
+        if opponent_influence - side_influence >= country.stability:
+            if ops < 2:
+                return None
+            ops -= 2
+        else:
+            ops -= 1
+        side_influence += 1
+        influence += 1
+
+    return influence
+
+
+def control_after(country, side, influence):
+    usa_influence = country.usa_influence + (influence if side == 'usa' else 0)
+    ussr_influence = country.ussr_influence + (influence if side == 'ussr' else 0)
+    if usa_influence - ussr_influence >= country.stability:
+        return 'usa'
+    elif ussr_influence - usa_influence >= country.stability:
+        return 'ussr'
+    return ''
+
+
+def keep_best(entries, top_k):
+    return heapq.nlargest(top_k, entries, key=itemgetter(0))
+
+
+class PlacementOptimizer:
+    """Finds the best ways to place influence with a number of ops, following the rules of action_place_influence.
+
+    A placement is valued by the change in region points for the side, plus country_value for each country placed in.
+    Regions score independently, so each region is searched with a dynamic program over its countries, keyed by the
+    ops used and the change in the counts that decide the region's score. Regions are then combined as a knapsack
+    over ops. Only the top_k partial placements are kept for each key."""
+
+    def __init__(self, game, side, top_k=5, country_value=default_country_value, region_weight=1.0):
+        if side not in ['usa', 'ussr']:
+            raise ValueError("Error creating placement optimizer. Side must be 'usa' or 'ussr'")
+        if top_k < 1:
+            raise ValueError("Error creating placement optimizer. Top k must be at least 1")
+
+        self.game = game
+        self.side = side
+        self.top_k = top_k
+        self.country_value = country_value
+        self.region_weight = region_weight
+        self.sign = 1 if side == 'usa' else -1
+
+    def targets(self):
+        """Countries the side may place influence in, leaving out the Chernobyl region"""
+        game = self.game
+        placement_effects = game.active_effects['placement']
+        targets = game.accessible_countries(self.side)
+        if 'Chernobyl' in placement_effects and placement_effects['Chernobyl'].effect_side == self.side:
+            targets = [country for country in targets if country.region != game.chernobyl]
+        return targets
+
+    def bonus_zone(self, china_card_played):
+        """Returns a test for the countries that earn a bonus influence when every op is placed in them"""
+        game = self.game
+        if china_card_played:
+            # Event 6 - China card
+            return lambda country: country.region == 'Asia'
+        if 'Vietnam Revolts' in game.active_effects['placement'] and self.side == 'ussr':
+            # Event 9 - Vietnam Revolts
+            return lambda country: country.subregion == 'Southeast Asia'
+        return None
+
+    def country_options(self, country, ops, in_zone):
+        """Lists the ways to spend ops in one country as (ops, value, change in region counts, outside zone)"""
+        game = self.game
+        formosan = 'Formosan Resolution' in game.active_effects['scoring'] and country.region == 'Asia'
+        before = game.region_contribution(country, country.controlled, formosan)
+        options = []
+
+        for spent in range(1, ops + 1):
+            influence = influence_for_ops(country, self.side, spent)
+            if influence is None:
+                continue
+            controlled = control_after(country, self.side, influence)
+            after = game.region_contribution(country, controlled, formosan)
+            delta = tuple(a - b for a, b in zip(after, before))
+            value = self.country_value(country, self.side, influence, controlled)
+            options.append((spent, value, delta, not in_zone))
+
+        return options
+
+    def search_region(self, region, countries, ops, zone):
+        """Returns the top placements within one region for each number of ops and zone flag"""
+        game = self.game
+        zero = (0,) * len(game.region_count_names)
+        states = {(0, zero, False): [(0.0, ())]}
+
+        for country in countries:
+            in_zone = zone(country) if zone is not None else True
+            options = self.country_options(country, ops, in_zone)
+            new_states = {key: list(entries) for key, entries in states.items()}
+
+            for (used, delta, outside), entries in states.items():
+                for spent, value, country_delta, country_outside in options:
+                    if used + spent > ops:
+                        continue
+                    key = (used + spent, tuple(a + b for a, b in zip(delta, country_delta)), outside or country_outside)
+                    extended = [(total + value, placement + ((country.name, spent),)) for total, placement in entries]
+                    new_states[key] = keep_best(new_states.get(key, []) + extended, self.top_k)
+
+            states = new_states
+
+        # Score each distinct change in counts once
+        formosan = 'Formosan Resolution' in game.active_effects['scoring'] and region == 'Asia'
+        base_counts = [0] * len(game.region_count_names)
+        for country in game.countries_by_region[region]:
+            for index, count in enumerate(game.region_contribution(country, country.controlled, formosan)):
+                base_counts[index] += count
+        base_points = game.score_region_counts(region, base_counts)['points']
+
+        region_points = {}
+        results = {}
+        for (used, delta, outside), entries in states.items():
+            if used == 0:
+                continue
+            if delta not in region_points:
+                counts = [base + change for base, change in zip(base_counts, delta)]
+                region_points[delta] = game.score_region_counts(region, counts)['points'] - base_points
+            region_value = self.sign * region_points[delta] * self.region_weight
+            key = (used, outside)
+            scored = [(total + region_value, placement) for total, placement in entries]
+            results[key] = keep_best(results.get(key, []) + scored, self.top_k)
+
+        return results
+
+    def search(self, countries, ops, zone):
+        """Combines the regions as a knapsack over ops, keyed by ops used and whether a country outside the zone was
+        used"""
+        regions = {}
+        for country in countries:
+            regions.setdefault(country.region, []).append(country)
+
+        states = {(0, False): [(0.0, ())]}
+        for region, region_countries in regions.items():
+            region_results = self.search_region(region, region_countries, ops, zone)
+            new_states = {key: list(entries) for key, entries in states.items()}
+
+            for (used, outside), entries in states.items():
+                for (region_used, region_outside), region_entries in region_results.items():
+                    if used + region_used > ops:
+                        continue
+                    key = (used + region_used, outside or region_outside)
+                    combined = [(total + region_total, placement + region_placement)
+                                for total, placement in entries
+                                for region_total, region_placement in region_entries]
+                    new_states[key] = keep_best(new_states.get(key, []) + combined, self.top_k)
+
+            states = new_states
+
+        return states
+
+    def best_placements(self, ops, china_card_played=None):
+        """Returns up to top_k placements that spend exactly the ops, best first. Each is a dict with the value, the
+        placement as [country name, ops] pairs in the format of action_place_influence, and whether it includes the
+        China or Vietnam bonus influence. A bonus influence is counted as one more op placed in the bonus zone."""
+        game = self.game
+        if china_card_played is None:
+            china_card_played = game.active_card is game.cards['China']
+
+        targets = self.targets()
+        zone = self.bonus_zone(china_card_played)
+        results = []
+
+        states = self.search(targets, ops, zone)
+        for (used, outside), entries in states.items():
+            # Placements that stay inside the bonus zone always receive the bonus, so they are searched separately
+            if used == ops and (zone is None or outside):
+                results += [(value, placement, False) for value, placement in entries]
+
+        if zone is not None:
+            zone_targets = [country for country in targets if zone(country)]
+            zone_states = self.search(zone_targets, ops + 1, None)
+            results += [(value, placement, True) for value, placement in zone_states.get((ops + 1, False), [])]
+
+        best = []
+        for value, placement, bonus in keep_best(results, self.top_k):
+            best.append({'value': value,
+                         'placement': [[country_name, spent] for country_name, spent in placement],
+                         'bonus': bonus})
+        return best
+
+
+def best_placements(game, ops, side, top_k=5, country_value=default_country_value):
+    return PlacementOptimizer(game, side, top_k, country_value).best_placements(ops)
+
+
+def format_placement(placement):
+    """Formats a placement for a hint, for example 'Iran 2, Iraq 1 (+1 bonus)'"""
+    text = ', '.join("{c} {o}".format(c=country_name, o=spent) for country_name, spent in placement['placement'])
+    if placement['bonus']:
+        text += ' (+1 bonus)'
+    return "{t} [{v:+.2f}]".format(t=text, v=placement['value'])
@@ -0,0 +1,227 @@
+# Aggregate queries over archives of simulated twilight struggle games
+import multiprocessing
+
+import numpy
+
+from ts_app import TwilightStruggleDefinitions
+from ts_archive import GameArchive, winners, end_reasons, card_bits
+
+scalar_fields = ['game_id', 'winner', 'end_reason', 'turn', 'score']
+card_fields = ['events', 'headlines']
+row_fields = ['games', 'usa', 'ussr', 'draw', 'values', 'sum']
+
+
+def card_number(card):
+    """Returns the number of a card given by name or number"""
+    if isinstance(card, int):
+        return card
+    for definition in TwilightStruggleDefinitions.load().cards:
+        if definition.name == card:
+            return definition.number
+    if card == 'China':
+        return 6
+    raise ValueError("Error creating query. Unknown card " + str(card))
+
+
+def card_name(number):
+    for definition in TwilightStruggleDefinitions.load().cards:
+        if definition.number == number:
+            return definition.name
+    return 'China' if number == 6 else str(number)
+
+
+class ScoringSwings:
+    """Values for a query: the score change of each time the scoring card was played, keyed by turn"""
+
+    def __init__(self, card):
+        self.card = card_number(card)
+
+    def __call__(self, record):
+        for turn, number, change in record.get('event_scores', []):
+            if number == self.card:
+                yield turn, change
+
+
+class Query:
+    """An aggregate query over the games in archives.
+
+    where filters games on the fields of the archive index, so it is tested on the mapped index without reading
+    any records. Each condition is one of:
+        a value, or a list of values - for game_id, winner, end_reason, turn and score
+        a (low, high) tuple - an inclusive range for game_id, turn and score
+        a card, or a list of cards - for events and headlines, games in which every card was played or headlined
+    Winners and end reasons are given as in game records and cards by name or number.
+
+    Without values, games are counted by outcome for each group. group_by is a scalar field, or events or
+    headlines to count each game once for every card in it. With values, a function of a record returning
+    (key, value) pairs, only the records of games that pass the filter are read, and the values are summed by key."""
+
+    def __init__(self, where=None, group_by=None, values=None):
+        if group_by is not None and group_by not in scalar_fields + card_fields:
+            raise ValueError("Error creating query. Group by must be one of: " + ", ".join(scalar_fields + card_fields))
+
+        self.conditions = []
+        for field, condition in (where or {}).items():
+            self.conditions.append(self.condition(field, condition))
+        self.group_by = group_by
+        self.values = values
+
+    @staticmethod
+    def condition(field, condition):
+        if field in card_fields:
+            cards = condition if isinstance(condition, list) else [condition]
+            return field, 'cards', card_bits(card_number(card) for card in cards)
+
+        if field not in scalar_fields:
+            raise ValueError("Error creating query. Unknown field " + str(field))
+        codes = {'winner': winners, 'end_reason': end_reasons}.get(field)
+        if isinstance(condition, tuple):
+            if codes is not None:
+                raise ValueError("Error creating query. Ranges cannot be used with " + field)
+            return field, 'range', condition
+        values = condition if isinstance(condition, list) else [condition]
+        if codes is not None:
+            values = [codes.index(value) for value in values]
+        return field, 'in', numpy.array(values)
+
+    def mask(self, entries):
+        mask = numpy.ones(len(entries), dtype=bool)
+        for field, kind, condition in self.conditions:
+            column = entries[field]
+            if kind == 'cards':
+                mask &= numpy.all((column & condition) == condition, axis=1)
+            elif kind == 'range':
+                mask &= (column >= condition[0]) & (column <= condition[1])
+            else:
+                mask &= numpy.isin(column, condition)
+        return mask
+
+
+def add_row(table, key, row):
+    if key not in table:
+        table[key] = dict.fromkeys(row_fields, 0)
+    for field in row_fields:
+        table[key][field] += row[field]
+
+
+def merge_tables(table, other):
+    for key, row in other.items():
+        add_row(table, key, row)
+    return table
+
+
+def count_outcomes(table, keys, winner_codes, key_columns=None):
+    """Counts games by outcome for each key. With key_columns, keys are card numbers and a game counts for every
+    card set in its row."""
+    for code, outcome in enumerate(['draw', 'usa', 'ussr']):
+        selected = winner_codes == code
+        if key_columns is not None:
+            counts = key_columns[selected].sum(axis=0)
+            found = numpy.flatnonzero(counts)
+        else:
+            found, counts = numpy.unique(keys[selected], return_counts=True)
+            counts = dict(zip(found, counts))
+        for key in found:
+            row = dict.fromkeys(row_fields, 0)
+            row['games'] = row[outcome] = int(counts[key])
+            add_row(table, int(key), row)
+
+
+def scan_shard(arguments):
+    """Runs the query over one archive in blocks of entries and returns its table"""
+    path, query, block_size = arguments
+    table = {}
+
+    with GameArchive(path, hashes=False) as archive:
+        for start in range(0, len(archive), block_size):
+            entries = archive.entries[start:start + block_size]
+            positions = numpy.flatnonzero(query.mask(entries))
+            selected = entries[positions]
+
+            if query.values is not None:
+                outcomes = {0: 'draw', 1: 'usa', 2: 'ussr'}
+                for position, winner_code in zip(positions, selected['winner']):
+                    record = archive.record(start + int(position))
+                    for key, value in query.values(record):
+                        row = dict.fromkeys(row_fields, 0)
+                        row['games'] = row[outcomes[int(winner_code)]] = 1
+                        row['values'] = 1
+                        row['sum'] = value
+                        add_row(table, key, row)
+            elif query.group_by in card_fields:
+                cards = numpy.unpackbits(selected[query.group_by], axis=1, bitorder='little')
+                count_outcomes(table, None, selected['winner'], cards)
+            elif query.group_by is not None:
+                count_outcomes(table, selected[query.group_by], selected['winner'])
+            else:
+                count_outcomes(table, numpy.zeros(len(selected), dtype=int), selected['winner'])
+            del entries, selected
+
+    return table
+
+
+def label(field, key):
+    if field == 'winner':
+        return winners[key] or 'draw'
+    if field == 'end_reason':
+        return end_reasons[key]
+    if field in card_fields:
+        return card_name(key)
+    return key
+
+
+def table_rows(table, query):
+    """Returns the rows of a table in key order, with win rates, shares of the games and mean values"""
+    total = sum(row['games'] for row in table.values())
+    rows = []
+    for key in sorted(table):
+        row = dict(table[key])
+        row['key'] = label(query.group_by, key) if query.values is None else key
+        row['usa win rate'] = row['usa'] / row['games']
+        row['ussr win rate'] = row['ussr'] / row['games']
+        row['share'] = row['games'] / total if query.group_by not in card_fields else None
+        row['mean'] = row['sum'] / row['values'] if row['values'] > 0 else None
+        rows.append(row)
+    return rows
+
+
+def scan(paths, query, workers=1, block_size=1 << 20):
+    """Runs the query over archive shards in parallel, yielding the number of shards done and the rows of the
+    table so far each time a shard finishes"""
+    arguments = [(path, query, block_size) for path in paths]
+    table = {}
+
+    if workers > 1 and len(arguments) > 1:
+        pool = multiprocessing.Pool(min(workers, len(arguments)))
+        tables = pool.imap_unordered(scan_shard, arguments)
+    else:
+        pool = None
+        tables = map(scan_shard, arguments)
+
+    try:
+        for shards, shard_table in enumerate(tables, 1):
+            merge_tables(table, shard_table)
+            yield shards, table_rows(table, query)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def run_query(paths, query, workers=1, block_size=1 << 20):
+    rows = []
+    for shards, rows in scan(paths, query, workers, block_size):
+        pass
+    return rows
+
+
+def format_rows(rows):
+    lines = ["{k:>28} {g:>9} {u:>8} {s:>8} {m:>8}".format(k='key', g='games', u='usa win', s='share', m='mean')]
+    for row in rows:
+        lines.append("{k:>28} {g:>9} {u:>8.1%} {s:>8} {m:>8}".format(
+            k=str(row['key']),
+            g=row['games'],
+            u=row['usa win rate'],
+            s="{:.1%}".format(row['share']) if row['share'] is not None else '',
+            m="{:.2f}".format(row['mean']) if row['mean'] is not None else ''))
+    return '\n'.join(lines)
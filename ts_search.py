@@ -0,0 +1,306 @@
+# Anytime Monte Carlo tree search for twilight struggle bots
+import math
+import random
+import time
+
+import numpy
+
+from ts_app import TwilightStruggleGame, RandomBot
+from ts_belief import BeliefState
+
+
+class SearchNode:
+    """Statistics of one decision in the search tree. Value is the total reward for the side making the decision
+    that leads to this node."""
+
+    __slots__ = ('side', 'children', 'visits', 'value')
+
+    def __init__(self):
+        self.side = None
+        self.children = {}
+        self.visits = 0
+        self.value = 0.0
+
+    def untried(self, options):
+        return [index for index in range(options) if index not in self.children]
+
+    def best_child(self, exploration, options):
+        """Returns the index and node of the child with the highest upper confidence bound. The same decision can
+        have fewer options in a later iteration, as the search does not tell apart positions reached through
+        different dice, so only the children that are options now are considered."""
+        log_visits = math.log(max(self.visits, 1))
+        return max(((index, child) for index, child in self.children.items() if index < options and child.visits > 0),
+                   key=lambda item: item[1].value / item[1].visits
+                   + exploration * math.sqrt(log_visits / item[1].visits))
+
+
+class RolloutLimit(Exception):
+    pass
+
+
+class ReplayError(Exception):
+    pass
+
+
+class SimulationBot:
+    """Plays both sides of a simulated game: replays the decisions of the real game up to the root, then follows and
+    grows the tree, then plays out the rest of the game with the rollout bot"""
+
+    def __init__(self, search, prefix, rng):
+        self.search = search
+        self.prefix = prefix
+        self.rng = rng
+        self.rollout_bot = RandomBot(rng.getrandbits(32))
+        self.node = search.root
+        self.path = [search.root]
+        self.in_tree = True
+        self.depth = 0
+        self.decisions = 0
+
+    def choose(self, game, side, decision, options):
+        index = game.decisions - 1
+        if index < len(self.prefix):
+            return options[self.prefix[index]]
+
+        if index == len(self.prefix):
+            # The root of the search: the dice, the other random choices of the game, the order of the deck and the
+            # opponent's hand are unknown from here on
+            if game.zobrist != self.search.root_hash:
+                raise ReplayError("Error searching. Replaying the game did not reach the position of the decision")
+            game.rng.seed(self.rng.getrandbits(64))
+            game.dice_rng.seed(self.rng.getrandbits(64))
+            game.deal_rng.seed(self.rng.getrandbits(64))
+            self.search.deal_hidden_cards(game, side, self.rng)
+            game.piles['deck'].shuffle()
+
+        self.decisions += 1
+        if self.search.rollout_decisions is not None and self.decisions > self.search.rollout_decisions:
+            raise RolloutLimit()
+
+        if not self.in_tree:
+            return self.rollout_bot.choose(game, side, decision, options)
+
+        node = self.node
+        if node.side is None:
+            node.side = side
+
+        untried = node.untried(len(options))
+        if untried:
+            # Expand one new node, then roll out
+            choice = self.rng.choice(untried)
+            node.children[choice] = SearchNode()
+            self.in_tree = False
+        else:
+            choice, _ = node.best_child(self.search.exploration, len(options))
+
+        self.node = node.children[choice]
+        self.path.append(self.node)
+        self.depth += 1
+        return options[choice]
+
+
+class AnytimeSearch:
+    """Open loop Monte Carlo tree search over the decisions of a game, run until a deadline.
+
+    A game cannot be copied in the middle of a decision, as the rest of the decision is on the call stack, so every
+    iteration replays the game from its seed with the decisions made so far. At the root it reseeds the random
+    number generators of the game and deals the opponent a hand sampled from the beliefs of the searching side, with
+    the other hidden cards shuffled into the deck, so the search sees neither the real future nor the opponent's
+    hand. Every decision of the game must have been made by a bot, as only bot decisions are logged.
+
+    Replays grow with the length of the game. An iteration is only started when it is expected to end before the
+    deadline, and the expected time decays at the start of every search so that one slow iteration does not stop
+    the searches that follow.
+
+    The tree is kept between decisions: when the next search starts from a position the tree has reached through the
+    decisions made since, that subtree becomes the root with its statistics.
+
+    With rollout_decisions, rollouts stop after that many decisions and the position is valued by leaf_evaluation,
+    a function of the game returning the value for the USA between 0 and 1, or by the score."""
+
+    def __init__(self, exploration=1.4, rollout_decisions=None, seed=None, margin=1.5, leaf_evaluation=None,
+                 decay=0.5):
+        self.exploration = exploration
+        self.rollout_decisions = rollout_decisions
+        self.leaf_evaluation = leaf_evaluation
+        self.margin = margin
+        self.decay = decay
+        self.iteration_time = 0.0
+        self.rng = random.Random(seed)
+        self.root = SearchNode()
+        self.root_index = 0
+        self.root_hash = None
+        self.statistics = {'searches': 0, 'iterations': 0, 'nodes': 0, 'decisions': 0, 'seconds': 0.0,
+                           'fallbacks': 0}
+
+    def move_root(self, game):
+        """Follows the decisions made since the last search down the tree, or starts a new tree"""
+        log = game.decision_log
+        node = self.root
+        if self.root_index > len(log):
+            node = None
+        for index in log[self.root_index:] if node is not None else []:
+            node = node.children.get(index)
+            if node is None:
+                break
+        self.root = node if node is not None else SearchNode()
+        self.root_index = len(log)
+        self.root_hash = game.zobrist
+
+    @staticmethod
+    def deal_hidden_cards(game, side, rng):
+        """Replaces the opponent's hand with one sampled from what the side can know, moving the cards between the
+        hand and the deck"""
+        hand_pile = game.piles[game.hands[game.opponent[side]]]
+        hidden = set(hand_pile.cards) | set(game.piles['deck'].cards)
+        sampled = BeliefState(game, side).determinize(numpy.random.default_rng(rng.getrandbits(64)))['hand']
+        hand = [name for name in sampled if name in hidden][:hand_pile.get_pile_size()]
+        if len(hand) < hand_pile.get_pile_size():
+            # A card being played can be sampled into the hand while it is in no pile
+            rest = sorted(hidden.difference(hand))
+            rng.shuffle(rest)
+            hand.extend(rest[:hand_pile.get_pile_size() - len(hand)])
+
+        new_hand = set(hand)
+        for name in list(hand_pile.cards):
+            if name not in new_hand:
+                game.move_card(game.cards[name], 'deck')
+        for name in hand:
+            if name not in hand_pile.cards:
+                game.move_card(game.cards[name], hand_pile.name)
+
+    def replay_game(self, game, simulation_bot):
+        replay = TwilightStruggleGame(game.name, game.date, '1' if game.optional_cards else '0', game.extra_inf,
+                                      game.seed, {'usa': simulation_bot, 'ussr': simulation_bot}, log_sink=None)
+        replay.report_sink = None
+        if game.handicap_set:
+            replay.set_handicap('usa', game.usa_handicap)
+            replay.set_handicap('ussr', game.ussr_handicap)
+        return replay
+
+    def iterate(self, game, side):
+        """Runs one simulation from the start of the game, updates the tree with its result and returns the bot that
+        played it"""
+        # The replay writes no log, so searches can run in several threads
+        simulation_bot = SimulationBot(self, game.decision_log, self.rng)
+        replay = self.replay_game(game, simulation_bot)
+        try:
+            replay.play()
+            reward = {'usa': 1.0, 'ussr': 0.0, '': 0.5}[replay.get_winner()]
+        except RolloutLimit:
+            if self.leaf_evaluation is not None:
+                reward = self.leaf_evaluation(replay)
+            else:
+                # Score the position reached, 20 points is a win
+                reward = 0.5 + max(-20, min(20, replay.score)) / 40
+        except ReplayError:
+            raise
+        except Exception:
+            # Engine errors in a simulation count as a draw
+            reward = 0.5
+
+        path = simulation_bot.path
+        path[0].visits += 1
+        for parent, child in zip(path, path[1:]):
+            child.visits += 1
+            child.value += reward if parent.side == 'usa' else 1.0 - reward
+        return simulation_bot
+
+    def search(self, game, side, options, deadline):
+        """Searches until the deadline and returns the index of the most visited option with the search statistics"""
+        if not game.replayable:
+            raise ReplayError("Error searching. The game made a decision that is not in its log")
+        start_time = time.perf_counter()
+        self.iteration_time *= self.decay
+        self.move_root(game)
+        reused = self.root.visits
+        iterations = 0
+        decisions = 0
+        max_depth = 0
+        nodes_before = self.count_nodes(self.root)
+
+        # An iteration is only started when one as slow as the slowest recent ones, with a margin, would end before the
+        # deadline. The estimate is carried over from the last search, as replays grow slowly through a game, and
+        # decayed above so a slow outlier is forgotten.
+        while time.perf_counter() + self.iteration_time * self.margin < deadline:
+            iteration_start = time.perf_counter()
+            simulation_bot = self.iterate(game, side)
+            iterations += 1
+            decisions += simulation_bot.decisions
+            max_depth = max(max_depth, simulation_bot.depth)
+            self.iteration_time = max(self.iteration_time * 0.9, time.perf_counter() - iteration_start)
+
+        elapsed = time.perf_counter() - start_time
+        nodes = self.count_nodes(self.root) - nodes_before
+        if self.root.children:
+            best, best_node = max(self.root.children.items(), key=lambda item: (item[1].visits, item[1].value))
+        else:
+            best, best_node = None, None
+
+        self.statistics['searches'] += 1
+        self.statistics['iterations'] += iterations
+        self.statistics['nodes'] += nodes
+        self.statistics['decisions'] += decisions
+        self.statistics['seconds'] += elapsed
+        # Every decision simulated, in the tree or in a rollout, is counted as a node
+        report = {'iterations': iterations,
+                  'reused visits': reused,
+                  'nodes': nodes,
+                  'decisions simulated': decisions,
+                  'seconds': elapsed,
+                  'nodes per second': decisions / elapsed if elapsed > 0 else 0.0,
+                  'depth': max_depth,
+                  'best visits': best_node.visits if best_node is not None else 0,
+                  'best value': best_node.value / best_node.visits if best_node is not None else None}
+        return best, report
+
+    @staticmethod
+    def count_nodes(node):
+        count = 0
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children.values())
+        return count
+
+
+class SearchBot:
+    """Bot that searches every decision with more than one option until the deadline of the decision. The deadline is
+    set by the game when it has a decision time, otherwise the bot allows itself time_limit seconds. The report of
+    each search is kept in searches. When a search runs no iteration, or the game cannot be replayed, the bot chooses
+    at random, logs it and counts it in the fallbacks of the search statistics."""
+
+    name = 'search'
+
+    def __init__(self, seed=None, time_limit=0.1, exploration=1.4, rollout_decisions=None, leaf_evaluation=None):
+        self.rng = random.Random(seed)
+        self.time_limit = time_limit
+        self.search = AnytimeSearch(exploration, rollout_decisions, self.rng.getrandbits(32),
+                                    leaf_evaluation=leaf_evaluation)
+        self.fallback = RandomBot(self.rng.getrandbits(32))
+        self.searches = []
+
+    def choose(self, game, side, decision, options):
+        choices = [option for option in options if option is not None]
+        if len(choices) <= 1:
+            return choices[0] if choices else None
+
+        deadline = game.decision_deadline if game.decision_time is not None else time.perf_counter() + self.time_limit
+        try:
+            best, report = self.search.search(game, side, options, deadline)
+        except ReplayError as error:
+            # Decisions made by a person, or choices outside the options, are not logged, so the game cannot be
+            # replayed
+            best, report = None, {'iterations': 0, 'error': str(error)}
+        report['decision'] = decision
+        report['fallback'] = best is None
+        self.searches.append(report)
+        if best is None:
+            self.search.statistics['fallbacks'] += 1
+            reason = report.get('error', "No time for a single search iteration.")
+            log_string = "{s} search bot chose at random for the {d} decision. {r}".format(s=side.upper(), d=decision,
+                                                                                         r=reason)
+            game.log(log_string)
+            return self.fallback.choose(game, side, decision, options)
+        return options[best]
@@ -0,0 +1,511 @@
+# Headless simulation of twilight struggle games
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import statistics
+
+from ts_app import TwilightStruggleGame, TwilightStruggleDefinitions, RandomBot
+from ts_search import SearchBot
+
+# Bots that can be selected by name
+bot_types = {'random': RandomBot, 'search': SearchBot}
+
+
+def create_bot(bot_name, seed):
+    if bot_name not in bot_types:
+        raise ValueError("Unknown bot " + str(bot_name) + ". Bot must be one of: " + ", ".join(bot_types))
+    return bot_types[bot_name](seed)
+
+
+def game_record(game, usa_bot, ussr_bot):
+    """Compact summary of a finished game, written as one line of a record file"""
+    record = {'seed': game.seed,
+              'bots': {'usa': usa_bot, 'ussr': ussr_bot},
+              'winner': game.get_winner(),
+              'end_reason': game.end_reason,
+              'score': game.score,
+              'turn': game.turn,
+              'state_hash': game.zobrist,
+              'events': sorted(card.number for card in game.cards.values() if card.name != 'China' and card.played),
+              'headlines': game.headlines,
+              'event_scores': game.event_scores,
+              'trajectory': game.trajectory}
+    return record
+
+
+def simulate_game(seed, usa_bot='random', ussr_bot='random', optional_cards='1', extra_inf='', handicap=None):
+    """Plays one game between two bots with all output suppressed and returns its record. Handicap is a
+    [side, bonus influence] pair for games with the 'handicap' extra influence."""
+    bots = {'usa': create_bot(usa_bot, seed * 2),
+            'ussr': create_bot(ussr_bot, seed * 2 + 1)}
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        game = TwilightStruggleGame("Simulation {s}".format(s=seed), "", optional_cards, extra_inf, seed, bots)
+        game.report_sink = None
+        if handicap is not None:
+            game.set_handicap(*handicap)
+        try:
+            game.play()
+        except Exception as error:
+            # Record engine errors instead of stopping the whole batch
+            game.end_reason = 'error: ' + type(error).__name__ + ': ' + str(error)
+
+    return game_record(game, usa_bot, ussr_bot)
+
+
+def simulate_game_from_arguments(arguments):
+    return simulate_game(*arguments)
+
+
+class GameRecordWriter:
+    """Streams game records to JSON lines files as games complete.
+
+    Records are buffered in memory and written once the buffer reaches buffer_size bytes, so a crashed run loses at
+    most the records in the buffer. When max_bytes is set, a new numbered file is started once the current file
+    reaches that size. The fsync policy is one of:
+        'flush' - fsync every time the buffer is written
+        'close' - fsync when a file is rotated or closed
+        'never' - leave it to the operating system"""
+
+    def __init__(self, path, buffer_size=1024 * 1024, max_bytes=None, fsync='close'):
+        if fsync not in ['flush', 'close', 'never']:
+            raise ValueError("Error creating game record writer. Fsync policy must be one of: 'flush', 'close', or 'never'")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("Error creating game record writer. Maximum file size must be more than 0 bytes")
+
+        self.path = path
+        self.buffer_size = buffer_size
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.records_written = 0
+        self.file_number = 0
+        self.file_bytes = 0
+        self.handle = None
+        self.paths = []
+
+    def file_path(self, file_number):
+        if self.max_bytes is None:
+            return self.path
+        root, extension = os.path.splitext(self.path)
+        return "{r}.{n:05d}{e}".format(r=root, n=file_number, e=extension)
+
+    def open_file(self):
+        path = self.file_path(self.file_number)
+        self.handle = open(path, 'ab')
+        self.file_bytes = self.handle.tell()
+        self.paths.append(path)
+
+    def close_file(self):
+        if self.handle is not None:
+            self.handle.flush()
+            if self.fsync != 'never':
+                os.fsync(self.handle.fileno())
+            self.handle.close()
+            self.handle = None
+
+    def rotate(self):
+        self.close_file()
+        self.file_number += 1
+        self.open_file()
+
+    def write(self, record):
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+        self.buffer.append(line)
+        self.buffered_bytes += len(line)
+        self.records_written += 1
+
+        if self.buffered_bytes >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.buffer) == 0:
+            return
+        if self.handle is None:
+            self.open_file()
+
+        for line in self.buffer:
+            # Rotate before a line would take the file over the maximum, a file always holds whole records
+            if self.max_bytes is not None and self.file_bytes > 0 and self.file_bytes + len(line) > self.max_bytes:
+                self.rotate()
+            self.handle.write(line)
+            self.file_bytes += len(line)
+
+        self.handle.flush()
+        if self.fsync == 'flush':
+            os.fsync(self.handle.fileno())
+
+        self.buffer = []
+        self.buffered_bytes = 0
+
+    def close(self):
+        self.flush()
+        self.close_file()
+
+    def checkpoint(self):
+        """Writes every buffered record to disk and returns the position of the writer"""
+        self.flush()
+        if self.handle is not None and self.fsync != 'never':
+            os.fsync(self.handle.fileno())
+        return {'records_written': self.records_written,
+                'file_number': self.file_number,
+                'file_bytes': self.file_bytes if self.handle is not None else 0,
+                'paths': list(self.paths)}
+
+    def restore(self, state):
+        """Returns the writer to a checkpointed position, dropping records written after it"""
+        self.close_file()
+        self.buffer = []
+        self.buffered_bytes = 0
+
+        # Files started after the checkpoint are removed and the current file is cut back to its size then
+        file_number = state['file_number'] + 1
+        while self.max_bytes is not None and os.path.exists(self.file_path(file_number)):
+            os.remove(self.file_path(file_number))
+            file_number += 1
+        path = self.file_path(state['file_number'])
+        if os.path.exists(path):
+            with open(path, 'r+b') as handle:
+                handle.truncate(state['file_bytes'])
+
+        self.records_written = state['records_written']
+        self.file_number = state['file_number']
+        self.paths = list(state['paths'])
+        if len(self.paths) > 0 and self.paths[-1] == path:
+            self.paths.pop()
+        self.open_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "<GameRecordWriter: %s, %s records>" % (self.path, self.records_written)
+
+
+def save_checkpoint(path, checkpoint):
+    """Writes the checkpoint to a temporary file and renames it, so a crash never leaves a partial checkpoint"""
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as handle:
+        json.dump(checkpoint, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as handle:
+        return json.load(handle)
+
+
+def run_batch(seeds, usa_bot='random', ussr_bot='random', optional_cards='1', writer=None, workers=1,
+              checkpoint_path=None, checkpoint_every=1000, stop=None, extra_inf='', handicap=None, progress=None):
+    """Simulates a game for each seed and returns the totals. Records are streamed to the writer as games finish.
+
+    With a checkpoint path, the totals, the number of seeds completed and the writer position are saved every
+    checkpoint_every games. Running the same batch again resumes after the last checkpoint: records written after it
+    are dropped and the remaining seeds are played, so the output matches a run that was never interrupted.
+
+    With a SequentialStop, the run ends as soon as the stop decides on the win rate of its side, and the totals hold
+    the reason under 'stop'. Games are taken in seed order, so the run stops after the same game with any number of
+    workers.
+
+    Progress, when given, is called with the number of seeds completed and the totals after every game."""
+    seeds = list(seeds)
+    totals = {'games': 0, 'usa': 0, 'ussr': 0, 'draw': 0, 'stalled': 0, 'errors': 0, 'stop': None}
+    batch = {'usa_bot': usa_bot, 'ussr_bot': ussr_bot, 'optional_cards': optional_cards, 'seeds': len(seeds),
+             'first_seed': seeds[0] if len(seeds) > 0 else None}
+    if extra_inf != '' or handicap is not None:
+        batch.update({'extra_inf': extra_inf, 'handicap': list(handicap) if handicap is not None else None})
+    if stop is not None:
+        batch['stop'] = stop.parameters()
+    completed = 0
+    running = RunningStatistics()
+
+    checkpoint = load_checkpoint(checkpoint_path) if checkpoint_path is not None else None
+    if checkpoint is not None:
+        if checkpoint['batch'] != batch:
+            raise ValueError("Error resuming batch. Checkpoint " + str(checkpoint_path) + " is for a different batch")
+        totals = checkpoint['totals']
+        completed = checkpoint['completed']
+        totals.setdefault('stop', None)
+        running = RunningStatistics(**checkpoint.get('running', {}))
+        if writer is not None and checkpoint['writer'] is not None:
+            writer.restore(checkpoint['writer'])
+        if totals['stop'] is not None:
+            return totals
+
+    arguments = [(seed, usa_bot, ussr_bot, optional_cards, extra_inf, handicap) for seed in seeds[completed:]]
+
+    if workers > 1:
+        # Load the definitions once so forked workers share them
+        TwilightStruggleDefinitions.load()
+        pool = multiprocessing.Pool(workers)
+        records = pool.imap(simulate_game_from_arguments, arguments, chunksize=16)
+    else:
+        pool = None
+        records = map(simulate_game_from_arguments, arguments)
+
+    try:
+        for record in records:
+            add_to_totals(totals, record)
+            if writer is not None:
+                writer.write(record)
+            completed += 1
+
+            if stop is not None:
+                outcome = side_outcome(record, stop.side)
+                if outcome is not None:
+                    running.add(outcome)
+                    totals['stop'] = stop.decision(running)
+            if progress is not None:
+                progress(completed, totals)
+
+            if checkpoint_path is not None and (completed % checkpoint_every == 0 or completed == len(seeds)
+                                                or totals['stop'] is not None):
+                save_checkpoint(checkpoint_path, {'batch': batch,
+                                                  'completed': completed,
+                                                  'totals': totals,
+                                                  'running': running.state(),
+                                                  'writer': writer.checkpoint() if writer is not None else None})
+            if totals['stop'] is not None:
+                break
+    finally:
+        if pool is not None:
+            # Games still being played when the run stops are dropped
+            if totals['stop'] is not None:
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+
+    return totals
+
+
+def add_to_totals(totals, record):
+    totals['games'] += 1
+    if record['end_reason'].startswith('error'):
+        totals['errors'] += 1
+    elif record['end_reason'] == 'stalled':
+        totals['stalled'] += 1
+    elif record['winner'] == '':
+        totals['draw'] += 1
+    else:
+        totals[record['winner']] += 1
+
+
+def side_outcome(record, side):
+    """Returns 1 when the side won the game, 0 when it lost, 0.5 for a draw, and None for a stalled game or an engine
+    error"""
+    if record['end_reason'].startswith('error') or record['end_reason'] == 'stalled':
+        return None
+    if record['winner'] == '':
+        return 0.5
+    return 1.0 if record['winner'] == side else 0.0
+
+
+class RunningStatistics:
+    """Running mean and variance of a stream of values"""
+
+    def __init__(self, count=0, total=0.0, squares=0.0):
+        self.count = count
+        self.total = total
+        self.squares = squares
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.squares += value * value
+
+    def mean(self):
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        mean = self.mean()
+        return max(self.squares - self.count * mean * mean, 0.0) / (self.count - 1)
+
+    def standard_error(self):
+        return math.sqrt(self.variance() / self.count) if self.count > 0 else math.inf
+
+    def interval(self, confidence=0.95):
+        """Normal confidence interval for the mean"""
+        half_width = statistics.NormalDist().inv_cdf(0.5 + confidence / 2) * self.standard_error()
+        return self.mean() - half_width, self.mean() + half_width
+
+    def state(self):
+        return {'count': self.count, 'total': self.total, 'squares': self.squares}
+
+
+class PairedStatistics:
+    """Running statistics of the outcomes of bot A, of bot B and of their difference over paired games"""
+
+    def __init__(self):
+        self.a = RunningStatistics()
+        self.b = RunningStatistics()
+        self.difference = RunningStatistics()
+
+    @property
+    def pairs(self):
+        return self.difference.count
+
+    def add(self, outcome_a, outcome_b):
+        self.a.add(outcome_a)
+        self.b.add(outcome_b)
+        self.difference.add(outcome_a - outcome_b)
+
+    def summary(self, confidence=0.95):
+        low, high = self.difference.interval(confidence)
+        # Independent games would need this many times as many pairs for the same interval
+        variance = self.difference.variance()
+        variance_reduction = (self.a.variance() + self.b.variance()) / variance if variance > 0 else None
+        return {'pairs': self.pairs,
+                'a win rate': self.a.mean(),
+                'b win rate': self.b.mean(),
+                'difference': self.difference.mean(),
+                'standard error': self.difference.standard_error() if self.pairs > 0 else None,
+                'confidence': confidence,
+                'interval': [low, high],
+                'variance reduction': variance_reduction}
+
+
+class SequentialStop:
+    """Stopping rule for a run, checked after every game or pair on the running statistics of the outcomes.
+
+    The rule is one of:
+        'interval' - stop once the confidence interval of the mean is no wider than width either side
+        'sprt'     - sequential probability ratio test of a mean of null against a mean of alternative, with
+                     error rates alpha and beta, using the normal approximation of the outcomes
+    No decision is made before min_games. For a batch the outcome is the win rate of side, for an A/B comparison
+    it is the difference in win rate."""
+
+    def __init__(self, rule='interval', width=0.02, confidence=0.95, null=0.5, alternative=0.55, alpha=0.05,
+                 beta=0.05, min_games=100, side='usa'):
+        if rule not in ['interval', 'sprt']:
+            raise ValueError("Error creating sequential stop. Rule must be 'interval' or 'sprt'")
+        if rule == 'sprt' and null == alternative:
+            raise ValueError("Error creating sequential stop. Null and alternative must differ")
+
+        self.rule = rule
+        self.width = width
+        self.confidence = confidence
+        self.null = null
+        self.alternative = alternative
+        self.alpha = alpha
+        self.beta = beta
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.upper_bound = math.log((1 - beta) / alpha)
+        self.min_games = min_games
+        self.side = side
+
+    def parameters(self):
+        """Returns the settings of the stop, so a checkpoint can tell whether a run is resumed with the same stop"""
+        return {'rule': self.rule, 'width': self.width, 'confidence': self.confidence, 'null': self.null,
+                'alternative': self.alternative, 'alpha': self.alpha, 'beta': self.beta,
+                'min_games': self.min_games, 'side': self.side}
+
+    def log_likelihood_ratio(self, running):
+        variance = running.variance()
+        if variance == 0:
+            return 0.0
+        return (self.alternative - self.null) / variance \
+            * (running.total - running.count * (self.null + self.alternative) / 2)
+
+    def decision(self, running):
+        """Returns None to keep going, or the reason to stop: 'interval', 'accept null' or 'accept alternative'"""
+        if running.count < self.min_games:
+            return None
+        if self.rule == 'interval':
+            low, high = running.interval(self.confidence)
+            return 'interval' if (high - low) / 2 <= self.width else None
+        ratio = self.log_likelihood_ratio(running)
+        if ratio >= self.upper_bound:
+            return 'accept alternative'
+        if ratio <= self.lower_bound:
+            return 'accept null'
+        return None
+
+
+def simulate_pair(seed, bot_a, bot_b, opponent='random', side='usa', optional_cards='1'):
+    """Plays the seed with bot A and with bot B as the side against the same opponent. Both games share the seed,
+    so they roll the same dice and draw from the same deal stream, and the bots are seeded alike.
+
+    The records are tagged with their arm under 'ab', and get the game IDs seed * 2 and seed * 2 + 1 so the two
+    games of a pair can be told apart in an archive."""
+    if side == 'usa':
+        records = (simulate_game(seed, bot_a, opponent, optional_cards),
+                   simulate_game(seed, bot_b, opponent, optional_cards))
+    else:
+        records = (simulate_game(seed, opponent, bot_a, optional_cards),
+                   simulate_game(seed, opponent, bot_b, optional_cards))
+    for arm, record in zip(['a', 'b'], records):
+        record['ab'] = arm
+        record['game_id'] = seed * 2 + (0 if arm == 'a' else 1)
+    return records
+
+
+def simulate_pair_from_arguments(arguments):
+    return simulate_pair(*arguments)
+
+
+def run_ab(seeds, bot_a, bot_b, opponent='random', side='usa', optional_cards='1', writer=None, workers=1,
+           confidence=0.95, stop=None):
+    """Compares two bots for a side with common random numbers: each seed is played once with each bot, and the
+    paired differences of the outcomes give the difference in win rate with a confidence interval. Pairs with a
+    stalled game or an engine error are left out.
+
+    With a SequentialStop, the comparison ends as soon as the stop decides on the difference in win rate. The
+    summary gives the reason under 'stop' and the number of games played under 'games'."""
+    if side not in ['usa', 'ussr']:
+        raise ValueError("Error running A/B comparison. Side must be 'usa' or 'ussr'")
+
+    arguments = [(seed, bot_a, bot_b, opponent, side, optional_cards) for seed in seeds]
+    paired = PairedStatistics()
+    excluded = 0
+    decision = None
+
+    if workers > 1:
+        TwilightStruggleDefinitions.load()
+        pool = multiprocessing.Pool(workers)
+        pairs = pool.imap(simulate_pair_from_arguments, arguments, chunksize=16)
+    else:
+        pool = None
+        pairs = map(simulate_pair_from_arguments, arguments)
+
+    try:
+        for record_a, record_b in pairs:
+            if writer is not None:
+                writer.write(record_a)
+                writer.write(record_b)
+            outcome_a = side_outcome(record_a, side)
+            outcome_b = side_outcome(record_b, side)
+            if outcome_a is None or outcome_b is None:
+                excluded += 1
+            else:
+                paired.add(outcome_a, outcome_b)
+                if stop is not None:
+                    decision = stop.decision(paired.difference)
+                    if decision is not None:
+                        break
+    finally:
+        if pool is not None:
+            if decision is not None:
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+
+    summary = paired.summary(confidence)
+    summary['excluded pairs'] = excluded
+    summary['games'] = 2 * (paired.pairs + excluded)
+    summary['stop'] = decision
+    return summary